@@ -1,840 +1,2714 @@
-# -*- coding: utf-8 -*-
-"""
-Gerador_Planilhas.py — multi-temas com estilos
-"""
-
-import sys, random
-from typing import Dict, Any, List, Tuple, Optional
-from datetime import datetime, timedelta
-import numpy as np
-import pandas as pd
-
-# ========= util de prompt =========
-def prompt_menu(title: str, options: List[str], default_idx: Optional[int]=None) -> int:
-    print(f"\n{title}")
-    for i,opt in enumerate(options,1):
-        print(f"  {i}) {opt}")
-    while True:
-        resp = input(f"Escolha [1-{len(options)}]{f' (padrão {default_idx+1})' if default_idx is not None else ''}: ").strip()
-        if not resp and default_idx is not None: return default_idx
-        if resp.isdigit():
-            idx=int(resp)-1
-            if 0<=idx<len(options): return idx
-        print("Entrada inválida.")
-
-def prompt_int(msg: str, default: Optional[int]=None, min_val: Optional[int]=None, max_val: Optional[int]=None) -> int:
-    while True:
-        s = input(f"{msg}{f' (padrão {default})' if default is not None else ''}: ").strip()
-        if not s and default is not None: return default
-        try:
-            v=int(s)
-            if (min_val is not None and v<min_val) or (max_val is not None and v>max_val):
-                print("Fora do intervalo."); continue
-            return v
-        except: print("Número inválido.")
-
-def parse_ranges_to_indices(expr: str, total: int) -> List[int]:
-    if not expr: return list(range(total))
-    parts=[p.strip() for p in expr.split(",") if p.strip()]
-    idxs=set()
-    for p in parts:
-        if "-" in p:
-            a,b=p.split("-",1)
-            if a.isdigit() and b.isdigit():
-                a,b=int(a),int(b)
-                for k in range(min(a,b),max(a,b)+1):
-                    if 1<=k<=total: idxs.add(k-1)
-        elif p.isdigit():
-            k=int(p); 
-            if 1<=k<=total: idxs.add(k-1)
-    return sorted(idxs)
-
-# ========= estilos =========
-ESTILOS = {
-    "Azul":   {"header_bg":"#E8F1FF","kpi_bg":"#DCEBFF","zebra":"#F7FAFF","neg":"#FCE8E6","pos":"#E6F4EA","scale_min":"#E8F1FF","scale_max":"#2B6CB0"},
-    "Verde":  {"header_bg":"#E9F7EF","kpi_bg":"#D4EFDF","zebra":"#F5FBF7","neg":"#FDEDEC","pos":"#E8F8F5","scale_min":"#E9F7EF","scale_max":"#1E8449"},
-    "Cinza":  {"header_bg":"#F0F0F0","kpi_bg":"#E6E6E6","zebra":"#FAFAFA","neg":"#FDEDEC","pos":"#EBF5FB","scale_min":"#F0F0F0","scale_max":"#5D6D7E"},
-    "Laranja":{"header_bg":"#FFF1E6","kpi_bg":"#FFE0CC","zebra":"#FFF9F3","neg":"#FDECEA","pos":"#FFF7E6","scale_min":"#FFF1E6","scale_max":"#D35400"},
-}
-
-# ========= motor xlsx =========
-def _excel_cell_to_tuple(cell_ref: str) -> Tuple[int,int]:
-    col=0; row=0
-    for c in cell_ref:
-        if c.isalpha(): col=col*26 + (ord(c.upper())-ord('A'))+1
-        else: row=row*10 + int(c)
-    return (row-1, col-1)
-
-def _apply_common_formats(workbook, estilo_key: str):
-    pal = ESTILOS[estilo_key]
-    fmt = {
-        "text":   workbook.add_format({'text_wrap':False}),
-        "int":    workbook.add_format({'num_format':'#,##0'}),
-        "float":  workbook.add_format({'num_format':'#,##0.00'}),
-        "money":  workbook.add_format({'num_format':'R$ #,##0.00'}),
-        "date":   workbook.add_format({'num_format':'yyyy-mm-dd'}),
-        "header": workbook.add_format({'bold':True,'bg_color':pal["header_bg"],'border':1}),
-        "kpi_lbl":workbook.add_format({'bold':True}),
-        "kpi_val":workbook.add_format({'num_format':'#,##0.00','bold':True,'bg_color':pal["kpi_bg"],'border':1}),
-    }
-    return fmt, pal
-
-def gerar_planilha(spec: Dict[str, Any], output_path: str, estilo_key: str="Azul") -> None:
-    sheets_spec = spec.get('sheets', [])
-    pivots_spec = spec.get('pivots', [])
-    kpis_spec   = spec.get('kpis', [])
-    dashboard_name = spec.get('dashboard_name', 'Dashboard')
-    with pd.ExcelWriter(output_path, engine='xlsxwriter', datetime_format='yyyy-mm-dd', date_format='yyyy-mm-dd') as writer:
-        workbook = writer.book
-        fmt, pal = _apply_common_formats(workbook, estilo_key)
-        name_to_df = {}
-
-        # abas
-        for sh in sheets_spec:
-            name = sh['name']; data = sh.get('data', pd.DataFrame())
-            if isinstance(data, list): data = pd.DataFrame(data)
-            df = data.copy(); name_to_df[name]=df
-            df.to_excel(writer, sheet_name=name, index=False, startrow=1)
-            ws = writer.sheets[name]
-
-            for i, colname in enumerate(df.columns):
-                ws.write(0, i, colname, fmt["header"])
-
-            for col in sh.get('columns', []):
-                colname=col.get('name'); width=col.get('width',15); f=col.get('fmt','text')
-                if colname in df.columns:
-                    ci=df.columns.get_loc(colname)
-                    base = fmt["text"] if f=="text" else fmt.get("money" if f=="currency" else f, fmt["text"])
-                    ws.set_column(ci, ci, width, base)
-
-            if sh.get('autofilter', True) and not df.empty:
-                ws.autofilter(0,0, df.shape[0], df.shape[1]-1)
-            if sh.get('freeze'): ws.freeze_panes(*_excel_cell_to_tuple(sh['freeze']))
-
-            if not df.empty:
-                ws.conditional_format(1,0, df.shape[0], df.shape[1]-1, {
-                    'type':'formula','criteria':'=MOD(ROW(),2)=0','format':workbook.add_format({'bg_color':pal["zebra"]})
-                })
-
-            if "validade" in df.columns:
-                ci_val = df.columns.get_loc("validade")
-                ws.conditional_format(1,0, df.shape[0], df.shape[1]-1, {
-                    'type':'formula','criteria': f'=INDIRECT(ADDRESS(ROW(),{ci_val+1}))<=TODAY()+7',
-                    'format':workbook.add_format({'bg_color':pal["neg"]})
-                })
-            if {"vencimento","pago"}.issubset(df.columns):
-                ci_v=df.columns.get_loc("vencimento"); ci_p=df.columns.get_loc("pago")
-                ws.conditional_format(1,0, df.shape[0], df.shape[1]-1, {
-                    'type':'formula','criteria': f'=AND(TODAY()>INDIRECT(ADDRESS(ROW(),{ci_v+1})),INDIRECT(ADDRESS(ROW(),{ci_p+1}))=FALSE())',
-                    'format':workbook.add_format({'bg_color':pal["neg"]})
-                })
-
-        # KPIs
-        if kpis_spec:
-            if dashboard_name not in writer.sheets:
-                pd.DataFrame().to_excel(writer, sheet_name=dashboard_name, index=False)
-            ws = writer.sheets[dashboard_name]
-            ws.write(0,0,"KPIs", fmt["header"]); r=2
-            for k in kpis_spec:
-                ws.write(r,0,k.get("label","KPI"), fmt["kpi_lbl"])
-                if "formula" in k:
-                    ws.write_formula(r,1,k["formula"], fmt["kpi_val"])
-                else:
-                    val=k.get("value",""); f=k.get("fmt","text")
-                    cellfmt = fmt["kpi_val"] if f in ("float","int","currency") else fmt["text"]
-                    ws.write(r,1,val, cellfmt)
-                r+=1
-
-        # pivôs
-        for pv in pivots_spec:
-            name=pv['name']; src_sheet=pv['data_sheet']
-            if src_sheet not in name_to_df: continue
-            src=name_to_df[src_sheet]
-            if src.empty:
-                pd.DataFrame().to_excel(writer, sheet_name=name, index=False); continue
-            pvt=pd.pivot_table(
-                src,
-                index=pv.get('index',[]),
-                columns=pv.get('columns',[]),
-                values=list(pv.get('values', {'valor':'sum'}).keys()),
-                aggfunc=pv.get('values', {'valor':'sum'}),
-                fill_value=pv.get('fill_value',0)
-            )
-            if isinstance(pvt.columns, pd.MultiIndex):
-                pvt.columns=[' | '.join(map(str,c)).strip() for c in pvt.columns.values]
-            pvt=pvt.reset_index()
-            rnd=pv.get('round')
-            if isinstance(rnd,int):
-                nums=pvt.select_dtypes(include=[np.number]).columns; pvt[nums]=pvt[nums].round(rnd)
-            pvt.to_excel(writer, sheet_name=name, index=False, startrow=1)
-            ws=writer.sheets[name]
-            for i,colname in enumerate(pvt.columns):
-                ws.write(0,i,colname, fmt["header"]); ws.set_column(i,i,max(12,len(str(colname))+2))
-            ch=pv.get('chart')
-            if ch and not pvt.empty:
-                chart=workbook.add_chart({'type': ch.get('type','column')})
-                for col_idx in range(1,pvt.shape[1]):
-                    chart.add_series({'name':[name,0,col_idx],'categories':[name,1,0,pvt.shape[0],0],'values':[name,1,col_idx,pvt.shape[0],col_idx]})
-                chart.set_title({'name': ch.get('title',name)})
-                chart.set_y_axis({'name': ch.get('y_title','')})
-                ws.insert_chart('B8', chart, {'x_scale':1.2,'y_scale':1.2})
-
-# ========= faker / bases =========
-UFs = ["AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG","PA","PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"]
-
-_FAKE=None; _FAKER_OK=False; _COMMERCE=False
-try:
-    from faker import Faker
-    _FAKE = Faker("pt_BR"); _FAKER_OK=True
-    try:
-        from faker_commerce import Provider as CommerceProvider
-        _FAKE.add_provider(CommerceProvider); _COMMERCE=True
-    except Exception:
-        _COMMERCE=False
-except Exception:
-    _FAKER_OK=False
-
-MARCAS_BR = ["Aurora","Predilecta","Nestlé","Camil","Ypê","Itambé","Seara","Qualitá","Heinz","Coca-Cola","Ambev","Vitao","Italac","Piracanjuba","Piraquê","Tio João","União","Colgate","Oral-B","Tramontina","Vigor","Sadia","Perdigão","Bauducco","Santa Helena","Fini","Bombril","Brilux","Scotch-Brite"]
-
-def _fake_estado_sigla():
-    if _FAKER_OK and hasattr(_FAKE, "estado_sigla"): return _FAKE.estado_sigla()
-    return random.choice(UFs)
-
-def _rand_date(days_back=365):
-    end = datetime.now(); start = end - timedelta(days=days_back)
-    return start + timedelta(seconds=random.randint(0,int((end-start).total_seconds())))
-
-def _escolha_ponderada(opcoes):
-    itens, pesos = zip(*opcoes); tot=sum(pesos); r=random.uniform(0,tot); acc=0
-    for it,p in zip(itens,pesos):
-        acc+=p
-        if r<=acc: return it
-    return itens[-1]
-
-def _doc_fakes():
-    return {"cnpj": f"{random.randint(10,99)}.{random.randint(100,999)}.{random.randint(100,999)}/0001-{random.randint(10,99)}",
-            "cpf":  f"{random.randint(100,999)}.{random.randint(100,999)}.{random.randint(100,999)}-{random.randint(10,99)}",
-            "ie":   f"{random.randint(1000000,9999999)}"}
-
-# ========= EAN =========
-def _ean13_checksum(num12: str) -> int:
-    s = sum((3 if i%2 else 1)*int(d) for i,d in enumerate(num12[::-1]))
-    return (10 - (s % 10)) % 10
-def gerar_ean13(prefix: str="789") -> str:
-    base_len = 12 - len(prefix); middle = "".join(str(random.randint(0,9)) for _ in range(base_len))
-    num12 = prefix + middle; dv = _ean13_checksum(num12); return num12 + str(dv)
-
-# ========= produtos PT-BR para varejo =========
-_UNIDADES = [
-    ("g", 140, 0.5), ("g", 200, 0.7), ("g", 500, 0.9), ("g", 1000, 1.0),
-    ("ml", 300, 0.8), ("ml", 500, 1.0), ("L", 1, 1.2), ("L", 2, 1.9),
-    ("un", 1, 1.0), ("un", 4, 3.6), ("un", 6, 5.2), ("un", 12, 10.0)
-]
-_BASE_PRECO_PT = {
-    "Mercearia": (5.90, 29.90), "Bebidas": (4.90, 39.90), "Higiene & Beleza": (7.90, 49.90),
-    "Limpeza": (5.90, 29.90), "Frios & Laticínios": (7.90, 59.90), "Açougue": (14.90, 79.90),
-    "Padaria & Confeitaria": (4.90, 24.90), "Pets": (9.90, 49.90), "Utilidades": (9.90, 69.90),
-}
-CAT_PT = {
-    "Mercearia": ["Arroz","Feijão Carioca","Feijão Preto","Macarrão Spaghetti","Macarrão Parafuso","Molho de Tomate","Azeite de Oliva","Açúcar Refinado","Farinha de Trigo","Café Torrado e Moído","Atum em Óleo","Sardinha em Óleo","Azeitona Verde","Milho Verde","Ervilha em Conserva","Biscoito Recheado Chocolate","Biscoito Cream Cracker","Achocolatado em Pó","Granola Tradicional","Aveia em Flocos","Leite em Pó","Leite Condensado","Creme de Leite"],
-    "Bebidas": ["Água Mineral","Refrigerante Cola","Refrigerante Guaraná","Suco de Uva","Suco de Laranja","Cerveja Pilsen","Cerveja IPA","Vinho Tinto Seco","Chá Gelado","Água de Coco","Energético"],
-    "Higiene & Beleza": ["Sabonete","Shampoo","Condicionador","Desodorante Aerosol","Creme Dental","Escova Dental","Fio Dental","Enxaguante Bucal","Lenço Umedecido"],
-    "Limpeza": ["Detergente Líquido Neutro","Desinfetante","Amaciante de Roupas","Sabão em Pó","Limpador Multiuso","Água Sanitária","Esponja Multiuso","Lustra Móveis","Saco de Lixo"],
-    "Frios & Laticínios": ["Queijo Mussarela Fatiado","Queijo Prato","Queijo Parmesão Ralado","Presunto Cozido","Peito de Peru","Iogurte Natural","Iogurte Grego","Requeijão Cremoso","Manteiga com Sal","Ricota Fresca","Cream Cheese"],
-    "Açougue": ["Frango Congelado","Coxa e Sobrecoxa","Peito de Frango","Carne Moída","Bife de Alcatra","Carne Suína em Cubos","Linguiça Toscana","Carne para Panela"],
-    "Padaria & Confeitaria": ["Pão Francês","Pão de Forma","Bolo de Chocolate","Bolo de Cenoura","Pão de Queijo","Croissant","Biscoito Amanteigado"],
-    "Pets": ["Ração Cães Adultos","Ração Gatos Adultos","Petisco para Cães","Areia Sanitária"],
-    "Utilidades": ["Pano de Prato","Esponja de Aço","Vassoura","Rodo","Balde Plástico"],
-}
-ADJETIVOS = ["Premium","Tradicional","Integral","Zero Açúcar","Zero Lactose","Light","Orgânico","Clássico","Caseiro","Intenso","Extra Forte","Sabor Chocolate","Sabor Morango","Sabor Baunilha"]
-
-def _preco_realista_pt(familia: str, unidade: Tuple[str, float, float]) -> float:
-    low, high = _BASE_PRECO_PT.get(familia, (7.90, 49.90))
-    base = random.uniform(low, high)
-    _, _, fator = unidade
-    brand_bump = random.choice([0.95, 1.0, 1.05, 1.1])
-    preco = base * fator * brand_bump
-    cents = random.choice([0.90, 0.99, 0.79, 0.49, 0.19])
-    return float(int(preco)) + cents
-
-def produto_pt_br() -> Dict[str, Any]:
-    familia = random.choice(list(CAT_PT.keys()))
-    base = random.choice(CAT_PT[familia])
-    adic = " " + random.choice(ADJETIVOS) if random.random()<0.35 else ""
-    unidade = random.choice(_UNIDADES)
-    unidade_str = f"{unidade[1]}{unidade[0]}"
-    nome = f"{base}{adic} {unidade_str}"
-    marca = random.choice(MARCAS_BR + ["Genérico","Local","Premium","Eco"])
-    ean = gerar_ean13("789")
-    sku = f"{familia[:2].upper()}-{random.randint(10000,99999)}"
-    preco_base = round(_preco_realista_pt(familia, unidade), 2)
-    return {"sku": sku, "ean13": ean, "produto": nome, "categoria": familia, "marca": marca, "unidade": unidade_str, "preco_base": preco_base}
-
-# ========= clientes =========
-def _cliente():
-    if _FAKER_OK:
-        nome=_FAKE.name(); empresa=_FAKE.company(); cidade=_FAKE.city(); uf=_fake_estado_sigla(); cep=_FAKE.postcode()
-    else:
-        nome=f"Cliente {random.randint(1000,9999)}"; empresa=f"Empresa {random.randint(100,999)} Ltda"; cidade=f"Cidade {random.randint(1,200)}"; uf=random.choice(UFs); cep=f"{random.randint(10000,99999)}-{random.randint(100,999)}"
-    seg=_escolha_ponderada([("Varejo",0.5),("Atacado",0.3),("E-commerce",0.2)])
-    return {"cliente_nome":nome,"empresa":empresa,"cidade":cidade,"uf":uf,"cep":cep,"segmento":seg, **_doc_fakes()}
-
-# ========= datasets originais (resumo) =========
-def dataset_market(n=1000):
-    clientes=[_cliente() for _ in range(max(120,int(n*0.18)))]
-    produtos=[produto_pt_br() for _ in range(260)]
-    rows=[]
-    for _ in range(n):
-        cli=random.choice(clientes); prod=random.choice(produtos); d=_rand_date(365)
-        quantidade=max(1,int(round(abs(random.gauss(3.0,1.4)))))
-        preco_unit=round(prod["preco_base"]*_escolha_ponderada([(0.95,0.6),(1.0,1.6),(1.05,0.7)]),2)
-        desconto=round(_escolha_ponderada([(0.00,3.0),(0.03,0.8),(0.05,0.6),(0.10,0.25),(0.15,0.1)]),2)
-        receita=round(quantidade*preco_unit*(1-desconto),2)
-        pagamento=_escolha_ponderada([("Pix",0.5),("Crédito",0.3),("Débito",0.15),("Boleto",0.05)])
-        rows.append({"data":d.date(),"cliente":cli["cliente_nome"],"empresa":cli["empresa"],"uf":cli["uf"],"cidade":cli["cidade"],"segmento":cli["segmento"],
-                     "sku":prod["sku"],"ean13":prod["ean13"],"produto":prod["produto"],"categoria":prod["categoria"],"marca":prod["marca"],"unidade":prod["unidade"],
-                     "quantidade":quantidade,"preco_unit":preco_unit,"desconto":desconto,"receita":receita,"pagamento":pagamento})
-    return {"dados":pd.DataFrame(rows), "clientes":pd.DataFrame(clientes).drop_duplicates(subset=["empresa"]).reset_index(drop=True), "produtos":pd.DataFrame(produtos)}
-
-def dataset_financeira(n=1000):
-    BANCOS=["Banco do Brasil","Caixa","Bradesco","Itaú","Santander","Sicredi","Sicoob","BTG Pactual","Inter","Nubank","Safra"]
-    clientes=[_cliente() for _ in range(max(90,int(n*0.14)))]
-    rows=[]
-    for _ in range(n):
-        cli=random.choice(clientes); emissao=_rand_date(365); prazo=_escolha_ponderada([(15,0.65),(30,1.6),(45,0.8),(60,0.5),(90,0.2)])
-        venc=emissao+timedelta(days=prazo)
-        valor=round(_escolha_ponderada([(120,0.5),(250,1.2),(520,1.5),(990,1.3),(1800,0.9),(3500,0.35)]),2)
-        atrasodias=max(0,int(abs(random.gauss(1.8,3.8))))
-        pago=random.random()<0.88; data_pag=(venc+timedelta(days=atrasodias)) if pago else None
-        multa=round(0.02*valor if (data_pag and data_pag>venc) else 0,2)
-        juros=round(0.00033*valor*max(0,((data_pag or datetime.now())-venc).days),2) if (data_pag or datetime.now())>venc else 0.0
-        desconto=round(_escolha_ponderada([(0,3.0),(0.02*valor,0.5),(0.05*valor,0.2)]),2) if pago and random.random()<0.1 else 0.0
-        liquido=round((valor+multa+juros)-desconto,2) if pago else 0.0
-        rows.append({"emissao":emissao.date(),"vencimento":venc.date(),"empresa":cli["empresa"],"cnpj":cli["cnpj"],"cidade":cli["cidade"],"uf":cli["uf"],
-                     "banco":random.choice(BANCOS),"nosso_numero":f"{random.randint(10_000_000_000,99_999_999_999)}",
-                     "valor_face":valor,"multa":multa,"juros":juros,"desconto":desconto,"pago":pago,"data_pagamento":data_pag.date() if data_pag else None,"valor_liquido":liquido})
-    return {"titulos":pd.DataFrame(rows),"sacados":pd.DataFrame(clientes).drop_duplicates(subset=["empresa"]).reset_index(drop=True)}
-
-def dataset_logistica(n=1000):
-    TRANSPORTADORAS=["Rapidão Norte","TransLog BR","ViaCargo","Azul Cargo","Correios","JadLog","Total Express","Sequoia","Loggi","Braspress","DDL Express"]
-    clientes=[_cliente() for _ in range(max(80,int(n*0.12)))]
-    rows=[]
-    for _ in range(n):
-        cli=random.choice(clientes); coleta=_rand_date(365); dias=max(1,int(abs(random.gauss(3.6,1.5))))
-        prev=coleta+timedelta(days=dias)
-        modal=_escolha_ponderada([("Rodoviário",2.6),("Aéreo",0.6),("Ferroviário",0.4),("Hidroviário",0.3)])
-        peso=round(max(0.2, random.gauss(16,9)),2); volume=round(max(0.01, random.gauss(0.14,0.08)),3); distancia=max(10,int(abs(random.gauss(520,240))))
-        base={"Rodoviário":2.1,"Aéreo":4.2,"Ferroviário":1.9,"Hidroviário":1.6}[modal]; frete=round(base*peso + 0.28*distancia + 12,2)
-        entregue=random.random()<0.95; atraso=max(0,int(abs(random.gauss(0.4,1.0))))
-        entrega=(prev+timedelta(days=atraso)) if entregue else None
-        rows.append({"pedido":f"PED{random.randint(100000,999999)}","cliente":cli["empresa"],"origem_uf":random.choice(UFs),"destino_uf":cli["uf"],"modal":modal,
-                     "coleta":coleta.date(),"previsao_entrega":prev.date(),"entrega":entrega.date() if entrega else None,"transportadora":random.choice(TRANSPORTADORAS),
-                     "peso_kg":peso,"volume_m3":volume,"distancia_km":distancia,"frete":frete,"entregue":entregue})
-    return {"embarques":pd.DataFrame(rows),"clientes":pd.DataFrame(clientes).drop_duplicates(subset=["empresa"]).reset_index(drop=True)}
-
-def dataset_agro(n=1000):
-    CULTURAS=["Soja","Milho","Cana-de-Açúcar","Café","Algodão","Arroz","Feijão","Trigo","Laranja","Uva"]
-    INSUMOS=["Fertilizante NPK","Calcário","Herbicida","Inseticida","Fungicida","Sementes Certificadas","Adubo Orgânico","Micronutrientes","Regulador de Crescimento"]
-    produtores=[]
-    for _ in range(max(60,int(n*0.1))):
-        if _FAKER_OK: nome=_FAKE.name(); cidade=_FAKE.city(); uf=_fake_estado_sigla()
-        else: nome=f"Produtor {random.randint(1000,9999)}"; cidade=f"Cidade {random.randint(1,200)}"; uf=random.choice(UFs)
-        produtores.append({"produtor":nome,"cidade":cidade,"uf":uf, **_doc_fakes()})
-    talhoes=[f"T{random.randint(1,80)}" for _ in range(160)]
-    items=[{"sku":f"AG-{random.randint(1000,9999)}","item":random.choice(INSUMOS),"cultura":random.choice(CULTURAS),"preco_base":round(_escolha_ponderada([(90,0.6),(120,1.0),(260,1.4),(480,0.9),(950,0.4)]),2)} for _ in range(90)]
-    col=[]; ins=[]
-    for _ in range(n):
-        prod=random.choice(produtores); talhao=random.choice(talhoes); cultura=random.choice(CULTURAS)
-        area=round(max(1.0, random.gauss(48,22)),1); plantio=_rand_date(300); colheita=plantio+timedelta(days=_escolha_ponderada([(110,0.6),(130,1.2),(150,0.9)]))
-        produtividade=round(max(0.8, random.gauss(3.2,0.8)),2); producao=round(produtividade*area,2)
-        preco_t=round(_escolha_ponderada([(850,0.5),(1000,1.1),(1200,1.2),(1400,0.8)]),2); receita=round(producao*preco_t,2)
-        col.append({"produtor":prod["produtor"],"uf":prod["uf"],"talhao":talhao,"cultura":cultura,"area_ha":area,"plantio":plantio.date(),"colheita":colheita.date(),
-                    "produtividade_t_ha":produtividade,"producao_t":producao,"preco_t":preco_t,"receita":receita})
-        if random.random()<0.75:
-            it=random.choice(items); qtd=max(1,int(abs(random.gauss(8,4))))
-            custo=round(it["preco_base"]*qtd*_escolha_ponderada([(0.95,0.5),(1.0,1.2),(1.05,0.6)]),2)
-            ins.append({"produtor":prod["produtor"],"talhao":talhao,"cultura":cultura,"item":it["item"],"sku":it["sku"],"qtd":qtd,"custo_total":custo})
-    return {"colheita":pd.DataFrame(col),"insumos":pd.DataFrame(ins),"produtores":pd.DataFrame(produtores).drop_duplicates(subset=["produtor"]).reset_index(drop=True),"catalogo":pd.DataFrame(items)}
-
-def dataset_supermercado(n=1000):
-    base = dataset_market(n)
-    df = base["dados"].copy()
-    lojas = [f"Loja {i:02d}" for i in range(1,16)]; gondolas = [f"G{i:02d}" for i in range(1,31)]
-    df["loja"]=[random.choice(lojas) for _ in range(n)]
-    df["gondola"]=[random.choice(gondolas) for _ in range(n)]
-    df["lote"]=[f"L{random.randint(10000,99999)}" for _ in range(n)]
-    df["validade"]=[datetime.now().date()+timedelta(days=max(1,int(abs(random.gauss(35,25))))) for _ in range(n)]
-    base["dados"]=df; return base
-
-def dataset_estoque(n=1000):
-    produtos=[produto_pt_br() for _ in range(240)]
-    mov=[]
-    for _ in range(n):
-        prod=random.choice(produtos); d=_rand_date(180).date()
-        tipo=_escolha_ponderada([("Entrada",0.9),("Saída",1.4)])
-        qtd=max(1,int(abs(random.gauss(8,6))))
-        custo_unit = round(prod["preco_base"]*_escolha_ponderada([(0.85,1.0),(0.9,1.2),(0.95,0.8)]),2)
-        valor=round(qtd*custo_unit,2)
-        mov.append({"data":d,"sku":prod["sku"],"ean13":prod["ean13"],"produto":prod["produto"],"categoria":prod["categoria"],"tipo":tipo,"qtd":qtd,"custo_unit":custo_unit,"valor":valor,"almox":f"AX-{random.randint(1,5)}"})
-    df = pd.DataFrame(mov)
-    pos = df.groupby(["sku","produto","categoria","ean13"], as_index=False).apply(
-        lambda g: pd.Series({"saldo": int(g.apply(lambda r: r["qtd"]*(1 if r["tipo"]=="Entrada" else -1), axis=1).sum()),
-                             "valor_mov": round(g["valor"].sum(),2)})
-    ).reset_index(drop=True)
-    return {"mov": df, "posicao": pos}
-
-# ========= NOVOS DATASETS =========
-def dataset_saude(n=1000):
-    especialidades=["Clínico Geral","Cardiologia","Ortopedia","Dermatologia","Pediatria","Ginecologia","Oftalmologia"]
-    convs=["Particular","Unimed","Amil","Bradesco Saúde","SulAmérica","Hapvida","IPASGO"]
-    prof=[f"Dr(a). {_FAKE.last_name() if _FAKER_OK else random.randint(1000,9999)}" for _ in range(30)]
-    consult=[]; exames=[]
-    for _ in range(n):
-        dt=_rand_date(365).date()
-        esp=random.choice(especialidades); conv=random.choice(convs)
-        pago=random.random()<0.85
-        valor=round(_escolha_ponderada([(80,0.6),(120,1.2),(180,1.0),(250,0.6),(320,0.3)]),2)
-        retorno = dt + timedelta(days=random.choice([7,15,30,0]))
-        consult.append({
-            "data":dt,"paciente":(_FAKE.name() if _FAKER_OK else f"Paciente {random.randint(1000,9999)}"),
-            "cpf":f"{random.randint(100,999)}.{random.randint(100,999)}.{random.randint(100,999)}-{random.randint(10,99)}",
-            "especialidade":esp,"profissional":random.choice(prof),"procedimento":"Consulta",
-            "convenio":conv,"valor":valor,"pago":pago,"retorno_previsto":(retorno if random.random()<0.4 else None)
-        })
-        if random.random()<0.5:
-            tipo=random.choice(["Hemograma","Raio-X Tórax","US Abdômen","Colesterol","Glicemia","Eletrocardiograma"])
-            v=round(_escolha_ponderada([(30,0.7),(55,1.0),(90,0.8),(140,0.4)]),2)
-            exames.append({"data":dt,"paciente":consult[-1]["paciente"],"tipo_exame":tipo,"resultado":"Aguardando" if random.random()<0.5 else "Normal","valor":v,"pago":random.random()<0.8})
-    return {"consultas":pd.DataFrame(consult),"exames":pd.DataFrame(exames)}
-
-def dataset_educacao(n=1000):
-    turmas=[f"{random.choice(['1A','2B','3C','4D','5E'])}-{random.randint(2023,2025)}" for _ in range(20)]
-    disciplinas=["Português","Matemática","História","Geografia","Ciências","Inglês","Artes","Educação Física"]
-    alunos=[(_FAKE.name() if _FAKER_OK else f"Aluno {i}") for i in range(max(80,int(n*0.25)))]
-    matriculas=[]; avals=[]
-    for a in alunos:
-        turma=random.choice(turmas)
-        matriculas.append({"aluno":a,"turma":turma,"situacao":_escolha_ponderada([("Ativo",2.0),("Trancado",0.2),("Evadido",0.1)])})
-    for _ in range(n):
-        a=random.choice(alunos); disc=random.choice(disciplinas)
-        data=_rand_date(200).date()
-        nota=round(min(10,max(0,random.gauss(7.2,1.8))),1)
-        freq=round(min(100,max(40,random.gauss(88,8))),1)
-        avals.append({"data":data,"aluno":a,"turma":random.choice(turmas),"disciplina":disc,"avaliacao":random.choice(["P1","P2","Trabalho","Prova Final"]), "nota":nota,"frequencia_pct":freq})
-    return {"matriculas":pd.DataFrame(matriculas),"avaliacoes":pd.DataFrame(avals)}
-
-def dataset_televisao(n=1000):
-    emis=["Globo","SBT","Record","Band","RedeTV!","Cultura"]
-    progs=["Jornal da Noite","Novela das 9","Reality Show","Talk Show","Esporte Total","Filme"]
-    cats=["Alimentos","Bebidas","Eletro","Varejo","Serviços","Automotivo","Apps"]
-    aud=[]; com=[]
-    for _ in range(n):
-        dt=_rand_date(90)
-        emissora=random.choice(emis); programa=random.choice(progs)
-        dur=min(180,max(20,int(abs(random.gauss(60,25)))))
-        pontos=round(max(0.2, random.gauss(8.0 if emissora=="Globo" else 3.0, 2.0)),2)
-        share=round(min(60,max(1, random.gauss(24 if emissora=="Globo" else 10,6))),2)
-        aud.append({"data_hora":dt,"emissora":emissora,"programa":programa,"duracao_min":dur,"audiencia_pontos":pontos,"share_pct":share})
-        if random.random()<0.6:
-            com.append({"data_hora":dt,"emissora":emissora,"programa":programa,"anunciante":f"{random.choice(cats)} {random.randint(1,99)}","categoria":random.choice(cats),
-                        "preco_30s":round(_escolha_ponderada([(8000,0.5),(15000,0.9),(30000,0.6),(60000,0.2)]),2)})
-    return {"audiencia":pd.DataFrame(aud),"comerciais":pd.DataFrame(com)}
-
-def dataset_informatica(n=1000):
-    categorias=["Acesso","Email","Impressora","Rede","Hardware","Software","Backup","Segurança"]
-    prioridade=["Baixa","Média","Alta","Crítica"]
-    status_list=["Aberto","Em Andamento","Aguardando Usuário","Resolvido","Cancelado"]
-    usuarios=[(_FAKE.name() if _FAKER_OK else f"Usuário {i}") for i in range(200)]
-    tickets=[]
-    for _ in range(n):
-        ab=_rand_date(180); sla=max(2,int(abs(random.gauss(16,8))))
-        st=_escolha_ponderada([("Aberto",0.6),("Em Andamento",0.8),("Aguardando Usuário",0.4),("Resolvido",1.6),("Cancelado",0.1)])
-        fech=None
-        if st in ("Resolvido","Cancelado"):
-            fech=ab+timedelta(hours=max(1,int(abs(random.gauss(sla*0.8, sla*0.4)))))
-        tickets.append({
-            "ticket":f"INC{random.randint(100000,999999)}","abertura":ab,"solicitante":random.choice(usuarios),
-            "categoria":random.choice(categorias),"prioridade":random.choice(prioridade),"sla_h":sla,
-            "fechamento":fech,"status":st,"tempo_atendimento_h":(None if fech is None else round((fech-ab).total_seconds()/3600,1)),
-            "satisfacao": (None if st!="Resolvido" else random.randint(3,5))
-        })
-    # ativos
-    marcasHW=["Dell","HP","Lenovo","Acer","Apple","Samsung","Asus"]
-    ativos=[{"patrimonio":f"PAT{random.randint(10000,99999)}","tipo":random.choice(["Notebook","Desktop","Impressora","Monitor","Roteador"]),
-             "marca":random.choice(marcasHW),"usuario":random.choice(usuarios),
-             "aquisicao":_rand_date(1200).date(),"garantia_fim":(datetime.now().date()+timedelta(days=random.randint(30,900)))} for _ in range(max(80,int(n*0.2)))]
-    return {"tickets":pd.DataFrame(tickets),"ativos":pd.DataFrame(ativos)}
-
-def dataset_odontologia(n=800):
-    procs=["Profilaxia","Restauração","Canal","Extração","Clareamento","Implante","Consulta"]
-    dentistas=[f"Dr(a). {_FAKE.last_name() if _FAKER_OK else random.randint(1000,9999)}" for _ in range(18)]
-    convs=["Particular","OdontoPrev","Amil Dental","Bradesco Dental","SulAmérica Odonto"]
-    dentes=[f"{arc}-{num}" for arc in ["Sup","Inf"] for num in range(11,49)]
-    linhas=[]
-    for _ in range(n):
-        dt=_rand_date(365).date()
-        pac=_FAKE.name() if _FAKER_OK else f"Paciente {random.randint(1000,9999)}"
-        proc=random.choice(procs); dente=random.choice(dentes) if proc in ("Restauração","Canal","Extração","Implante") else None
-        valor=round(_escolha_ponderada([(120,0.8),(250,1.0),(450,0.8),(900,0.4),(1800,0.2)]),2)
-        pago=random.random()<0.85
-        linhas.append({"data":dt,"paciente":pac,"dentista":random.choice(dentistas),"procedimento":proc,"dente":dente,"convenio":random.choice(convs),"valor":valor,"pago":pago})
-    return {"atendimentos":pd.DataFrame(linhas)}
-
-def dataset_restaurante(n=1200):
-    garcons=[f"Garçom {i:02d}" for i in range(1,25)]
-    mesas=[f"M{i:02d}" for i in range(1,40)]
-    cat=["Prato","Bebida","Sobremesa"]
-    itens_menu={"Prato":["PF Bife","PF Frango","Lasanha","Parmegiana","Feijoada","Strogonoff"],
-                "Bebida":["Refrigerante Lata","Suco 300ml","Água 500ml","Cerveja 600ml","Caipirinha"],
-                "Sobremesa":["Pudim","Mousse","Petit Gateau","Sorvete 2 bolas"]}
-    linhas=[]
-    for _ in range(n):
-        dt=_rand_date(120).date()
-        mesa=random.choice(mesas); gar=random.choice(garcons)
-        c=random.choice(cat); item=random.choice(itens_menu[c])
-        qtd=max(1,int(abs(random.gauss(1.4,0.9))))
-        preco=round(_escolha_ponderada([(8,0.3),(12,0.6),(18,1.0),(28,0.9),(39,0.5)]),2) if c!="Bebida" else round(_escolha_ponderada([(4,0.5),(7,1.0),(10,0.8),(15,0.5)]),2)
-        total=round(preco*qtd,2)
-        linhas.append({"data":dt,"mesa":mesa,"garcom":gar,"categoria":c,"item":item,"quantidade":qtd,"preco_unit":preco,"total":total,"pagamento":random.choice(["Pix","Crédito","Débito","Dinheiro"])})
-    return {"pedidos":pd.DataFrame(linhas)}
-
-def dataset_construcao(n=800):
-    etapas=["Projeto","Fundação","Estrutura","Alvenaria","Instalações","Acabamento","Entrega"]
-    obras=[f"Obra {i:03d}" for i in range(1,60)]
-    clientes=[_FAKE.company() if _FAKER_OK else f"Cliente {i}" for i in range(60)]
-    registros=[]; compras=[]
-    for _ in range(n):
-        obra=random.choice(obras); cli=random.choice(clientes); inicio=_rand_date(540).date()
-        prev_fim=inicio+timedelta(days=random.randint(90,420))
-        etapa=random.choice(etapas)
-        prog=round(min(100,max(0,random.gauss(45,30))),1)
-        orcado=round(_escolha_ponderada([(50000,0.6),(120000,1.0),(280000,0.9),(550000,0.5),(900000,0.3)]),2)
-        real=round(orcado*_escolha_ponderada([(0.85,0.5),(0.95,1.2),(1.05,1.0),(1.15,0.6)]),2)
-        fim=None if random.random()<0.7 else (prev_fim + timedelta(days=int(abs(random.gauss(10,20)))))
-        registros.append({"obra":obra,"cliente":cli,"cidade":_FAKE.city() if _FAKER_OK else f"Cidade {random.randint(1,200)}","data_inicio":inicio,"data_prev_fim":prev_fim,
-                          "data_fim":fim,"etapa":etapa,"progresso_pct":prog,"custo_orcado":orcado,"custo_real":real})
-        if random.random()<0.8:
-            mat=random.choice(["Cimento","Areia","Brita","Tijolo","Aço","Piso","Revestimento","Tinta","Cano PVC"])
-            qtd=max(1,int(abs(random.gauss(50,40))))
-            compras.append({"obra":obra,"material":mat,"unidade":random.choice(["saco","m³","kg","un","m²"]), "qtd":qtd, "custo_total":round(_escolha_ponderada([(300,0.8),(1200,1.0),(3800,0.6),(7200,0.3)]),2)})
-    return {"obras":pd.DataFrame(registros),"compras":pd.DataFrame(compras)}
-
-# ========= CAMPOS por tema =========
-CAMPOS_TEMA = {
-    "Market": ["data","cliente","empresa","uf","cidade","segmento","sku","ean13","produto","categoria","marca","unidade","quantidade","preco_unit","desconto","receita","pagamento"],
-    "Financeira": ["emissao","vencimento","empresa","cnpj","cidade","uf","banco","nosso_numero","valor_face","multa","juros","desconto","pago","data_pagamento","valor_liquido"],
-    "Logística": ["pedido","cliente","origem_uf","destino_uf","modal","coleta","previsao_entrega","entrega","transportadora","peso_kg","volume_m3","distancia_km","frete","entregue"],
-    "Agro": ["produtor","uf","talhao","cultura","area_ha","plantio","colheita","produtividade_t_ha","producao_t","preco_t","receita"],
-    "Supermercado": ["data","loja","gondola","lote","validade","sku","ean13","produto","categoria","marca","unidade","quantidade","preco_unit","desconto","receita","pagamento"],
-    "Estoque": ["data","almox","sku","ean13","produto","categoria","tipo","qtd","custo_unit","valor"],
-
-    # novos
-    "Saúde": ["data","paciente","cpf","especialidade","profissional","procedimento","convenio","valor","pago","retorno_previsto"],
-    "Educação": ["data","aluno","turma","disciplina","avaliacao","nota","frequencia_pct"],
-    "Televisão": ["data_hora","emissora","programa","duracao_min","audiencia_pontos","share_pct"],
-    "Informática": ["ticket","abertura","solicitante","categoria","prioridade","sla_h","fechamento","status","tempo_atendimento_h","satisfacao"],
-    "Odontologia": ["data","paciente","dentista","procedimento","dente","convenio","valor","pago"],
-    "Restaurante": ["data","mesa","garcom","categoria","item","quantidade","preco_unit","total","pagamento"],
-    "Construção": ["obra","cliente","cidade","data_inicio","data_prev_fim","data_fim","etapa","progresso_pct","custo_orcado","custo_real"],
-}
-
-PERFIL_IDX = {
-    "Market":{"basico":["data","empresa","produto","categoria","unidade","quantidade","preco_unit","receita"],"completo":CAMPOS_TEMA["Market"]},
-    "Financeira":{"basico":["emissao","vencimento","empresa","valor_face","pago","valor_liquido"],"completo":CAMPOS_TEMA["Financeira"]},
-    "Logística":{"basico":["pedido","cliente","destino_uf","modal","coleta","previsao_entrega","frete","entregue"],"completo":CAMPOS_TEMA["Logística"]},
-    "Agro":{"basico":["produtor","cultura","area_ha","plantio","colheita","producao_t","receita"],"completo":CAMPOS_TEMA["Agro"]},
-    "Supermercado":{"basico":["data","loja","produto","categoria","quantidade","preco_unit","receita","validade"],"completo":CAMPOS_TEMA["Supermercado"]},
-    "Estoque":{"basico":["data","almox","sku","produto","tipo","qtd","valor"],"completo":CAMPOS_TEMA["Estoque"]},
-
-    "Saúde":{"basico":["data","paciente","especialidade","procedimento","valor","pago"],"completo":CAMPOS_TEMA["Saúde"]},
-    "Educação":{"basico":["data","aluno","disciplina","avaliacao","nota"],"completo":CAMPOS_TEMA["Educação"]},
-    "Televisão":{"basico":["data_hora","emissora","programa","audiencia_pontos","share_pct"],"completo":CAMPOS_TEMA["Televisão"]},
-    "Informática":{"basico":["ticket","abertura","categoria","prioridade","status","tempo_atendimento_h"],"completo":CAMPOS_TEMA["Informática"]},
-    "Odontologia":{"basico":["data","paciente","procedimento","valor","pago"],"completo":CAMPOS_TEMA["Odontologia"]},
-    "Restaurante":{"basico":["data","mesa","item","quantidade","preco_unit","total"],"completo":CAMPOS_TEMA["Restaurante"]},
-    "Construção":{"basico":["obra","etapa","progresso_pct","custo_real"],"completo":CAMPOS_TEMA["Construção"]},
-}
-
-def _col_def(name: str) -> Dict[str, Any]:
-    if name in ("data","emissao","vencimento","coleta","previsao_entrega","entrega","plantio","colheita","data_pagamento","validade","abertura","fechamento","data_hora","data_inicio","data_prev_fim","data_fim","retorno_previsto"): return {"name":name,"fmt":"date","width":14}
-    if name in ("quantidade","qtd","sla_h","duracao_min","satisfacao"): return {"name":name,"fmt":"int","width":12}
-    if name in ("preco_unit","valor_face","multa","juros","desconto","valor_liquido","frete","preco_t","receita","custo_total","total","preco_kg","cambio","valor","valor_beneficios","salario","descontos","liquido","preco_unit_moeda","total_moeda","total_brl","preco_30s","custo_orcado","custo_real"): return {"name":name,"fmt":"currency","width":13}
-    if name in ("peso_kg","volume_m3","area_ha","produtividade_t_ha","producao_t","mao_obra_horas","tempo_atendimento_h","nota","frequencia_pct","audiencia_pontos","share_pct","progresso_pct"): return {"name":name,"fmt":"float","width":13}
-    return {"name":name,"fmt":"text","width":max(10,min(26,len(name)+6))}
-
-# ========= builders de planilha por tema =========
-def build_spec_from_bundle(tema: str, bundle: Dict[str,pd.DataFrame], campos: List[str]) -> Dict[str,Any]:
-    base={"workbook":{"title":f"Relatório {tema}","author":"Gerador Interativo","created_at":datetime.now()},
-          "dashboard_name":"Dashboard"}
-
-    # ----- temas originais -----
-    if tema=="Market":
-        df=bundle["dados"][campos].copy()
-        cli=bundle["clientes"][["empresa","cnpj","cidade","uf","segmento"]]
-        prod=bundle["produtos"][["sku","ean13","produto","categoria","marca","unidade","preco_base"]]
-        return {**base,"sheets":[
-            {"name":"Vendas","data":df,"columns":[_col_def(c) for c in df.columns],"freeze":"B2","autofilter":True},
-            {"name":"Clientes","data":cli,"columns":[_col_def(c) for c in cli.columns],"freeze":"A2","autofilter":True},
-            {"name":"Produtos","data":prod,"columns":[_col_def(c) for c in prod.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Receita Total","value":float(bundle["dados"]["receita"].sum()),"fmt":"currency"},
-            {"label":"Itens Vendidos","value":int(bundle["dados"]["quantidade"].sum()),"fmt":"int"},
-            {"label":"Ticket Médio","value":float(bundle["dados"]["receita"].sum()/max(1,bundle["dados"]["quantidade"].sum())),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Receita por Categoria","data_sheet":"Vendas","index":["categoria"],"columns":[],"values":{"receita":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Receita por Categoria","y_title":"R$"}},
-        ]}
-
-    if tema=="Financeira":
-        df=bundle["titulos"][campos].copy(); sac=bundle["sacados"][["empresa","cnpj","cidade","uf","segmento"]]
-        return {**base,"sheets":[
-            {"name":"Títulos","data":df,"columns":[_col_def(c) for c in df.columns],"freeze":"A2","autofilter":True},
-            {"name":"Sacados","data":sac,"columns":[_col_def(c) for c in sac.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Carteira (face)","value":float(bundle["titulos"]["valor_face"].sum()),"fmt":"currency"},
-            {"label":"Recebido (líquido)","value":float(bundle["titulos"]["valor_liquido"].sum()),"fmt":"currency"},
-            {"label":"% Pago","value":float(bundle["titulos"]["pago"].mean()*100),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Carteira por UF","data_sheet":"Títulos","index":["uf"],"columns":[],"values":{"valor_face":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Carteira por UF","y_title":"R$"}},
-        ]}
-
-    if tema=="Logística":
-        df=bundle["embarques"][campos].copy()
-        sheets=[{"name":"Embarques","data":df,"columns":[_col_def(c) for c in df.columns],"freeze":"B2","autofilter":True}]
-        if "clientes" in bundle:
-            cli=bundle["clientes"][["empresa","cnpj","cidade","uf"]]
-            sheets.append({"name":"Clientes","data":cli,"columns":[_col_def(c) for c in cli.columns],"freeze":"A2","autofilter":True})
-        return {**base,"sheets":sheets,"kpis":[
-            {"label":"Frete Total","value":float(bundle["embarques"]["frete"].sum()),"fmt":"currency"},
-            {"label":"Peso Total (kg)","value":float(bundle["embarques"]["peso_kg"].sum()),"fmt":"float"},
-            {"label":"% Entregue","value":float(bundle["embarques"]["entregue"].mean()*100),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Frete por Modal","data_sheet":"Embarques","index":["modal"],"columns":[],"values":{"frete":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Frete por Modal","y_title":"R$"}},
-        ]}
-
-    if tema=="Agro":
-        df=bundle["colheita"][campos].copy(); ins=bundle["insumos"][["produtor","talhao","cultura","item","sku","qtd","custo_total"]]
-        prods=bundle["produtores"][["produtor","cnpj","cpf","cidade","uf"]]; cat=bundle["catalogo"][["sku","item","cultura","preco_base"]]
-        return {**base,"sheets":[
-            {"name":"Colheita","data":df,"columns":[_col_def(c) for c in df.columns],"freeze":"A2","autofilter":True},
-            {"name":"Insumos","data":ins,"columns":[_col_def(c) for c in ins.columns],"freeze":"A2","autofilter":True},
-            {"name":"Produtores","data":prods,"columns":[_col_def(c) for c in prods.columns],"freeze":"A2","autofilter":True},
-            {"name":"Catálogo","data":cat,"columns":[_col_def(c) for c in cat.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Receita Total","value":float(bundle["colheita"]["receita"].sum()),"fmt":"currency"},
-            {"label":"Área Total (ha)","value":float(bundle["colheita"]["area_ha"].sum()),"fmt":"float"},
-            {"label":"Produtividade Média (t/ha)","value":float(bundle["colheita"]["produtividade_t_ha"].mean()),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Receita por Cultura","data_sheet":"Colheita","index":["cultura"],"columns":[],"values":{"receita":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Receita por Cultura","y_title":"R$"}},
-        ]}
-
-    if tema=="Supermercado":
-        df=bundle["dados"][campos].copy()
-        return {**base,"sheets":[
-            {"name":"Vendas Super","data":df,"columns":[_col_def(c) for c in df.columns],"freeze":"B2","autofilter":True},
-        ],"kpis":[
-            {"label":"Receita (Super)","value":float(df.get('receita',pd.Series(dtype=float)).sum()),"fmt":"currency"},
-            {"label":"Itens","value":int(df.get('quantidade',pd.Series(dtype=float)).sum()),"fmt":"int"},
-        ],"pivots":[
-            {"name":"Itens por Loja","data_sheet":"Vendas Super","index":["loja"],"columns":[],"values":{"quantidade":"sum"},"fill_value":0,"round":0,"chart":{"type":"column","title":"Itens por Loja","y_title":"Unid"}},
-        ]}
-
-    if tema=="Estoque":
-        mov=bundle["mov"][campos].copy(); pos=bundle["posicao"]
-        return {**base,"sheets":[
-            {"name":"Movimentações","data":mov,"columns":[_col_def(c) for c in mov.columns],"freeze":"A2","autofilter":True},
-            {"name":"Posição","data":pos,"columns":[_col_def(c) for c in pos.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Saldo Total (itens)","value":int(pos["saldo"].sum()),"fmt":"int"},
-            {"label":"Valor Movimentado","value":float(mov["valor"].sum()),"fmt":"currency"},
-        ],"pivots":[
-            {"name":"Saldo por Categoria","data_sheet":"Posição","index":["categoria"],"columns":[],"values":{"saldo":"sum"},"fill_value":0,"round":0,"chart":{"type":"column","title":"Saldo por Categoria","y_title":"Unid"}},
-        ]}
-
-    # ----- novos temas -----
-    if tema=="Saúde":
-        cons=bundle["consultas"][campos].copy()
-        exams=bundle["exames"] if "exames" in bundle else pd.DataFrame()
-        sheets=[{"name":"Consultas","data":cons,"columns":[_col_def(c) for c in cons.columns],"freeze":"A2","autofilter":True}]
-        if not exams.empty:
-            sheets.append({"name":"Exames","data":exams,"columns":[_col_def(c) for c in exams.columns],"freeze":"A2","autofilter":True})
-        return {**base,"sheets":sheets,"kpis":[
-            {"label":"Faturamento Consultas","value":float(cons.get("valor",pd.Series(dtype=float)).sum()),"fmt":"currency"},
-            {"label":"% Pago","value":float(cons.get("pago",pd.Series(dtype=bool)).mean()*100 if "pago" in cons else 0.0),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Valor por Especialidade","data_sheet":"Consultas","index":["especialidade"],"columns":[],"values":{"valor":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Valor por Especialidade","y_title":"R$"}},
-        ]}
-
-    if tema=="Educação":
-        aval=bundle["avaliacoes"][campos].copy()
-        mats=bundle["matriculas"]
-        return {**base,"sheets":[
-            {"name":"Avaliações","data":aval,"columns":[_col_def(c) for c in aval.columns],"freeze":"A2","autofilter":True},
-            {"name":"Matrículas","data":mats,"columns":[_col_def(c) for c in mats.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Média Geral","value":float(aval["nota"].mean()),"fmt":"float"},
-            {"label":"Presença Média (%)","value":float(aval["frequencia_pct"].mean()),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Média por Disciplina","data_sheet":"Avaliações","index":["disciplina"],"columns":[],"values":{"nota":"mean"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Média por Disciplina","y_title":"Nota"}},
-        ]}
-
-    if tema=="Televisão":
-        aud=bundle["audiencia"][campos].copy(); com=bundle["comerciais"]
-        return {**base,"sheets":[
-            {"name":"Audiência","data":aud,"columns":[_col_def(c) for c in aud.columns],"freeze":"A2","autofilter":True},
-            {"name":"Comerciais","data":com,"columns":[_col_def(c) for c in com.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Pontos Médios","value":float(aud["audiencia_pontos"].mean()),"fmt":"float"},
-            {"label":"Share Médio (%)","value":float(aud["share_pct"].mean()),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Audiência por Emissora","data_sheet":"Audiência","index":["emissora"],"columns":[],"values":{"audiencia_pontos":"mean"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Pontos médios por Emissora","y_title":"Pontos"}},
-        ]}
-
-    if tema=="Informática":
-        tk=bundle["tickets"][campos].copy(); at=bundle["ativos"]
-        return {**base,"sheets":[
-            {"name":"Tickets","data":tk,"columns":[_col_def(c) for c in tk.columns],"freeze":"B2","autofilter":True},
-            {"name":"Ativos","data":at,"columns":[_col_def(c) for c in at.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"% Resolvidos","value":float(tk["status"].eq("Resolvido").mean()*100),"fmt":"float"},
-            {"label":"Satisfação Média","value":float(pd.to_numeric(tk["satisfacao"], errors="coerce").mean()),"fmt":"float"},
-            {"label":"TMA (h)","value":float(pd.to_numeric(tk["tempo_atendimento_h"], errors="coerce").mean()),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Tickets por Categoria","data_sheet":"Tickets","index":["categoria"],"columns":[],"values":{"ticket":"count"},"fill_value":0,"round":0,"chart":{"type":"column","title":"Tickets por Categoria","y_title":"Qtde"}},
-        ]}
-
-    if tema=="Odontologia":
-        at=bundle["atendimentos"][campos].copy()
-        return {**base,"sheets":[
-            {"name":"Atendimentos","data":at,"columns":[_col_def(c) for c in at.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Faturamento Odonto","value":float(at["valor"].sum()),"fmt":"currency"},
-            {"label":"% Pago","value":float(at["pago"].mean()*100),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Valor por Procedimento","data_sheet":"Atendimentos","index":["procedimento"],"columns":[],"values":{"valor":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Valor por Procedimento","y_title":"R$"}},
-        ]}
-
-    if tema=="Restaurante":
-        pdv=bundle["pedidos"][campos].copy()
-        return {**base,"sheets":[
-            {"name":"Pedidos","data":pdv,"columns":[_col_def(c) for c in pdv.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Faturamento","value":float(pdv["total"].sum()),"fmt":"currency"},
-            {"label":"Ticket Médio","value":float(pdv["total"].mean()),"fmt":"currency"},
-            {"label":"Itens Vendidos","value":int(pdv["quantidade"].sum()),"fmt":"int"},
-        ],"pivots":[
-            {"name":"Vendas por Categoria","data_sheet":"Pedidos","index":["categoria"],"columns":[],"values":{"total":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Vendas por Categoria","y_title":"R$"}},
-        ]}
-
-    if tema=="Construção":
-        ob=bundle["obras"][campos].copy(); comp=bundle["compras"]
-        return {**base,"sheets":[
-            {"name":"Obras","data":ob,"columns":[_col_def(c) for c in ob.columns],"freeze":"A2","autofilter":True},
-            {"name":"Compras","data":comp,"columns":[_col_def(c) for c in comp.columns],"freeze":"A2","autofilter":True},
-        ],"kpis":[
-            {"label":"Desvio Orçamentário (R$)","value":float((ob["custo_real"]-ob["custo_orcado"]).sum()),"fmt":"currency"},
-            {"label":"% Conclusão Média","value":float(ob["progresso_pct"].mean()),"fmt":"float"},
-        ],"pivots":[
-            {"name":"Custo por Etapa","data_sheet":"Obras","index":["etapa"],"columns":[],"values":{"custo_real":"sum"},"fill_value":0,"round":2,"chart":{"type":"column","title":"Custo por Etapa","y_title":"R$"}},
-        ]}
-
-    raise ValueError("Tema não suportado")
-
-# ========= API =========
-_TEMAS = {
-    "Market": dataset_market,
-    "Financeira": dataset_financeira,
-    "Logística": dataset_logistica,
-    "Agro": dataset_agro,
-    "Supermercado": dataset_supermercado,
-    "Estoque": dataset_estoque,
-    # novos
-    "Saúde": dataset_saude,
-    "Educação": dataset_educacao,
-    "Televisão": dataset_televisao,
-    "Informática": dataset_informatica,
-    "Odontologia": dataset_odontologia,
-    "Restaurante": dataset_restaurante,
-    "Construção": dataset_construcao,
-}
-
-ALIASES = {
-    "market":"Market","mercado":"Market",
-    "financeira":"Financeira",
-    "logistica":"Logística","logística":"Logística",
-    "agro":"Agro",
-    "supermercado":"Supermercado","super-mercado":"Supermercado",
-    "estoque":"Estoque",
-
-    "saude":"Saúde","saúde":"Saúde","clinica":"Saúde","clínica":"Saúde",
-    "educacao":"Educação","educação":"Educação","escola":"Educação",
-    "televisao":"Televisão","televisão":"Televisão","tv":"Televisão",
-    "informatica":"Informática","informática":"Informática","helpdesk":"Informática","ti":"Informática",
-    "odontologia":"Odontologia","odonto":"Odontologia",
-    "restaurante":"Restaurante","bar":"Restaurante","lanchonete":"Restaurante",
-    "construcao":"Construção","construção":"Construção","obra":"Construção",
-}
-
-PERFIS = ["Básico","Completo","Personalizado"]
-
-def listar_temas()->List[str]: return list(_TEMAS.keys())
-
-def gerar_excel_tema(tema: str, n_linhas: int, campos: List[str], output_path: str, estilo="Azul") -> str:
-    if tema not in _TEMAS: raise ValueError(f"Tema inválido. Opções: {listar_temas()}")
-    bundle=_TEMAS[tema](n_linhas)
-    spec=build_spec_from_bundle(tema, bundle, campos)
-    gerar_planilha(spec, output_path, estilo_key=estilo)
-    return output_path
-
-# ========= seleção / CLI =========
-def normaliza_tema(v: str)->str:
-    key=v.strip().lower()
-    if key in ALIASES: return ALIASES[key]
-    for k in _TEMAS.keys():
-        if key==k.lower(): return k
-    raise ValueError(f"Tema inválido: {v}. Opções: {', '.join(listar_temas())}")
-
-def resolve_campos_por_perfil(tema: str, perfil: str, expr: Optional[str]=None)->List[str]:
-    if perfil.lower().startswith("b"): return list(PERFIL_IDX[tema]["basico"])
-    if perfil.lower().startswith("c"): return list(PERFIL_IDX[tema]["completo"])
-    todos=CAMPOS_TEMA[tema]
-    if expr is None:
-        print("\nSelecione campos (números, vírgulas, intervalos com '-').")
-        for i,c in enumerate(todos,1): print(f"  {i}) {c}")
-        expr=input("Ex.: 1-5,8,10 (ENTER=todos): ").strip()
-    idxs=parse_ranges_to_indices(expr, len(todos))
-    if not idxs: idxs=list(range(len(todos)))
-    return [todos[i] for i in idxs]
-
-def modo_interativo():
-    temas=listar_temas(); estilos=list(ESTILOS.keys())
-    tema=temas[prompt_menu("Tema", temas, 0)]
-    linhas=prompt_int("Quantidade de linhas", 1000, 1)
-    estilo=estilos[prompt_menu("Estilo", estilos, 0)]
-    perfil=PERFIS[prompt_menu("Perfil de saída", PERFIS, 0)]
-    campos = resolve_campos_por_perfil(tema, perfil)
-    saida=input("Arquivo de saída (padrão: saida.xlsx): ").strip() or "saida.xlsx"
-    print("\nGerando...")
-    caminho=gerar_excel_tema(tema, linhas, campos, saida, estilo=estilo)
-    print(f"✅ Planilha gerada: {caminho}")
-
-def modo_argparse():
-    import argparse
-    p=argparse.ArgumentParser(description="Gerador XLSX multi-temas (PT-BR), com estilos e campos personalizáveis")
-    p.add_argument("--tema", default="Market")
-    p.add_argument("--linhas", type=int, default=1000)
-    p.add_argument("--saida", default="saida.xlsx")
-    p.add_argument("--perfil", default="basico", choices=["basico","completo","personalizado","básico","completo","personalizado"])
-    p.add_argument("--campos", default=None, help="Para perfil personalizado. Ex.: '1-5,8,10'")
-    p.add_argument("--estilo", default="Azul", choices=list(ESTILOS.keys()))
-    p.add_argument("--nao_interativo", action="store_true")
-    args=p.parse_args()
-
-    tema=normaliza_tema(args.tema)
-    perfil="Básico" if args.perfil.startswith("b") else "Completo" if args.perfil.startswith("c") else "Personalizado"
-    campos = resolve_campos_por_perfil(tema, perfil, expr=args.campos if (args.nao_interativo or perfil=="Personalizado") else None)
-    caminho=gerar_excel_tema(tema, args.linhas, campos, args.saida, estilo=args.estilo)
-    print(f"✅ Planilha gerada: {caminho}")
-
-if __name__=="__main__":
-    if len(sys.argv)==1: modo_interativo()
-    else: modo_argparse()
+# -*- coding: utf-8 -*-
+"""
+Gerador_Planilhas.py — multi-temas com estilos
+"""
+from __future__ import annotations  # anotações com pd.* não importam o pandas
+
+import os, re, sys, json, time, itertools, zlib, importlib.util
+from typing import Dict, Any, List, Tuple, Optional
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+import numpy as np  # as tabelas do módulo (_Amostrador, pesos, constantes) são numpy: fica no import
+
+# ========= imports sob demanda =========
+# pandas (e Faker, mais abaixo) só carregam quando um caminho precisa deles: --help, --listar-temas
+# e o import do módulo não pagam por eles. O orçamento de import é medido por medir_importacao().
+class _ModuloPreguicoso:
+    """Importa o módulo no primeiro acesso a um atributo e troca a global pelo módulo de verdade."""
+    def __init__(self, nome: str, apelido: str): self._nome, self._apelido = nome, apelido
+    def __getattr__(self, attr: str):
+        mod=importlib.import_module(self._nome); globals()[self._apelido]=mod
+        return getattr(mod, attr)
+
+pd = _ModuloPreguicoso("pandas", "pd")
+
+# ========= util de prompt =========
+def prompt_menu(title: str, options: List[str], default_idx: Optional[int]=None) -> int:
+    print(f"\n{title}")
+    for i,opt in enumerate(options,1):
+        print(f"  {i}) {opt}")
+    while True:
+        resp = input(f"Escolha [1-{len(options)}]{f' (padrão {default_idx+1})' if default_idx is not None else ''}: ").strip()
+        if not resp and default_idx is not None: return default_idx
+        if resp.isdigit():
+            idx=int(resp)-1
+            if 0<=idx<len(options): return idx
+        print("Entrada inválida.")
+
+def prompt_int(msg: str, default: Optional[int]=None, min_val: Optional[int]=None, max_val: Optional[int]=None) -> int:
+    while True:
+        s = input(f"{msg}{f' (padrão {default})' if default is not None else ''}: ").strip()
+        if not s and default is not None: return default
+        try:
+            v=int(s)
+            if (min_val is not None and v<min_val) or (max_val is not None and v>max_val):
+                print("Fora do intervalo."); continue
+            return v
+        except: print("Número inválido.")
+
+def parse_ranges_to_indices(expr: str, total: int) -> List[int]:
+    if not expr: return list(range(total))
+    parts=[p.strip() for p in expr.split(",") if p.strip()]
+    idxs=set()
+    for p in parts:
+        if "-" in p:
+            a,b=p.split("-",1)
+            if a.isdigit() and b.isdigit():
+                a,b=int(a),int(b)
+                for k in range(min(a,b),max(a,b)+1):
+                    if 1<=k<=total: idxs.add(k-1)
+        elif p.isdigit():
+            k=int(p); 
+            if 1<=k<=total: idxs.add(k-1)
+    return sorted(idxs)
+
+# ========= estilos =========
+ESTILOS = {
+    "Azul":   {"header_bg":"#E8F1FF","kpi_bg":"#DCEBFF","zebra":"#F7FAFF","neg":"#FCE8E6","pos":"#E6F4EA","scale_min":"#E8F1FF","scale_max":"#2B6CB0","tabela":"Table Style Medium 2"},
+    "Verde":  {"header_bg":"#E9F7EF","kpi_bg":"#D4EFDF","zebra":"#F5FBF7","neg":"#FDEDEC","pos":"#E8F8F5","scale_min":"#E9F7EF","scale_max":"#1E8449","tabela":"Table Style Medium 7"},
+    "Cinza":  {"header_bg":"#F0F0F0","kpi_bg":"#E6E6E6","zebra":"#FAFAFA","neg":"#FDEDEC","pos":"#EBF5FB","scale_min":"#F0F0F0","scale_max":"#5D6D7E","tabela":"Table Style Medium 4"},
+    "Laranja":{"header_bg":"#FFF1E6","kpi_bg":"#FFE0CC","zebra":"#FFF9F3","neg":"#FDECEA","pos":"#FFF7E6","scale_min":"#FFF1E6","scale_max":"#D35400","tabela":"Table Style Medium 3"},
+}
+
+# ========= métricas (eventos por etapa) =========
+# Cada etapa instrumentada emite, ao terminar, um evento {"etapa", "caminho", "segundos",
+# "memoria_delta_mb", "linhas", "nome", ...} para os ouvintes registrados. Sem ouvintes, não mede nada.
+_OUVINTES: List[Any] = []
+_PILHA_ETAPAS: List[str] = []
+
+def registrar_ouvinte(fn):
+    _OUVINTES.append(fn); return fn
+
+def remover_ouvinte(fn) -> None:
+    if fn in _OUVINTES: _OUVINTES.remove(fn)
+
+def _pico_rss_mb() -> float:
+    import resource
+    pico=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico/(1024*1024) if sys.platform=="darwin" else pico/1024  # bytes no macOS, KiB no Linux
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")/2**20
+    except (OSError, ValueError, AttributeError):
+        return _pico_rss_mb()  # fora do Linux, o pico é o que há
+
+def _emitir(etapa: str, segundos: float, **info) -> None:
+    caminho="/".join(_PILHA_ETAPAS+[f"{etapa}:{info['nome']}" if "nome" in info else etapa])
+    evento={"etapa":etapa, "caminho":caminho, **info, "segundos":round(segundos, 6)}
+    for fn in list(_OUVINTES): fn(evento)
+
+@contextmanager
+def _etapa(etapa: str, **info):
+    """Mede o bloco; o chamador pode completar o evento pelo dict devolvido (ex.: info["linhas"]=...)."""
+    if not _OUVINTES:
+        yield info; return
+    rss0=_rss_mb(); t0=time.perf_counter()
+    _PILHA_ETAPAS.append(f"{etapa}:{info['nome']}" if "nome" in info else etapa)
+    try: yield info
+    finally:
+        _PILHA_ETAPAS.pop()
+        _emitir(etapa, time.perf_counter()-t0, **info, memoria_delta_mb=round(_rss_mb()-rss0, 2))
+
+def _salvar_perfil(prof, caminho: str) -> None:
+    import pstats, io
+    if caminho.endswith(".txt"):
+        out=io.StringIO(); pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(60)
+        with open(caminho, "w", encoding="utf-8") as f: f.write(out.getvalue())
+    else: prof.dump_stats(caminho)  # formato pstats (snakeviz, gprof2dot, ...)
+
+@contextmanager
+def _sem_metricas():
+    yield []
+
+@contextmanager
+def coletar_metricas(perfil: Optional[str]=None):
+    """Junta os eventos emitidos dentro do bloco numa lista. Com perfil=arquivo, roda também o
+    cProfile e grava o resultado (.prof no formato pstats, .txt como relatório legível)."""
+    eventos: List[Dict[str, Any]]=[]; ouvinte=eventos.append; prof=None
+    registrar_ouvinte(ouvinte)
+    if perfil:
+        import cProfile
+        prof=cProfile.Profile(); prof.enable()
+    try: yield eventos
+    finally:
+        if prof is not None: prof.disable(); _salvar_perfil(prof, perfil)
+        remover_ouvinte(ouvinte)
+
+# ========= motor xlsx =========
+def _excel_cell_to_tuple(cell_ref: str) -> Tuple[int,int]:
+    col=0; row=0
+    for c in cell_ref:
+        if c.isalpha(): col=col*26 + (ord(c.upper())-ord('A'))+1
+        else: row=row*10 + int(c)
+    return (row-1, col-1)
+
+def _apply_common_formats(workbook, estilo_key: str):
+    pal = ESTILOS[estilo_key]
+    fmt = {
+        "text":   workbook.add_format({'text_wrap':False}),
+        "int":    workbook.add_format({'num_format':'#,##0'}),
+        "float":  workbook.add_format({'num_format':'#,##0.00'}),
+        "money":  workbook.add_format({'num_format':'R$ #,##0.00'}),
+        "date":   workbook.add_format({'num_format':'yyyy-mm-dd'}),
+        "header": workbook.add_format({'bold':True,'bg_color':pal["header_bg"],'border':1}),
+        "kpi_lbl":workbook.add_format({'bold':True}),
+        "kpi_val":workbook.add_format({'num_format':'#,##0.00','bold':True,'bg_color':pal["kpi_bg"],'border':1}),
+        "zebra":  workbook.add_format({'bg_color':pal["zebra"]}),
+        "alerta": workbook.add_format({'bg_color':pal["neg"]}),
+    }
+    return fmt, pal
+
+def _preparar_aba(ws, sh: Dict[str, Any], colunas: List[str], fmt) -> None:
+    for i, colname in enumerate(colunas):
+        ws.write(0, i, colname, fmt["header"])
+    for col in sh.get('columns', []):
+        colname=col.get('name'); width=col.get('width',15); f=col.get('fmt','text')
+        if colname in colunas:
+            ci=colunas.index(colname)
+            base = fmt["text"] if f=="text" else fmt.get("money" if f=="currency" else f, fmt["text"])
+            ws.set_column(ci, ci, width, base)
+    if sh.get('freeze'): ws.freeze_panes(*_excel_cell_to_tuple(sh['freeze']))
+
+def _opcoes_aba(spec: Dict[str, Any], estilo_key: str, rapido: bool=False, alertas_hoje: bool=False, tabelas: bool=True) -> Dict[str, Any]:
+    """rapido: faixas zebradas por estilo de tabela (ou nenhuma, se a tabela não for possível)
+    em vez de formatação condicional; alertas_hoje: compara datas com HOJE() (volátil) e não
+    com a data de referência da geração."""
+    ref=spec.get("workbook", {}).get("created_at") or datetime.now()
+    return {"hoje": "TODAY()" if alertas_hoje else f"DATE({ref.year},{ref.month},{ref.day})",
+            "rapido": rapido, "tabela": ESTILOS[estilo_key]["tabela"] if tabelas else None}
+
+def _finalizar_aba(ws, sh: Dict[str, Any], colunas: List[str], n_linhas: int, fmt, opc: Dict[str, Any]) -> None:
+    # regras com referência relativa à linha 2 ($H2): o Excel ajusta a linha sozinho, sem INDIRECT/ADDRESS
+    from xlsxwriter.utility import xl_col_to_name
+    ult_col=len(colunas)-1; hoje=opc["hoje"]
+    col=lambda nome: f"${xl_col_to_name(colunas.index(nome))}2"
+    if opc["rapido"] and opc["tabela"] and n_linhas>0:
+        ws.add_table(0,0, n_linhas, ult_col, {'style':opc["tabela"], 'autofilter':sh.get('autofilter', True),
+                                              'columns':[{'header':c, 'header_format':fmt["header"]} for c in colunas]})
+    elif sh.get('autofilter', True) and n_linhas>0:
+        ws.autofilter(0,0, n_linhas, ult_col)
+    if n_linhas>0 and not opc["rapido"]:
+        ws.conditional_format(1,0, n_linhas, ult_col, {'type':'formula','criteria':'=MOD(ROW(),2)=0','format':fmt["zebra"]})
+    if "validade" in colunas and n_linhas>0:
+        ws.conditional_format(1,0, n_linhas, ult_col, {'type':'formula','criteria':f'={col("validade")}<={hoje}+7','format':fmt["alerta"]})
+    if {"vencimento","pago"}.issubset(colunas) and n_linhas>0:
+        ws.conditional_format(1,0, n_linhas, ult_col, {'type':'formula','criteria':f'=AND({hoje}>{col("vencimento")},{col("pago")}=FALSE)','format':fmt["alerta"]})
+
+def _escrever_kpis(ws, kpis_spec: List[Dict[str, Any]], fmt) -> None:
+    ws.write(0,0,"KPIs", fmt["header"]); r=2
+    for k in kpis_spec:
+        ws.write(r,0,k.get("label","KPI"), fmt["kpi_lbl"])
+        if "formula" in k:
+            ws.write_formula(r,1,k["formula"], fmt["kpi_val"])
+        else:
+            val=k.get("value",""); f=k.get("fmt","text")
+            cellfmt = fmt["kpi_val"] if f in ("float","int","currency") else fmt["text"]
+            if isinstance(val, float) and not np.isfinite(val): ws.write_string(r,1,"-", cellfmt)  # média de zero linhas
+            else: ws.write(r,1,val, cellfmt)
+        r+=1
+
+def _fonte_pivo(src: pd.DataFrame, pv: Dict[str, Any]) -> pd.DataFrame:
+    # só as colunas do pivô; inteiros compactos (int16, Int8) somam em 64 bits
+    vals=list(pv.get('values', {'valor':'sum'})); df=src[list(pv.get('index',[]))+list(pv.get('columns',[]))+vals]
+    return df.astype({c: (np.int64 if isinstance(df[c].dtype, np.dtype) else "Int64") for c in vals if pd.api.types.is_integer_dtype(df[c].dtype)})
+
+def _pivo_df(src: pd.DataFrame, pv: Dict[str, Any]) -> pd.DataFrame:
+    pvt=pd.pivot_table(
+        _fonte_pivo(src, pv), observed=True,
+        index=pv.get('index',[]),
+        columns=pv.get('columns',[]),
+        values=list(pv.get('values', {'valor':'sum'}).keys()),
+        aggfunc=pv.get('values', {'valor':'sum'}),
+        fill_value=pv.get('fill_value',0)
+    )
+    return _pivo_formatar(pvt, pv)
+
+def _pivo_formatar(pvt: pd.DataFrame, pv: Dict[str, Any]) -> pd.DataFrame:
+    if isinstance(pvt.columns, pd.MultiIndex):
+        pvt.columns=[' | '.join(map(str,c)).strip() for c in pvt.columns.values]
+    pvt=pvt.reset_index()
+    rnd=pv.get('round')
+    if isinstance(rnd,int):
+        nums=pvt.select_dtypes(include=[np.number]).columns; pvt[nums]=pvt[nums].round(rnd)
+    return pvt
+
+def _pivos_spec(spec: Dict[str, Any], nome_df: Dict[str, pd.DataFrame], pular=lambda pv: False) -> Dict[str, Optional[pd.DataFrame]]:
+    """Pivôs do spec sobre as abas já montadas; None quando a aba está vazia ou pular(pv) (ex.: pivô que vira view)."""
+    pivos={}
+    for pv in spec.get('pivots', []):
+        src=nome_df.get(pv['data_sheet'])
+        if src is not None: pivos[pv['name']]=None if src.empty or pular(pv) else _pivo_df(src, pv)
+    return pivos
+
+def _cabecalho_pivo(ws, pvt: pd.DataFrame, fmt) -> None:
+    for i,colname in enumerate(pvt.columns):
+        ws.write(0,i,colname, fmt["header"]); ws.set_column(i,i,max(12,len(str(colname))+2))
+
+def _grafico_pivo(workbook, ws, name: str, pvt: pd.DataFrame, pv: Dict[str, Any]) -> None:
+    ch=pv.get('chart')
+    if ch and not pvt.empty:
+        chart=workbook.add_chart({'type': ch.get('type','column')})
+        for col_idx in range(1,pvt.shape[1]):
+            chart.add_series({'name':[name,0,col_idx],'categories':[name,1,0,pvt.shape[0],0],'values':[name,1,col_idx,pvt.shape[0],col_idx]})
+        chart.set_title({'name': ch.get('title',name)})
+        chart.set_y_axis({'name': ch.get('y_title','')})
+        ws.insert_chart('B8', chart, {'x_scale':1.2,'y_scale':1.2})
+
+# ========= escrita tipada (sem DataFrame.to_excel) =========
+# Cada coluna vai pelo método do xlsxwriter do seu tipo (write_number, write_string, write_boolean),
+# só nas linhas com valor: nulos ficam vazios sem teste por célula. Datas viram o número serial do
+# Excel, calculado em bloco, com o formato de data; as demais células usam o formato da coluna.
+_EPOCA_EXCEL = np.datetime64("1899-12-31", "us")
+
+def _serial_excel(v: np.ndarray) -> np.ndarray:
+    # a conta do xlsxwriter (dias + segundos/86400, +1 pelo 29/02/1900 do Excel), vetorizada
+    us=(v.astype("datetime64[us]")-_EPOCA_EXCEL).astype(np.int64)
+    dias, resto = np.divmod(us, 86_400_000_000); seg, micro = np.divmod(resto, 1_000_000)
+    x=dias+(seg.astype(float)+micro/1e6)/86400
+    return np.where(x>59, x+1, x)
+
+def _escrever_em(metodo, c: int, linhas: np.ndarray, vals, cell_fmt=None) -> None:
+    for r, v in zip(linhas.tolist(), vals): metodo(r, c, v, cell_fmt)
+
+def _escrever_generico(ws, c: int, linhas: np.ndarray, vals, fmt) -> None:
+    # objetos misturados: o que o ExcelWriter do pandas faria com cada valor
+    for r, v in zip(linhas.tolist(), vals):
+        if isinstance(v, np.generic): v=v.item()
+        if isinstance(v, datetime) or type(v).__name__=="date": ws.write_datetime(r, c, v, fmt["date"])
+        elif isinstance(v, (str, bool, int, float)): ws.write(r, c, v)
+        else: ws.write_string(r, c, str(v))
+
+def _escrever_coluna(ws, c: int, s: pd.Series, linha0: int, fmt) -> None:
+    linhas=np.arange(linha0, linha0+len(s)); dt=s.dtype
+    if isinstance(dt, pd.CategoricalDtype):
+        cod=s.cat.codes.to_numpy(); ok=cod>=0; cats=np.asarray(s.cat.categories, dtype=object)
+        if pd.api.types.infer_dtype(cats)=="string": return _escrever_em(ws.write_string, c, linhas[ok], cats[cod[ok]].tolist())
+        s=s.astype(object); dt=s.dtype
+    ok=s.notna().to_numpy()
+    if not ok.all(): linhas=linhas[ok]
+    if pd.api.types.is_datetime64_any_dtype(dt):
+        _escrever_em(ws.write_number, c, linhas, _serial_excel(s.to_numpy()[ok]).tolist(), fmt["date"])
+    elif pd.api.types.is_bool_dtype(dt):
+        _escrever_em(ws.write_boolean, c, linhas, s.to_numpy(dtype=bool, na_value=False)[ok].tolist())
+    elif pd.api.types.is_integer_dtype(dt):
+        _escrever_em(ws.write_number, c, linhas, s.to_numpy(dtype=np.int64, na_value=0)[ok].tolist())
+    elif pd.api.types.is_float_dtype(dt):
+        a=s.to_numpy(dtype=float, na_value=np.nan)[ok]; fin=np.isfinite(a)
+        if fin.all(): return _escrever_em(ws.write_number, c, linhas, a.tolist())
+        _escrever_em(ws.write_number, c, linhas[fin], a[fin].tolist())
+        _escrever_em(ws.write_string, c, linhas[~fin], np.where(a[~fin]>0, "inf", "-inf").tolist())  # inf_rep do pandas
+    else:
+        vals=s.to_numpy(dtype=object)[ok]
+        if pd.api.types.infer_dtype(vals, skipna=False)=="string": _escrever_em(ws.write_string, c, linhas, vals.tolist())
+        else: _escrever_generico(ws, c, linhas, vals, fmt)
+
+def _escrever_tabela(ws, df: pd.DataFrame, linha0: int, fmt) -> None:
+    """Escreve df (sem cabeçalho) a partir de linha0, coluna a coluna."""
+    for c in range(df.shape[1]): _escrever_coluna(ws, c, df.iloc[:, c], linha0, fmt)
+
+# ========= divisão de abas grandes =========
+EXCEL_MAX_LINHAS = 1_048_576
+MAX_LINHAS_ABA = EXCEL_MAX_LINHAS - 1  # uma linha fica para o cabeçalho
+
+def _validar_divisao(max_linhas_aba: int, dividir_em: str) -> None:
+    if not 1 <= max_linhas_aba <= MAX_LINHAS_ABA: raise ValueError(f"max_linhas_aba deve estar entre 1 e {MAX_LINHAS_ABA}")
+    if dividir_em not in ("abas","arquivos"): raise ValueError("dividir_em deve ser 'abas' ou 'arquivos'")
+
+def _nome_parte(nome: str, k: int) -> str:
+    if k==1: return nome
+    suf=f" ({k})"; return nome[:31-len(suf)] + suf
+
+def _arquivo_parte(output_path: str, k: int) -> str:
+    base, ext = os.path.splitext(output_path); return f"{base}_{k}{ext}"
+
+def gerar_planilha(spec: Dict[str, Any], output_path: str, estilo_key: str="Azul", max_linhas_aba: int=MAX_LINHAS_ABA, dividir_em: str="abas",
+                   rapido: bool=False, alertas_hoje: bool=False, processos: int=1, abas_paralelas: bool=False) -> None:
+    """Grava o spec em XLSX. Tabelas com mais de max_linhas_aba linhas são divididas em
+    'Aba', 'Aba (2)', ... no mesmo arquivo ou, com dividir_em='arquivos', em saida_2.xlsx, ...
+    Pivôs e KPIs sempre consideram a tabela inteira. Com abas_paralelas e processos>1, as abas
+    de dados grandes são escritas em paralelo (ver _xml_aba)."""
+    import xlsxwriter
+    _validar_divisao(max_linhas_aba, dividir_em)
+    ex=None; fora={}  # índice da aba no workbook -> future de _xml_aba
+    sheets_spec = spec.get('sheets', [])
+    if abas_paralelas and processos>1 and any(min(len(sh.get('data', [])), max_linhas_aba)>=LINHAS_ABA_PARALELA for sh in sheets_spec):
+        from concurrent.futures import ProcessPoolExecutor
+        ex=ProcessPoolExecutor(processos)
+    pivots_spec = spec.get('pivots', [])
+    kpis_spec   = spec.get('kpis', [])
+    dashboard_name = spec.get('dashboard_name', 'Dashboard')
+    workbook = xlsxwriter.Workbook(output_path)
+    try:
+        _propriedades(workbook, spec)
+        fmt, pal = _apply_common_formats(workbook, estilo_key)
+        opc = _opcoes_aba(spec, estilo_key, rapido, alertas_hoje)
+        name_to_df = {}; extras = {}
+
+        # abas
+        for sh in sheets_spec:
+            name = sh['name']; df = sh.get('data', pd.DataFrame())
+            if isinstance(df, list): df = pd.DataFrame(df)
+            name_to_df[name]=df if sh.get('tabela') is None else sh['tabela']
+            partes = [df.iloc[i:i+max_linhas_aba] for i in range(0, len(df), max_linhas_aba)] or [df]
+            for k, parte in enumerate(partes, 1):
+                if k>1 and dividir_em=="arquivos":
+                    extras.setdefault(k, []).append((sh, parte)); continue
+                if ex is not None and len(parte)>=LINHAS_ABA_PARALELA:
+                    fora[len(workbook.worksheets())+1]=ex.submit(_xml_aba, (sh, parte, estilo_key))
+                    _escrever_aba_df(workbook, fmt, opc, sh, _nome_parte(name, k), parte.iloc[:0], n_linhas=len(parte))
+                    _reservar_estilos(workbook.worksheets()[-1], parte, fmt); continue
+                _escrever_aba_df(workbook, fmt, opc, sh, _nome_parte(name, k), parte)
+
+        # KPIs
+        if kpis_spec:
+            with _etapa("kpis", linhas=len(kpis_spec)):
+                ws = workbook.get_worksheet_by_name(dashboard_name) or workbook.add_worksheet(dashboard_name)
+                _escrever_kpis(ws, kpis_spec, fmt)
+
+        # pivôs
+        for pv in pivots_spec:
+            name=pv['name']; src_sheet=pv['data_sheet']
+            if src_sheet not in name_to_df: continue
+            src=name_to_df[src_sheet]; ws=workbook.add_worksheet(name)
+            if src.empty: continue
+            with _etapa("pivo", nome=name) as ev:
+                pvt=_pivo_df(src, pv); ev["linhas"]=len(pvt)
+                _escrever_tabela(ws, pvt, 1, fmt)
+                _cabecalho_pivo(ws, pvt, fmt)
+                _grafico_pivo(workbook, ws, name, pvt, pv)
+    except BaseException:
+        if ex is not None: ex.shutdown(cancel_futures=True)
+        raise
+    finally:
+        with _etapa("salvar"): workbook.close()  # o xlsxwriter monta o XML e o zip só aqui
+    if ex is not None:
+        with ex:
+            if fora:
+                with _etapa("abas_paralelas", linhas=len(fora)): _trocar_abas(output_path, {i: f.result() for i, f in fora.items()}, fmt)
+
+    for k, partes in sorted(extras.items()):
+        workbook = xlsxwriter.Workbook(_arquivo_parte(output_path, k))
+        try:
+            _propriedades(workbook, spec)
+            fmt, pal = _apply_common_formats(workbook, estilo_key)
+            for sh, parte in partes: _escrever_aba_df(workbook, fmt, opc, sh, _nome_parte(sh['name'], k), parte)
+        finally: workbook.close()
+
+def _escrever_aba_df(workbook, fmt, opc, sh: Dict[str, Any], nome: str, df: pd.DataFrame, n_linhas: Optional[int]=None) -> None:
+    # n_linhas: linhas que a aba terá quando os dados vêm de fora (abas em paralelo); df chega vazio
+    n_linhas=df.shape[0] if n_linhas is None else n_linhas
+    with _etapa("aba", nome=nome, linhas=n_linhas):
+        ws = workbook.add_worksheet(nome)
+        _escrever_tabela(ws, df, 1, fmt)
+        _preparar_aba(ws, sh, list(df.columns), fmt)
+        with _etapa("formatos", nome=nome): _finalizar_aba(ws, sh, list(df.columns), n_linhas, fmt, opc)
+
+def _propriedades(workbook, spec: Dict[str, Any]) -> None:
+    wb_props = spec.get('workbook', {})
+    workbook.set_properties({k:v for k,v in {"title":wb_props.get("title"),"author":wb_props.get("author"),"created":wb_props.get("created_at")}.items() if v is not None})
+
+# ========= abas em paralelo =========
+# Opcional (abas_paralelas, --abas-paralelas): cada aba de dados grande é escrita num processo à parte,
+# num workbook próprio em constant_memory (strings inline, sem sharedStrings). O workbook principal monta
+# o resto (estilos, formatação condicional, filtros, tabelas, KPIs, pivôs e gráficos) com a aba só com o
+# cabeçalho; no fim, o <sheetData> e o <dimension> de cada aba feita fora substituem os dela no zip.
+# Os valores e formatos são os da escrita serial, mas os bytes não: por isso não é o padrão com --processos.
+LINHAS_ABA_PARALELA = 10_000  # abas menores ficam no processo principal
+
+def _reservar_estilos(ws, df: pd.DataFrame, fmt) -> None:
+    # a aba feita fora usa, além dos formatos de coluna e do cabeçalho, o de data: uma célula em branco com
+    # ele garante o estilo no styles.xml do principal (o <sheetData> desta aba é trocado no fim)
+    for c in range(df.shape[1]):
+        if pd.api.types.is_datetime64_any_dtype(df.iloc[:, c].dtype): ws.write_blank(1, c, None, fmt["date"])
+
+def _indices_estilo(fmt) -> Dict[str, Optional[int]]:
+    # Format.xf_index: número do estilo no styles.xml, preenchido pelo xlsxwriter ao fechar o workbook
+    return {k: f.xf_index for k, f in fmt.items()}
+
+def _trecho_xml(xml: str, tag: str) -> Tuple[int, int]:
+    # início e fim do primeiro elemento <tag .../> ou <tag ...>...</tag>
+    a=xml.index("<"+tag); fecha=xml.index(">", a)
+    if xml[fecha-1]=="/": return a, fecha+1
+    return a, xml.index(f"</{tag}>", fecha)+len(tag)+3
+
+def _xml_aba(tarefa) -> Tuple[str, str, Dict[int, str]]:
+    """(dimension, sheetData, {xf_index: estilo}) do XML de uma aba de dados escrita num workbook à parte."""
+    import io, zipfile, xlsxwriter
+    sh, df, estilo_key = tarefa; buf=io.BytesIO()
+    wb=xlsxwriter.Workbook(buf, {'constant_memory': True}); fmt, _ = _apply_common_formats(wb, estilo_key)  # in_memory desligaria o constant_memory
+    ws=wb.add_worksheet(); _preparar_aba(ws, sh, list(df.columns), fmt); _escrever_linhas(ws, df, 1, fmt); wb.close()
+    with zipfile.ZipFile(buf) as z: xml=z.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    a, b = _trecho_xml(xml, "dimension"); c, d = _trecho_xml(xml, "sheetData")
+    return xml[a:b], xml[c:d], {i: k for k, i in _indices_estilo(fmt).items() if i is not None}
+
+def _trocar_abas(caminho: str, abas: Dict[int, Tuple[str, str, Dict[int, str]]], fmt) -> None:
+    """Regrava o zip de caminho com o <dimension> e o <sheetData> de cada aba i (sheet{i}.xml) trocados.
+    Os estilos s="n" das células feitas fora são renumerados para os do workbook principal (fmt)."""
+    import zipfile
+    principal=_indices_estilo(fmt)
+    with zipfile.ZipFile(caminho) as zin, zipfile.ZipFile(caminho+".tmp", "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            dados=zin.read(info); m=re.fullmatch(r"xl/worksheets/sheet(\d+)\.xml", info.filename)
+            if m and int(m.group(1)) in abas:
+                dim, corpo, estilos = abas[int(m.group(1))]; xml=dados.decode("utf-8")
+                corpo=re.sub(r'(<c r="[A-Z]+\d+" s=")(\d+)"', lambda x: f'{x.group(1)}{principal[estilos[int(x.group(2))]]}"', corpo)
+                a, b = _trecho_xml(xml, "dimension"); xml=xml[:a]+dim+xml[b:]
+                a, b = _trecho_xml(xml, "sheetData"); dados=(xml[:a]+corpo+xml[b:]).encode("utf-8")
+            zout.writestr(info, dados)
+    os.replace(caminho+".tmp", caminho)
+
+# ========= escrita em fluxo (constant_memory) =========
+def _colunas_linha(ws, df: pd.DataFrame, fmt) -> List[Tuple[Any, Any, list]]:
+    # por coluna: (método, formato, valores com None nos nulos), como em _escrever_coluna
+    cols=[]
+    for c in range(df.shape[1]):
+        s=df.iloc[:, c]; dt=s.dtype; ok=s.notna().to_numpy(); f=None
+        if pd.api.types.is_datetime64_any_dtype(dt): m, f, v = ws.write_number, fmt["date"], _serial_excel(s.to_numpy())
+        elif pd.api.types.is_bool_dtype(dt): m, v = ws.write_boolean, s.to_numpy(dtype=bool, na_value=False)
+        elif pd.api.types.is_integer_dtype(dt): m, v = ws.write_number, s.to_numpy(dtype=np.int64, na_value=0)
+        elif pd.api.types.is_float_dtype(dt):
+            v=s.to_numpy(dtype=float, na_value=np.nan); m=ws.write_number
+            if not np.isfinite(v[ok]).all(): m, v = ws.write, np.where(np.isinf(v), np.where(v>0, "inf", "-inf"), v.astype(object))
+        else:
+            v=s.to_numpy(dtype=object); m=ws.write_string if pd.api.types.infer_dtype(v, skipna=True)=="string" else ws.write
+        v=v.astype(object)
+        if not ok.all(): v[~ok]=None
+        cols.append((m, f, v.tolist()))
+    return cols
+
+def _escrever_linhas(ws, df: pd.DataFrame, linha0: int, fmt) -> int:
+    """Escreve df a partir de linha0, linha a linha (ordem exigida pelo constant_memory). Devolve a próxima linha livre."""
+    cols=_colunas_linha(ws, df, fmt); metodos=[m for m, _, _ in cols]; formatos=[f for _, f, _ in cols]
+    for r, linha in enumerate(zip(*[v for _, _, v in cols]), linha0):
+        for c, v in enumerate(linha):
+            if v is not None: metodos[c](r, c, v, formatos[c])
+    return linha0+len(df)
+
+_PIVO_PARCIAIS = {"sum":("sum",), "mean":("sum","count"), "count":("count",)}
+
+def _pivo_parcial(df: pd.DataFrame, pv: Dict[str, Any]) -> pd.DataFrame:
+    chaves=list(pv.get('index',[]))+list(pv.get('columns',[])); g=_fonte_pivo(df, pv).groupby(chaves, observed=True)
+    return pd.concat({c: g[c].agg(list(_PIVO_PARCIAIS[f])) for c,f in pv.get('values', {'valor':'sum'}).items()}, axis=1)
+
+def _somar_parciais(parciais: List[pd.DataFrame]) -> pd.DataFrame:
+    tot=pd.concat(parciais); return tot.groupby(level=list(range(tot.index.nlevels)), observed=True).sum()
+
+def _pivo_de_parciais(parciais: List[pd.DataFrame], pv: Dict[str, Any]) -> pd.DataFrame:
+    tot=_somar_parciais(parciais)
+    out=pd.DataFrame({c: (tot[(c,"sum")]/tot[(c,"count")] if f=="mean" else tot[(c,f)]) for c,f in pv.get('values', {'valor':'sum'}).items()})
+    if pv.get('columns'): out=out.unstack(pv['columns'], fill_value=pv.get('fill_value',0))
+    return _pivo_formatar(out, pv)
+
+def _reagregar(tab: pd.DataFrame, chaves: List[str], funcs: Dict[str, str], pos=None) -> pd.DataFrame:
+    out=tab.groupby(chaves, as_index=False, observed=True).agg(funcs); out[list(funcs)]=out[list(funcs)].round(2)
+    return pos(out) if pos else out
+
+class _FluxoPedacos:
+    """Percorre os pedaços de iter_pedacos na ordem de escrita, qualquer que seja o formato de saída.
+    blocos() devolve (aba, df): catálogos uma vez só e tabelas agregadas no fim. Ao terminar,
+    os KPIs de self.spec já têm o valor final e self.pivos tem os pivôs (None se sem dados)."""
+    def __init__(self, tema: str, pedacos, campos: List[str], created_at: Optional[datetime]=None, parciais: Optional[Dict[str, Any]]=None):
+        # parciais: KPIs, pivôs e tabelas agregadas de rodadas anteriores ({"kpis", "pivos", "agregadas"}); no fim recebe os novos
+        self._parciais=parciais
+        self._pedacos=iter(pedacos); self._primeiro=next(self._pedacos)
+        self.spec=build_spec_from_bundle(tema, self._primeiro, campos)
+        if created_at is not None: self.spec["workbook"]["created_at"]=created_at
+        self._agregadas=_AGREGADAS.get(tema, {})
+        self.abas=self.spec.get('sheets', []); nomes={sh['name'] for sh in self.abas}
+        self._pivos=[pv for pv in self.spec.get('pivots', []) if pv['data_sheet'] in nomes]
+        self.pivos: Dict[str, Optional[pd.DataFrame]]={}
+
+    def _bloco(self, sh, tab, colunas, pivo_parc):
+        for pv in self._pivos:
+            if pv['data_sheet']==sh['name'] and not tab.empty: pivo_parc[pv['name']].append(_pivo_parcial(tab, pv))
+        return sh, tab[colunas]
+
+    def blocos(self):
+        kpis=self.spec.get('kpis', []); anteriores=self._parciais or {}
+        kpi_parc=list(anteriores.get("kpis") or [None]*len(kpis))
+        # pivô de tabela agregada sai da tabela acumulada, que já traz as rodadas anteriores
+        agregadas={sh['name'] for sh in self.abas if sh.get('fonte') in self._agregadas}
+        pivo_parc={pv['name']: [anteriores["pivos"][pv['name']]] if pv['name'] in anteriores.get("pivos", {}) and pv['data_sheet'] not in agregadas else []
+                   for pv in self._pivos}
+        colunas={sh['name']: [c['name'] for c in sh.get('columns', [])] for sh in self.abas}
+        acumuladas=dict(anteriores.get("agregadas", {})); vistos={}
+        for i, bundle in enumerate(itertools.chain([self._primeiro], self._pedacos)):
+            for j,k in enumerate(kpis):
+                if "calc" in k:
+                    p=_kpi_parcial(k["calc"], bundle)
+                    kpi_parc[j]=p if kpi_parc[j] is None else tuple(a+b for a,b in zip(kpi_parc[j], p))
+            for sh in self.abas:
+                fonte=sh.get('fonte'); tab=bundle.get(fonte)
+                if tab is None: continue
+                if fonte in self._agregadas:
+                    acumuladas[fonte]=tab if fonte not in acumuladas else _reagregar(pd.concat([acumuladas[fonte], tab], ignore_index=True), *self._agregadas[fonte])
+                    continue
+                if i==0: vistos[fonte]=tab
+                elif tab is vistos.get(fonte): continue  # catálogo: mesmo objeto em todos os pedaços, já escrito
+                yield self._bloco(sh, tab, colunas[sh['name']], pivo_parc)
+        for sh in self.abas:
+            if sh.get('fonte') in acumuladas: yield self._bloco(sh, acumuladas[sh['fonte']], colunas[sh['name']], pivo_parc)
+        for j,k in enumerate(kpis):
+            if kpi_parc[j] is not None: k["value"]=_kpi_valor(k["calc"], kpi_parc[j], k.get("fmt"))
+        self.pivos={n: (_pivo_de_parciais(p, pv) if p else None) for pv in self._pivos for n, p in [(pv['name'], pivo_parc[pv['name']])]}
+        if self._parciais is not None:
+            self._parciais.update(kpis=kpi_parc, pivos={n: _somar_parciais(p) for n, p in pivo_parc.items() if p}, agregadas=acumuladas)
+
+def _consumir_blocos(fluxo: "_FluxoPedacos", escrever) -> None:
+    """Passa cada bloco do fluxo para escrever(sh, df). Com ouvintes, mede à parte a geração (espera
+    pelo próximo pedaço) e a escrita de cada aba, e emite os eventos no fim, um por aba."""
+    if not _OUVINTES:
+        for sh, df in fluxo.blocos(): escrever(sh, df)
+        return
+    tempos: Dict[str, float]={}; linhas: Dict[str, int]={}; geracao=0.0; t0=time.perf_counter()
+    for sh, df in fluxo.blocos():
+        t1=time.perf_counter(); geracao+=t1-t0; escrever(sh, df); t0=time.perf_counter()
+        tempos[sh['name']]=tempos.get(sh['name'], 0.0)+t0-t1; linhas[sh['name']]=linhas.get(sh['name'], 0)+len(df)
+    _emitir("geracao", geracao+time.perf_counter()-t0, linhas=sum(linhas.values()))
+    for nome, seg in tempos.items(): _emitir("aba", seg, nome=nome, linhas=linhas[nome])
+
+def gerar_planilha_streaming(tema: str, pedacos, campos: List[str], output_path: str, estilo_key: str="Azul", created_at: Optional[datetime]=None,
+                             max_linhas_aba: int=MAX_LINHAS_ABA, dividir_em: str="abas", rapido: bool=False, alertas_hoje: bool=False,
+                             parciais: Optional[Dict[str, Any]]=None) -> None:
+    """Escreve o tema pedaço a pedaço num workbook xlsxwriter em modo constant_memory.
+    Só o pedaço corrente fica em memória; KPIs e pivôs saem de agregados acumulados.
+    Abas que passam de max_linhas_aba continuam em 'Aba (2)', ... (ou em saida_2.xlsx, ...)."""
+    import xlsxwriter
+    _validar_divisao(max_linhas_aba, dividir_em)
+    fluxo=_FluxoPedacos(tema, pedacos, campos, created_at, parciais); spec=fluxo.spec
+    opc=_opcoes_aba(spec, estilo_key, rapido, alertas_hoje, tabelas=False)  # constant_memory não aceita add_table
+    livros={}  # parte -> (workbook, fmt, pal); a parte 1 é o arquivo principal
+
+    def _livro(k):
+        if k not in livros:
+            wb=xlsxwriter.Workbook(output_path if k==1 else _arquivo_parte(output_path, k), {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+            _propriedades(wb, spec); livros[k]=(wb, *_apply_common_formats(wb, estilo_key))
+        return livros[k]
+
+    def _abrir_parte(a, k):
+        wb, fmt_k, _ = _livro(1 if dividir_em=="abas" else k)
+        a["ws"]=wb.add_worksheet(_nome_parte(a["sh"]['name'], k)); a["fmt"]=fmt_k; a["parte"]=k; a["prox"]=1
+        _preparar_aba(a["ws"], a["sh"], a["colunas"], fmt_k)
+
+    def _fechar_parte(a):
+        _, fmt_k, _ = _livro(1 if dividir_em=="abas" else a["parte"])
+        with _etapa("formatos", nome=a["ws"].name): _finalizar_aba(a["ws"], a["sh"], a["colunas"], a["prox"]-1, fmt_k, opc)
+
+    workbook, fmt, pal = _livro(1)
+    abas={}
+    for sh in fluxo.abas:
+        a=abas[sh['name']]={"sh":sh, "colunas":[c['name'] for c in sh.get('columns', [])]}
+        _abrir_parte(a, 1)
+    def _escrever(sh, df):
+        a=abas[sh['name']]
+        while len(df):
+            livre=max_linhas_aba-(a["prox"]-1)
+            if livre<=0: _fechar_parte(a); _abrir_parte(a, a["parte"]+1); continue
+            a["prox"]=_escrever_linhas(a["ws"], df.iloc[:livre], a["prox"], a["fmt"]); df=df.iloc[livre:]
+    _consumir_blocos(fluxo, _escrever)
+    for a in abas.values(): _fechar_parte(a)
+
+    kpis=spec.get('kpis', [])
+    if kpis:
+        with _etapa("kpis", linhas=len(kpis)): _escrever_kpis(workbook.add_worksheet(spec.get('dashboard_name','Dashboard')), kpis, fmt)
+    for nome, pvt in fluxo.pivos.items():
+        ws=workbook.add_worksheet(nome)
+        if pvt is None: continue
+        with _etapa("pivo", nome=nome, linhas=len(pvt)):
+            _cabecalho_pivo(ws, pvt, fmt)
+            _escrever_linhas(ws, pvt, 1, fmt)
+            _grafico_pivo(workbook, ws, nome, pvt, next(pv for pv in spec['pivots'] if pv['name']==nome))
+    with _etapa("salvar"):
+        for wb, _, _ in livros.values(): wb.close()
+
+# ========= saída em tabelas (csv / parquet / arrow) =========
+# Cada aba vira um arquivo na pasta <saida sem extensão>/; KPIs e pivôs vão em arquivos à parte.
+FORMATOS = ["xlsx","csv","parquet","arrow","sqlite"]
+_EXTENSOES = {"csv":".csv", "parquet":".parquet", "arrow":".arrow"}
+
+def _pyarrow():
+    try:
+        import pyarrow as pa, pyarrow.parquet, pyarrow.ipc
+    except ImportError as e:
+        raise RuntimeError("Os formatos parquet e arrow precisam do pacote 'pyarrow' (pip install pyarrow)") from e
+    return pa
+
+class _EscritorTabela:
+    """Grava uma tabela em blocos: CSV por append, Parquet em row groups, Arrow IPC em record batches.
+    O esquema vem do primeiro bloco; os seguintes são convertidos para ele."""
+    def __init__(self, caminho: str, formato: str):
+        self.caminho=caminho; self.formato=formato; self._saida=None; self._esquema=None; self.vazio=True
+
+    def escrever(self, df: pd.DataFrame) -> None:
+        if self.formato=="csv":
+            df.to_csv(self.caminho, mode="w" if self.vazio else "a", header=self.vazio, index=False, date_format="%Y-%m-%d")
+        else:
+            pa=_pyarrow(); tab=pa.Table.from_pandas(df, schema=self._esquema, preserve_index=False)
+            if self._saida is None:
+                self._esquema=tab.schema
+                self._saida=pa.parquet.ParquetWriter(self.caminho, tab.schema) if self.formato=="parquet" else pa.ipc.new_file(self.caminho, tab.schema)
+            self._saida.write_table(tab)
+        self.vazio=False
+
+    def fechar(self) -> None:
+        if self._saida is not None: self._saida.close()
+
+def _arquivo_tabela(pasta: str, nome: str, formato: str) -> str:
+    return os.path.join(pasta, re.sub(r'[\\/:*?"<>|]', "_", nome) + _EXTENSOES[formato])
+
+def _gravar_tabela(pasta: str, nome: str, formato: str, df: pd.DataFrame) -> None:
+    e=_EscritorTabela(_arquivo_tabela(pasta, nome, formato), formato); e.escrever(df); e.fechar()
+
+def _tabela_kpis(spec: Dict[str, Any]) -> Optional[pd.DataFrame]:
+    kpis=[k for k in spec.get('kpis', []) if "value" in k]
+    if not kpis: return None
+    return pd.DataFrame({"indicador":[k["label"] for k in kpis], "valor":[float(k["value"]) for k in kpis], "formato":[k.get("fmt","text") for k in kpis]})
+
+def _gravar_complementos(pasta: str, formato: str, spec: Dict[str, Any], pivos: Dict[str, Optional[pd.DataFrame]]) -> None:
+    kpis=_tabela_kpis(spec)
+    if kpis is not None: _gravar_tabela(pasta, spec.get('dashboard_name','Dashboard'), formato, kpis)
+    for nome, pvt in pivos.items():
+        if pvt is not None: _gravar_tabela(pasta, nome, formato, pvt.rename(columns=str))
+
+def gerar_tabelas(spec: Dict[str, Any], output_path: str, formato: str="csv") -> str:
+    """Grava cada aba do spec num arquivo do formato escolhido, na pasta output_path sem a extensão."""
+    if formato not in _EXTENSOES: raise ValueError(f"Formato inválido. Opções: {FORMATOS}")
+    pasta=os.path.splitext(output_path)[0]; os.makedirs(pasta, exist_ok=True)
+    nome_df={}
+    for sh in spec.get('sheets', []):
+        df=sh.get('data', pd.DataFrame()); df=pd.DataFrame(df) if isinstance(df, list) else df; nome_df[sh['name']]=df if sh.get('tabela') is None else sh['tabela']
+        with _etapa("aba", nome=sh['name'], linhas=len(df)): _gravar_tabela(pasta, sh['name'], formato, df)
+    with _etapa("pivos"): pivos=_pivos_spec(spec, nome_df)
+    with _etapa("complementos"): _gravar_complementos(pasta, formato, spec, pivos)
+    return pasta
+
+def gerar_tabelas_streaming(tema: str, pedacos, campos: List[str], output_path: str, formato: str="csv", created_at: Optional[datetime]=None,
+                            parciais: Optional[Dict[str, Any]]=None) -> str:
+    """Como gerar_tabelas, mas pedaço a pedaço: cada bloco vai direto para o arquivo da sua aba."""
+    if formato not in _EXTENSOES: raise ValueError(f"Formato inválido. Opções: {FORMATOS}")
+    pasta=os.path.splitext(output_path)[0]; os.makedirs(pasta, exist_ok=True)
+    fluxo=_FluxoPedacos(tema, pedacos, campos, created_at, parciais)
+    escritores={sh['name']: _EscritorTabela(_arquivo_tabela(pasta, sh['name'], formato), formato) for sh in fluxo.abas}
+    try:
+        _consumir_blocos(fluxo, lambda sh, df: escritores[sh['name']].escrever(df))
+        for sh in fluxo.abas:
+            if escritores[sh['name']].vazio: escritores[sh['name']].escrever(pd.DataFrame(columns=[c['name'] for c in sh.get('columns', [])]))
+    finally:
+        with _etapa("salvar"):
+            for e in escritores.values(): e.fechar()
+    with _etapa("complementos"): _gravar_complementos(pasta, formato, fluxo.spec, fluxo.pivos)
+    return pasta
+
+# ========= saída em banco (sqlite / DB-API) =========
+# Cada aba vira uma tabela com os tipos dos formatos de coluna (_col_def); KPIs e pivôs em tabelas à parte
+# (pivôs simples também como views sobre a aba). As linhas entram com executemany em lotes de LOTE_BANCO,
+# uma transação por bloco, e os índices (chaves do tema e colunas agrupadas pelos pivôs) só no fim da carga.
+# O destino é um arquivo .sqlite (recriado) ou qualquer conexão DB-API aberta, que não é fechada aqui.
+LOTE_BANCO = 50_000
+_TIPOS_SQL = {"int":"INTEGER", "currency":"NUMERIC(15,2)", "float":"DOUBLE PRECISION", "text":"TEXT"}
+_FUNCOES_SQL = {"sum":"SUM", "mean":"AVG", "count":"COUNT", "min":"MIN", "max":"MAX"}
+_MARCADORES = {"qmark":"?", "format":"%s", "pyformat":"%s"}
+
+def _ident(nome: str) -> str:
+    return '"'+str(nome).replace('"', '""')+'"'
+
+def _arquivo_banco(output_path: str) -> str:
+    return os.path.splitext(output_path)[0]+".sqlite"
+
+class _EscritorBanco:
+    """Cria as tabelas e insere DataFrames em lotes numa conexão DB-API. Os tipos SQL saem do formato
+    da coluna e do dtype do primeiro bloco; datas com hora viram TIMESTAMP. No sqlite, datas vão como texto ISO."""
+    def __init__(self, con):
+        self.con=con; self.cur=con.cursor(); self._tabelas: Dict[str, Dict[str, str]]={}
+        modulo=type(con).__module__.split(".")[0]; estilo=getattr(sys.modules.get(modulo), "paramstyle", "qmark")
+        if estilo not in _MARCADORES and estilo!="numeric": raise ValueError(f"paramstyle {estilo!r} não suportado (use qmark, format, pyformat ou numeric)")
+        self._estilo=estilo; self._datas_texto=modulo=="sqlite3"
+
+    def _tipo(self, df: pd.DataFrame, c: str, fmt: str) -> str:
+        s=df[c]
+        if pd.api.types.is_bool_dtype(s.dtype): return "BOOLEAN"
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            d=s.dropna().to_numpy().astype("datetime64[s]")
+            return "TIMESTAMP" if (d!=d.astype("datetime64[D]")).any() else "DATE"
+        return _TIPOS_SQL.get(fmt, "TEXT")
+
+    def criar(self, nome: str, df: pd.DataFrame, colunas: Optional[List[Dict[str, Any]]]=None) -> None:
+        fmts={c["name"]: c["fmt"] for c in colunas or _colunas_def(df)}
+        self._tabelas[nome]={c: self._tipo(df, c, fmts.get(c, "text")) for c in df.columns}
+        self.cur.execute(f"DROP TABLE IF EXISTS {_ident(nome)}")
+        self.cur.execute(f"CREATE TABLE {_ident(nome)} ("+", ".join(f"{_ident(c)} {t}" for c, t in self._tabelas[nome].items())+")")
+        self.con.commit()
+
+    def _valores(self, s: pd.Series, tipo: str) -> np.ndarray:
+        # objetos Python (int, float, str, date) com None nos nulos: o que qualquer driver aceita
+        if tipo in ("DATE","TIMESTAMP"):  # poucas datas distintas: converte cada uma uma vez só
+            u, inv = np.unique(s.to_numpy().astype("datetime64[D]" if tipo=="DATE" else "datetime64[s]"), return_inverse=True)
+            v=(np.datetime_as_string(u).astype(object) if self._datas_texto else u.astype(object))[inv.ravel()]
+        elif isinstance(s.dtype, pd.CategoricalDtype): v=s.cat.categories.to_numpy(dtype=object)[s.cat.codes.to_numpy()]
+        else: v=s.to_numpy(dtype=object)
+        nulos=s.isna().to_numpy()
+        if nulos.any(): v[nulos]=None
+        return v
+
+    def inserir(self, nome: str, df: pd.DataFrame, colunas: Optional[List[Dict[str, Any]]]=None) -> None:
+        if nome not in self._tabelas: self.criar(nome, df, colunas)
+        tipos=self._tabelas[nome]
+        if df.empty: return
+        marcas=", ".join(f":{i+1}" if self._estilo=="numeric" else _MARCADORES[self._estilo] for i in range(len(tipos)))
+        sql=f"INSERT INTO {_ident(nome)} ("+", ".join(map(_ident, tipos))+f") VALUES ({marcas})"
+        for i in range(0, len(df), LOTE_BANCO):
+            bloco=df.iloc[i:i+LOTE_BANCO]
+            self.cur.executemany(sql, list(zip(*[self._valores(bloco[c], t) for c, t in tipos.items()])))
+        self.con.commit()
+
+    def indexar(self, nome: str, colunas: List[str]) -> None:
+        for c in dict.fromkeys(colunas):
+            if c in self._tabelas.get(nome, {}): self.cur.execute(f"CREATE INDEX {_ident(f'ix_{nome}_{c}')} ON {_ident(nome)} ({_ident(c)})")
+        self.con.commit()
+
+    def visao_pivo(self, pv: Dict[str, Any]) -> bool:
+        """View com GROUP BY para pivôs sem colunas cruzadas; False quando o pivô não cabe numa view."""
+        if not _pivo_em_visao(pv): return False
+        funcs=pv.get('values', {'valor':'sum'}); idx=list(pv.get('index', [])); casas=pv.get('round')
+        exprs=[f"{_FUNCOES_SQL[f]}({_ident(c)})" for c, f in funcs.items()]
+        if isinstance(casas, int): exprs=[f"ROUND({e}, {casas})" for e in exprs]
+        sel=", ".join([*map(_ident, idx), *(f"{e} AS {_ident(c)}" for e, c in zip(exprs, funcs))])
+        self.cur.execute(f"DROP VIEW IF EXISTS {_ident(pv['name'])}")
+        self.cur.execute(f"CREATE VIEW {_ident(pv['name'])} AS SELECT {sel} FROM {_ident(pv['data_sheet'])}"+(f" GROUP BY {', '.join(map(_ident, idx))}" if idx else ""))
+        self.con.commit(); return True
+
+def _pivo_em_visao(pv: Dict[str, Any]) -> bool:
+    return not pv.get('columns') and all(f in _FUNCOES_SQL for f in pv.get('values', {'valor':'sum'}).values())
+
+@contextmanager
+def _conexao_banco(destino):
+    # caminho: arquivo sqlite novo, sem journal nem fsync durante a carga (um arquivo pela metade só se gera de novo)
+    if not isinstance(destino, str): yield destino, destino; return
+    import sqlite3
+    caminho=_arquivo_banco(destino)
+    if os.path.exists(caminho): os.remove(caminho)
+    con=sqlite3.connect(caminho)
+    try:
+        con.execute("PRAGMA journal_mode=OFF"); con.execute("PRAGMA synchronous=OFF")
+        yield con, caminho
+    finally: con.close()
+
+def _indices_banco(spec: Dict[str, Any]) -> Dict[str, List[str]]:
+    indices={sh['name']: list(sh.get('chaves', [])) for sh in spec.get('sheets', [])}
+    for pv in spec.get('pivots', []):
+        if pv['data_sheet'] in indices: indices[pv['data_sheet']]+=list(pv.get('index', []))
+    return indices
+
+def _finalizar_banco(e: _EscritorBanco, spec: Dict[str, Any], pivos: Dict[str, Optional[pd.DataFrame]], pivos_visao: bool) -> None:
+    with _etapa("indices"):
+        for nome, colunas in _indices_banco(spec).items(): e.indexar(nome, colunas)
+    with _etapa("complementos"):
+        kpis=_tabela_kpis(spec)
+        if kpis is not None: e.inserir(spec.get('dashboard_name','Dashboard'), kpis)
+        for pv in spec.get('pivots', []):
+            if pv['name'] not in pivos or (pivos_visao and e.visao_pivo(pv)): continue
+            pvt=pivos[pv['name']]
+            if pvt is not None: e.inserir(pv['name'], pvt.rename(columns=str))
+
+def gerar_banco(spec: Dict[str, Any], destino, pivos_visao: bool=False):
+    """Carrega as abas do spec num banco: destino é o caminho do arquivo sqlite (extensão trocada por
+    .sqlite) ou uma conexão DB-API. Com pivos_visao, os pivôs viram views em vez de tabelas."""
+    with _conexao_banco(destino) as (con, saida):
+        e=_EscritorBanco(con); nome_df={}
+        for sh in spec.get('sheets', []):
+            df=sh.get('data', pd.DataFrame()); df=pd.DataFrame(df) if isinstance(df, list) else df; nome_df[sh['name']]=df if sh.get('tabela') is None else sh['tabela']
+            with _etapa("aba", nome=sh['name'], linhas=len(df)): e.inserir(sh['name'], df, sh.get('columns'))
+        with _etapa("pivos"):  # pivô que vira view não é calculado no pandas
+            pivos=_pivos_spec(spec, nome_df, pular=lambda pv: pivos_visao and _pivo_em_visao(pv))
+        _finalizar_banco(e, spec, pivos, pivos_visao)
+    return saida
+
+def gerar_banco_streaming(tema: str, pedacos, campos: List[str], destino, created_at: Optional[datetime]=None,
+                          parciais: Optional[Dict[str, Any]]=None, pivos_visao: bool=False):
+    """Como gerar_banco, mas pedaço a pedaço: cada bloco é inserido (e confirmado) assim que sai do gerador."""
+    fluxo=_FluxoPedacos(tema, pedacos, campos, created_at, parciais)
+    with _conexao_banco(destino) as (con, saida):
+        e=_EscritorBanco(con)
+        _consumir_blocos(fluxo, lambda sh, df: e.inserir(sh['name'], df, sh.get('columns')))
+        for sh in fluxo.abas:
+            if sh['name'] not in e._tabelas: e.criar(sh['name'], pd.DataFrame(columns=[c['name'] for c in sh.get('columns', [])]), sh.get('columns'))
+        _finalizar_banco(e, fluxo.spec, fluxo.pivos, pivos_visao)
+    return saida
+
+# ========= faker / bases =========
+UFs = ["AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG","PA","PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"]
+
+# Faker só é instanciado no primeiro pool (_faker); aqui basta saber se está instalado.
+_FAKE=None; _COMMERCE=False
+_FAKER_OK = importlib.util.find_spec("faker") is not None
+
+def _faker():
+    global _FAKE, _COMMERCE
+    if _FAKE is None:
+        from faker import Faker
+        _FAKE = Faker("pt_BR")
+        try:
+            from faker_commerce import Provider as CommerceProvider
+            _FAKE.add_provider(CommerceProvider); _COMMERCE=True
+        except Exception:
+            _COMMERCE=False
+    return _FAKE
+
+MARCAS_BR = ["Aurora","Predilecta","Nestlé","Camil","Ypê","Itambé","Seara","Qualitá","Heinz","Coca-Cola","Ambev","Vitao","Italac","Piracanjuba","Piraquê","Tio João","União","Colgate","Oral-B","Tramontina","Vigor","Sadia","Perdigão","Bauducco","Santa Helena","Fini","Bombril","Brilux","Scotch-Brite"]
+
+# Faker é lento por chamada: cada método vira um "pool" de valores gerado uma vez por processo
+# (a partir de SEMENTE_POOL) e os temas sorteiam índices nele. Pool maior = mais valores distintos.
+TAM_POOL_FAKER = 5000
+SEMENTE_POOL = 0
+_POOLS: Dict[str, np.ndarray] = {}
+
+def configurar_pools(tamanho: Optional[int]=None, semente: Optional[int]=None) -> None:
+    global TAM_POOL_FAKER, SEMENTE_POOL
+    if tamanho is not None and tamanho<1: raise ValueError("tamanho do pool deve ser >= 1")
+    novo=(tamanho or TAM_POOL_FAKER, SEMENTE_POOL if semente is None else semente)
+    if novo!=(TAM_POOL_FAKER, SEMENTE_POOL): _POOLS.clear()
+    TAM_POOL_FAKER, SEMENTE_POOL = novo
+
+def _pool_faker(metodo: str) -> np.ndarray:
+    if metodo not in _POOLS:
+        fake=_faker(); fake.seed_instance(SEMENTE_POOL*1000 + zlib.crc32(metodo.encode()) % 1000)
+        f=getattr(fake, metodo); _POOLS[metodo]=np.array([f() for _ in range(TAM_POOL_FAKER)], dtype=object)
+    return _POOLS[metodo]
+
+_METODOS_POOL = ("name","company","city","postcode","last_name")  # os que os temas embutidos usam
+
+def preparar_pools(metodos=_METODOS_POOL) -> None:
+    """Monta agora os pools (em vez de no primeiro uso, dentro da geração)."""
+    if _FAKER_OK:
+        for m in metodos: _pool_faker(m)
+
+def salvar_pools(caminho: str, metodos=_METODOS_POOL) -> None:
+    if not _FAKER_OK: raise RuntimeError("Faker não está instalado")
+    for m in metodos: _pool_faker(m)
+    np.savez_compressed(caminho, _meta=np.array([TAM_POOL_FAKER, SEMENTE_POOL]), **{m: v.astype(str) for m, v in _POOLS.items()})
+
+def carregar_pools(caminho: str) -> None:
+    with np.load(caminho) as arq:
+        configurar_pools(*(int(x) for x in arq["_meta"]))
+        _POOLS.update({m: arq[m].astype(object) for m in arq.files if m!="_meta"})
+
+def _fake_vet(metodo: str, n: int, rng: np.random.Generator, fallback: str) -> np.ndarray:
+    if _FAKER_OK:
+        pool=_pool_faker(metodo); return pool[rng.integers(0,len(pool),n)]
+    return _prefixo(fallback, rng.integers(1000,10000,n)).astype(object)
+
+# ========= documentos e códigos de barras =========
+# Gerados como matrizes de dígitos (n linhas x k dígitos), com dígitos verificadores válidos.
+# DOCS_FORMATADOS escolhe entre "123.456.789-09" e "12345678909" (sempre texto: zeros à esquerda).
+DOCS_FORMATADOS = True
+
+_PESOS_CPF  = (np.arange(10,1,-1), np.arange(11,1,-1))
+_PESOS_CNPJ = (np.array([5,4,3,2,9,8,7,6,5,4,3,2]), np.array([6,5,4,3,2,9,8,7,6,5,4,3,2]))
+_PESOS_IE   = (np.array([1,3,4,5,6,7,8,10]), np.array([3,2,10,9,8,7,6,5,4,3,2]))  # IE no padrão de SP
+_PESOS_EAN  = np.tile([1,3],6)  # posições 1..12 da esquerda
+
+def configurar_documentos(formatado: bool) -> None:
+    global DOCS_FORMATADOS
+    DOCS_FORMATADOS=bool(formatado)
+
+def _dv_mod11(dig: np.ndarray, pesos: np.ndarray) -> np.ndarray:
+    # CPF/CNPJ: resto < 2 vira 0, senão 11 - resto
+    r=(dig[:, :len(pesos)] @ pesos) % 11
+    return np.where(r<2, 0, 11-r)
+
+def _texto_digitos(dig: np.ndarray, mascara: Optional[str]=None) -> np.ndarray:
+    """Matriz de dígitos -> array de strings, sem laço por linha. Na máscara, '#' recebe o próximo dígito."""
+    mascara=mascara or "#"*dig.shape[1]; pos=[i for i,ch in enumerate(mascara) if ch=="#"]
+    buf=np.frombuffer(mascara.encode("ascii"), dtype=np.uint8)[None, :].repeat(len(dig), axis=0)
+    buf[:, pos]=dig+48
+    return buf.view(f"S{len(mascara)}").ravel().astype(str)
+
+def _cpf_digitos(rng: np.random.Generator, n: int) -> np.ndarray:
+    dig=np.zeros((n,11), dtype=np.int64); dig[:, :9]=rng.integers(0,10,(n,9))
+    dig[:, 9]=_dv_mod11(dig, _PESOS_CPF[0]); dig[:, 10]=_dv_mod11(dig, _PESOS_CPF[1])
+    return dig
+
+def _cnpj_digitos(rng: np.random.Generator, n: int) -> np.ndarray:
+    dig=np.zeros((n,14), dtype=np.int64); dig[:, :8]=rng.integers(0,10,(n,8)); dig[:, 11]=1  # filial 0001
+    dig[:, 12]=_dv_mod11(dig, _PESOS_CNPJ[0]); dig[:, 13]=_dv_mod11(dig, _PESOS_CNPJ[1])
+    return dig
+
+def _ie_digitos(rng: np.random.Generator, n: int) -> np.ndarray:
+    # SP: 8 dígitos, DV, 2 dígitos, DV; cada DV é o último algarismo do resto por 11
+    dig=np.zeros((n,12), dtype=np.int64); dig[:, :8]=rng.integers(0,10,(n,8)); dig[:, 9:11]=rng.integers(0,10,(n,2))
+    dig[:, 8]=((dig[:, :8] @ _PESOS_IE[0]) % 11) % 10; dig[:, 11]=((dig[:, :11] @ _PESOS_IE[1]) % 11) % 10
+    return dig
+
+def _ean13_digitos(rng: np.random.Generator, n: int, prefix: str="789") -> np.ndarray:
+    dig=np.zeros((n,13), dtype=np.int64)
+    dig[:, :len(prefix)]=[int(c) for c in prefix]; dig[:, len(prefix):12]=rng.integers(0,10,(n,12-len(prefix)))
+    dig[:, 12]=(10 - (dig[:, :12] @ _PESOS_EAN) % 10) % 10
+    return dig
+
+def cpf_vet(rng: np.random.Generator, n: int, formatado: Optional[bool]=None) -> np.ndarray:
+    fmt=DOCS_FORMATADOS if formatado is None else formatado
+    return _texto_digitos(_cpf_digitos(rng, n), "###.###.###-##" if fmt else None)
+
+def cnpj_vet(rng: np.random.Generator, n: int, formatado: Optional[bool]=None) -> np.ndarray:
+    fmt=DOCS_FORMATADOS if formatado is None else formatado
+    return _texto_digitos(_cnpj_digitos(rng, n), "##.###.###/####-##" if fmt else None)
+
+def ie_vet(rng: np.random.Generator, n: int, formatado: Optional[bool]=None) -> np.ndarray:
+    fmt=DOCS_FORMATADOS if formatado is None else formatado
+    return _texto_digitos(_ie_digitos(rng, n), "###.###.###.###" if fmt else None)
+
+def _doc_fakes_vet(rng: np.random.Generator, n: int, formatado: Optional[bool]=None) -> Dict[str, np.ndarray]:
+    return {"cnpj": cnpj_vet(rng, n, formatado), "cpf": cpf_vet(rng, n, formatado), "ie": ie_vet(rng, n, formatado)}
+
+# ========= EAN =========
+def _ean13_vet(rng: np.random.Generator, n: int, prefix: str="789") -> np.ndarray:
+    return _texto_digitos(_ean13_digitos(rng, n, prefix))
+
+# ========= motor colunar (numpy) =========
+def _rng(rng: Optional[np.random.Generator]=None) -> np.random.Generator:
+    return rng if rng is not None else np.random.default_rng()
+
+class _Amostrador:
+    """Sorteio ponderado em lote: pesos acumulados calculados uma única vez por tabela de opções."""
+    __slots__=("itens","acum")
+    def __init__(self, opcoes):
+        itens, pesos = zip(*opcoes)
+        self.itens=np.asarray(itens, dtype=object if isinstance(itens[0], str) else None)
+        self.acum=np.cumsum(np.asarray(pesos, dtype=float))
+    def indices(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        idx=np.searchsorted(self.acum, rng.random(n)*self.acum[-1], side="right")
+        return np.minimum(idx, len(self.itens)-1)
+    def amostrar(self, rng: np.random.Generator, n: int, categorico: bool=False):
+        idx=self.indices(rng, n)
+        return pd.Categorical.from_codes(idx, categories=self.itens) if categorico else self.itens[idx]
+
+def _escolha(rng: np.random.Generator, opcoes, n: int, categorico: bool=False):
+    arr=opcoes if isinstance(opcoes, np.ndarray) else np.asarray(opcoes, dtype=object)
+    idx=rng.integers(0,len(arr),n)
+    return pd.Categorical.from_codes(idx, categories=arr) if categorico else arr[idx]
+
+def _categorias(valores: np.ndarray, opcoes) -> pd.Categorical:
+    # categorias fixas (e não as vistas no pedaço): pedaços concatenados mantêm o dtype category
+    return pd.Categorical(valores, categories=opcoes)
+
+def _escolha_por_grupo(rng: np.random.Generator, grupos: List[List[Any]], gi: np.ndarray) -> np.ndarray:
+    """Para cada linha, sorteia uniformemente um item da lista grupos[gi]."""
+    tam=np.array([len(g) for g in grupos]); off=np.concatenate([[0],np.cumsum(tam)[:-1]])
+    plano=np.array([x for g in grupos for x in g], dtype=object)
+    return plano[off[gi] + (rng.random(len(gi))*tam[gi]).astype(np.int64)]
+
+def _juntar(*partes) -> np.ndarray:
+    out=partes[0]
+    for p in partes[1:]: out=np.char.add(out, p)
+    return np.asarray(out).astype(object)
+
+
+def _prefixo(prefix: str, nums: np.ndarray, width: int=0) -> np.ndarray:
+    s = nums.astype(str)
+    return np.char.add(prefix, np.char.zfill(s, width) if width else s).astype(object)
+
+# ========= IDs únicos (Feistel) =========
+# Um ID é a imagem da posição global da linha por uma bijeção com chave da execução (rede de Feistel
+# em 2b bits + cycle-walking até cair em [0, espaço)). Linhas diferentes dão IDs diferentes em qualquer
+# pedaço ou processo, sem tabela de IDs já usados. A chave vem da semente: mesma semente, mesmos IDs.
+_RODADAS_FEISTEL = 4
+_MIX1, _MIX2 = np.uint64(0x9E3779B97F4A7C15), np.uint64(0xBF58476D1CE4E5B9)
+
+def _misturar(x: np.ndarray, k: np.uint64) -> np.ndarray:
+    x=(x ^ k) * _MIX1; x^=x >> np.uint64(29); x*=_MIX2
+    return x ^ (x >> np.uint64(32))
+
+def permutar_ids(posicoes: np.ndarray, espaco: int, chave: int) -> np.ndarray:
+    """Bijeção de [0, espaco) em [0, espaco): posições distintas -> valores distintos."""
+    b=max(1, ((int(espaco)-1).bit_length()+1)//2); bits=np.uint64(b); mascara=np.uint64((1<<b)-1)
+    chaves=np.random.SeedSequence(chave).generate_state(_RODADAS_FEISTEL, np.uint64)
+    x=np.asarray(posicoes, dtype=np.uint64).copy(); pend=np.arange(len(x))
+    while len(pend):  # o domínio 2^(2b) tem menos de 4x o espaço: poucas voltas
+        v=x[pend]; esq, dir = v >> bits, v & mascara
+        for k in chaves: esq, dir = dir, esq ^ (_misturar(dir, k) & mascara)
+        v=(esq << bits) | dir; x[pend]=v; pend=pend[v>=np.uint64(espaco)]
+    return x.astype(np.int64)
+
+def ids_unicos(inicio: int, n: int, espaco: int, chave: int, nome: str="ID") -> np.ndarray:
+    """IDs das linhas inicio..inicio+n-1, em [0, espaco)."""
+    if inicio+n > espaco: raise ValueError(f"{nome}: o espaço de IDs tem {espaco:,} valores e foram pedidos {inicio+n:,}")
+    return permutar_ids(np.arange(inicio, inicio+n), espaco, chave)
+
+def _ids_catalogo(rng: np.random.Generator, n: int, prefixo: str, base: int, espaco: int, largura: int=0) -> np.ndarray:
+    return _prefixo(prefixo, base+ids_unicos(0, n, espaco, int(rng.integers(2**63)), prefixo), largura)
+
+# ========= amostragem de datas (datetime64) =========
+# Tudo parte de uma referência "agora" fixa (ctx["_agora"]): com semente, as datas se repetem.
+# Datas dependentes são a base mais um deslocamento vetorizado (_prazo), nunca timedelta por linha.
+_SEGUNDOS_DIA = 86400
+_UTEIS        = (1,1,1,1,1,0,0)                                              # seg..dom
+_SAZ_VAREJO   = (0.85,0.8,0.9,0.9,1.05,0.95,1.0,0.95,0.95,1.0,1.3,1.6)      # jan..dez: Black Friday e Natal
+_SAZ_PLANTIO  = (0.6,0.4,0.3,0.2,0.2,0.2,0.2,0.3,1.6,2.0,1.6,0.8)           # janela da safra de verão
+_SAZ_LETIVO   = (0.1,1.0,1.0,1.0,1.0,1.0,0.3,1.0,1.0,1.0,1.0,0.6)           # férias em jan/jul
+_SEMANA_BAR   = (0.7,0.7,0.8,1.0,1.4,1.7,1.3)
+
+def _dias(n) -> np.ndarray: return np.asarray(n).astype('timedelta64[D]')
+
+def _amostrar_datas(rng: np.random.Generator, n: int, dias: int, agora, meses=None, semana=None, horas: Tuple[int,int]=(0,24)) -> np.ndarray:
+    """n instantes (datetime64[s]) nos `dias` dias anteriores ao dia de agora. O peso de cada dia é
+    meses[mês-1]*semana[dia da semana]; a hora é uniforme em [horas[0], horas[1])."""
+    grade=np.datetime64(agora, 'D') - np.arange(dias, 0, -1).astype('timedelta64[D]')
+    peso=np.ones(dias)
+    if meses is not None: peso=peso*np.asarray(meses, dtype=float)[grade.astype('datetime64[M]').astype(np.int64) % 12]
+    if semana is not None: peso=peso*np.asarray(semana, dtype=float)[(grade.astype(np.int64)+3) % 7]  # 1970-01-01 foi quinta
+    if not peso.any(): peso=np.ones(dias)  # janela curta só com dias de peso zero (ex.: fim de semana): uniforme
+    acum=np.cumsum(peso)
+    d=np.minimum(np.searchsorted(acum, rng.random(n)*acum[-1], side="right"), dias-1)
+    seg=rng.integers(horas[0]*3600, horas[1]*3600, n)
+    return grade[d].astype('datetime64[s]') + seg.astype('timedelta64[s]')
+
+def _datas_comerciais(rng: np.random.Generator, n: int, dias: int, agora, horas: Tuple[int,int]=(8,18)) -> np.ndarray:
+    return _amostrar_datas(rng, n, dias, agora, semana=_UTEIS, horas=horas)
+
+def _janela(ctx: Dict[str, Any], dias: int) -> int:
+    # no modo incremental (ctx["_dias_novos"]) as datas caem só nos dias depois da última data gravada
+    return min(dias, ctx.get("_dias_novos", dias))
+
+def _prazo(rng: np.random.Generator, n: int, media: float, desvio: float, minimo: int=0, unidade: str='D') -> np.ndarray:
+    """Deslocamentos |N(media, desvio)| inteiros, no mínimo `minimo`, como timedelta64[unidade]."""
+    return np.maximum(minimo, np.abs(rng.normal(media, desvio, n)).astype(np.int64)).astype(f'timedelta64[{unidade}]')
+
+# tabelas de opções ponderadas (montadas uma vez)
+_SEGMENTOS     = _Amostrador([("Varejo",0.5),("Atacado",0.3),("E-commerce",0.2)])
+_PAGAMENTOS    = _Amostrador([("Pix",0.5),("Crédito",0.3),("Débito",0.15),("Boleto",0.05)])
+_FATOR_PRECO   = _Amostrador([(0.95,0.6),(1.0,1.6),(1.05,0.7)])
+_DESCONTOS     = _Amostrador([(0.00,3.0),(0.03,0.8),(0.05,0.6),(0.10,0.25),(0.15,0.1)])
+_TIPO_MOV      = _Amostrador([("Entrada",0.9),("Saída",1.4)])
+_FATOR_CUSTO   = _Amostrador([(0.85,1.0),(0.9,1.2),(0.95,0.8)])
+_PRAZOS        = _Amostrador([(15,0.65),(30,1.6),(45,0.8),(60,0.5),(90,0.2)])
+_VALOR_TITULO  = _Amostrador([(120,0.5),(250,1.2),(520,1.5),(990,1.3),(1800,0.9),(3500,0.35)])
+_DESC_TITULO   = _Amostrador([(0,3.0),(0.02,0.5),(0.05,0.2)])  # fração do valor de face
+_MODAIS        = _Amostrador([("Rodoviário",2.6),("Aéreo",0.6),("Ferroviário",0.4),("Hidroviário",0.3)])
+_FRETE_MODAL   = np.array([2.1,4.2,1.9,1.6])  # mesma ordem de _MODAIS
+_PRECO_INSUMO  = _Amostrador([(90,0.6),(120,1.0),(260,1.4),(480,0.9),(950,0.4)])
+_CICLO_CULTURA = _Amostrador([(110,0.6),(130,1.2),(150,0.9)])
+_PRECO_TON     = _Amostrador([(850,0.5),(1000,1.1),(1200,1.2),(1400,0.8)])
+_FATOR_INSUMO  = _Amostrador([(0.95,0.5),(1.0,1.2),(1.05,0.6)])
+_VALOR_CONSULTA= _Amostrador([(80,0.6),(120,1.2),(180,1.0),(250,0.6),(320,0.3)])
+_VALOR_EXAME   = _Amostrador([(30,0.7),(55,1.0),(90,0.8),(140,0.4)])
+_SITUACAO      = _Amostrador([("Ativo",2.0),("Trancado",0.2),("Evadido",0.1)])
+_PRECO_30S     = _Amostrador([(8000,0.5),(15000,0.9),(30000,0.6),(60000,0.2)])
+_STATUS_TICKET = _Amostrador([("Aberto",0.6),("Em Andamento",0.8),("Aguardando Usuário",0.4),("Resolvido",1.6),("Cancelado",0.1)])
+_VALOR_ODONTO  = _Amostrador([(120,0.8),(250,1.0),(450,0.8),(900,0.4),(1800,0.2)])
+_PRECO_PRATO   = _Amostrador([(8,0.3),(12,0.6),(18,1.0),(28,0.9),(39,0.5)])
+_PRECO_BEBIDA  = _Amostrador([(4,0.5),(7,1.0),(10,0.8),(15,0.5)])
+_ORCAMENTO     = _Amostrador([(50000,0.6),(120000,1.0),(280000,0.9),(550000,0.5),(900000,0.3)])
+_DESVIO_OBRA   = _Amostrador([(0.85,0.5),(0.95,1.2),(1.05,1.0),(1.15,0.6)])
+_CUSTO_COMPRA  = _Amostrador([(300,0.8),(1200,1.0),(3800,0.6),(7200,0.3)])
+
+# ========= produtos PT-BR para varejo =========
+_UNIDADES = [
+    ("g", 140, 0.5), ("g", 200, 0.7), ("g", 500, 0.9), ("g", 1000, 1.0),
+    ("ml", 300, 0.8), ("ml", 500, 1.0), ("L", 1, 1.2), ("L", 2, 1.9),
+    ("un", 1, 1.0), ("un", 4, 3.6), ("un", 6, 5.2), ("un", 12, 10.0)
+]
+_UNIDADES_STR = [f"{u[1]}{u[0]}" for u in _UNIDADES]
+_BASE_PRECO_PT = {
+    "Mercearia": (5.90, 29.90), "Bebidas": (4.90, 39.90), "Higiene & Beleza": (7.90, 49.90),
+    "Limpeza": (5.90, 29.90), "Frios & Laticínios": (7.90, 59.90), "Açougue": (14.90, 79.90),
+    "Padaria & Confeitaria": (4.90, 24.90), "Pets": (9.90, 49.90), "Utilidades": (9.90, 69.90),
+}
+CAT_PT = {
+    "Mercearia": ["Arroz","Feijão Carioca","Feijão Preto","Macarrão Spaghetti","Macarrão Parafuso","Molho de Tomate","Azeite de Oliva","Açúcar Refinado","Farinha de Trigo","Café Torrado e Moído","Atum em Óleo","Sardinha em Óleo","Azeitona Verde","Milho Verde","Ervilha em Conserva","Biscoito Recheado Chocolate","Biscoito Cream Cracker","Achocolatado em Pó","Granola Tradicional","Aveia em Flocos","Leite em Pó","Leite Condensado","Creme de Leite"],
+    "Bebidas": ["Água Mineral","Refrigerante Cola","Refrigerante Guaraná","Suco de Uva","Suco de Laranja","Cerveja Pilsen","Cerveja IPA","Vinho Tinto Seco","Chá Gelado","Água de Coco","Energético"],
+    "Higiene & Beleza": ["Sabonete","Shampoo","Condicionador","Desodorante Aerosol","Creme Dental","Escova Dental","Fio Dental","Enxaguante Bucal","Lenço Umedecido"],
+    "Limpeza": ["Detergente Líquido Neutro","Desinfetante","Amaciante de Roupas","Sabão em Pó","Limpador Multiuso","Água Sanitária","Esponja Multiuso","Lustra Móveis","Saco de Lixo"],
+    "Frios & Laticínios": ["Queijo Mussarela Fatiado","Queijo Prato","Queijo Parmesão Ralado","Presunto Cozido","Peito de Peru","Iogurte Natural","Iogurte Grego","Requeijão Cremoso","Manteiga com Sal","Ricota Fresca","Cream Cheese"],
+    "Açougue": ["Frango Congelado","Coxa e Sobrecoxa","Peito de Frango","Carne Moída","Bife de Alcatra","Carne Suína em Cubos","Linguiça Toscana","Carne para Panela"],
+    "Padaria & Confeitaria": ["Pão Francês","Pão de Forma","Bolo de Chocolate","Bolo de Cenoura","Pão de Queijo","Croissant","Biscoito Amanteigado"],
+    "Pets": ["Ração Cães Adultos","Ração Gatos Adultos","Petisco para Cães","Areia Sanitária"],
+    "Utilidades": ["Pano de Prato","Esponja de Aço","Vassoura","Rodo","Balde Plástico"],
+}
+ADJETIVOS = ["Premium","Tradicional","Integral","Zero Açúcar","Zero Lactose","Light","Orgânico","Clássico","Caseiro","Intenso","Extra Forte","Sabor Chocolate","Sabor Morango","Sabor Baunilha"]
+
+def _produtos_pt_br(n: int, rng: Optional[np.random.Generator]=None) -> pd.DataFrame:
+    """n produtos de supermercado (sku, ean13, nome, categoria, marca, unidade, preço base) de uma vez."""
+    rng=_rng(rng); familias=list(CAT_PT.keys())
+    fi=rng.integers(0,len(familias),n)
+    base=_escolha_por_grupo(rng, [CAT_PT[f] for f in familias], fi)
+    adic=np.where(rng.random(n)<0.35, np.char.add(" ", np.asarray(ADJETIVOS)[rng.integers(0,len(ADJETIVOS),n)]).astype(object), "")
+    ui=rng.integers(0,len(_UNIDADES),n)
+    unidade_str=np.asarray(_UNIDADES_STR, dtype=object)[ui]
+    fator=np.array([u[2] for u in _UNIDADES])[ui]
+    marcas=np.asarray(MARCAS_BR + ["Genérico","Local","Premium","Eco"], dtype=object)
+    low=np.array([_BASE_PRECO_PT.get(f,(7.90,49.90))[0] for f in familias])[fi]
+    high=np.array([_BASE_PRECO_PT.get(f,(7.90,49.90))[1] for f in familias])[fi]
+    preco=rng.uniform(low,high)*fator*np.array([0.95,1.0,1.05,1.1])[rng.integers(0,4,n)]
+    cents=np.array([0.90,0.99,0.79,0.49,0.19])[rng.integers(0,5,n)]
+    return pd.DataFrame({
+        "sku": np.char.add(np.char.add(np.array([f[:2].upper() for f in familias])[fi], "-"), (10000+ids_unicos(0, n, 90000, int(rng.integers(2**63)), "sku")).astype(str)),
+        "ean13": _ean13_vet(rng, n, "789"), "produto": base + adic + " " + unidade_str, "categoria": pd.Categorical.from_codes(fi, familias),
+        "marca": marcas[rng.integers(0,len(marcas),n)], "unidade": pd.Categorical.from_codes(ui, _UNIDADES_STR), "preco_base": np.round(np.floor(preco)+cents, 2),
+    })
+
+# ========= clientes =========
+def _clientes(n: int, rng: Optional[np.random.Generator]=None) -> pd.DataFrame:
+    rng=_rng(rng)
+    if _FAKER_OK:
+        nome=_fake_vet("name",n,rng,""); empresa=_fake_vet("company",n,rng,""); cidade=_fake_vet("city",n,rng,""); cep=_fake_vet("postcode",n,rng,"")
+    else:
+        nome=_prefixo("Cliente ", rng.integers(1000,10000,n)); empresa=_juntar(_prefixo("Empresa ", rng.integers(100,1000,n))," Ltda"); cidade=_prefixo("Cidade ", rng.integers(1,201,n))
+        cep=_juntar(rng.integers(10000,100000,n).astype(str),"-",rng.integers(100,1000,n).astype(str))
+    return pd.DataFrame({"cliente_nome":nome,"empresa":empresa,"cidade":cidade,"uf":_escolha(rng,UFs,n,True),"cep":cep,"segmento":_SEGMENTOS.amostrar(rng,n,True), **_doc_fakes_vet(rng,n)})
+
+# ========= contextos (catálogos compartilhados entre pedaços) =========
+# Cada tema tem um contexto com seus catálogos, montado uma vez a partir do total de linhas,
+# e um gerador de linhas (compilado do esquema, ver registrar_tema) que pode ser chamado por pedaço.
+# Chaves sem "_" são tabelas que entram no bundle; as com "_" são de uso interno.
+def _ctx_base(rng: np.random.Generator, agora=None) -> Dict[str, Any]:
+    return {"_agora": np.datetime64(agora if agora is not None else datetime.now(), 's')}
+
+def _ctx_clientes(chave: str, fator: float, minimo: int):
+    def _ctx(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+        rng=_rng(rng); ctx=_ctx_base(rng, agora)
+        ctx["_clientes"]=_clientes(max(minimo,int(n*fator)), rng)
+        ctx[chave]=ctx["_clientes"].drop_duplicates(subset=["empresa"]).reset_index(drop=True)
+        return ctx
+    return _ctx
+
+_ctx_financeira = _ctx_clientes("sacados", 0.14, 90)
+_ctx_logistica  = _ctx_clientes("clientes", 0.12, 80)
+
+def _ctx_market(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_clientes("clientes", 0.18, 120)(n, rng, agora)
+    ctx["produtos"]=_produtos_pt_br(260, rng)
+    return ctx
+
+def _ctx_estoque(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    ctx["_produtos"]=_produtos_pt_br(240, rng)
+    return ctx
+
+def _ctx_agro(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    n_p=max(60,int(n*0.1))
+    if _FAKER_OK: nome=_fake_vet("name",n_p,rng,""); cidade=_fake_vet("city",n_p,rng,"")
+    else: nome=_prefixo("Produtor ", rng.integers(1000,10000,n_p)); cidade=_prefixo("Cidade ", rng.integers(1,201,n_p))
+    ctx["_produtores"]=pd.DataFrame({"produtor":nome,"cidade":cidade,"uf":_escolha(rng,UFs,n_p,True), **_doc_fakes_vet(rng,n_p)})
+    ctx["produtores"]=ctx["_produtores"].drop_duplicates(subset=["produtor"]).reset_index(drop=True)
+    ctx["_talhoes"]=_prefixo("T", rng.integers(1,81,160))
+    ctx["catalogo"]=pd.DataFrame({"sku":_ids_catalogo(rng, 90, "AG-", 1000, 9000),"item":_escolha(rng,_INSUMOS,90,True),"cultura":_escolha(rng,_CULTURAS,90,True),"preco_base":np.round(_PRECO_INSUMO.amostrar(rng,90).astype(float),2)})
+    return ctx
+
+def _ctx_saude(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    ctx["_prof"]=_juntar("Dr(a). ", _fake_vet("last_name",30,rng,"").astype(str))
+    return ctx
+
+def _ctx_educacao(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    ctx["_turmas"]=_juntar(_escolha(rng,np.array(['1A','2B','3C','4D','5E']),20),"-",rng.integers(2023,2026,20).astype(str))
+    n_a=max(80,int(n*0.25))
+    ctx["_alunos"]=_fake_vet("name",n_a,rng,"") if _FAKER_OK else _prefixo("Aluno ", np.arange(n_a))
+    ctx["matriculas"]=pd.DataFrame({"aluno":ctx["_alunos"],"turma":_escolha(rng,ctx["_turmas"],n_a),"situacao":_SITUACAO.amostrar(rng,n_a,True)})
+    return ctx
+
+def _ctx_informatica(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    usuarios=ctx["_usuarios"]=_fake_vet("name",200,rng,"") if _FAKER_OK else _prefixo("Usuário ", np.arange(200))
+    marcasHW=["Dell","HP","Lenovo","Acer","Apple","Samsung","Asus"]; k=max(80,int(n*0.2))
+    ctx["ativos"]=pd.DataFrame({"patrimonio":_ids_catalogo(rng, k, "PAT", 0, 10**7, 7),"tipo":_escolha(rng,["Notebook","Desktop","Impressora","Monitor","Roteador"],k,True),
+                                "marca":_escolha(rng,marcasHW,k,True),"usuario":_escolha(rng,usuarios,k),
+                                "aquisicao":_datas_comerciais(rng,k,1200,ctx["_agora"]).astype('datetime64[D]'),"garantia_fim":ctx["_agora"].astype('datetime64[D]')+_dias(rng.integers(30,901,k))})
+    return ctx
+
+def _ctx_odontologia(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    ctx["_dentistas"]=_juntar("Dr(a). ", _fake_vet("last_name",18,rng,"").astype(str))
+    return ctx
+
+def _ctx_construcao(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    rng=_rng(rng); ctx=_ctx_base(rng, agora)
+    ctx["_clientes"]=_fake_vet("company",60,rng,"") if _FAKER_OK else _prefixo("Cliente ", np.arange(60))
+    return ctx
+
+def _ctx_vazio(n: int, rng: Optional[np.random.Generator]=None, agora=None) -> Dict[str, Any]:
+    return _ctx_base(_rng(rng), agora)
+
+def _tabelas_ctx(ctx: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    return {k:v for k,v in ctx.items() if not k.startswith("_")}
+
+# ========= colunas sob demanda =========
+class _Colunas:
+    """Colunas de uma tabela geradas sob demanda. c.definir(nome=lambda r: ...) declara; c["nome"] calcula
+    uma vez só, e as dependências são as colunas que a função lê de c. Cada coluna tem seu próprio fluxo
+    aleatório (semente do pedaço + nome), então deixar uma coluna de fora não muda as outras.
+    ctx["_inicio"] é a posição da primeira linha do pedaço na tabela inteira (para os IDs).
+    Com fluxo_unico, todas as colunas sorteiam de rng, na ordem em que são calculadas (tabelas derivadas)."""
+    def __init__(self, n: int, rng: np.random.Generator, ctx: Optional[Dict[str, Any]]=None, fluxo_unico: bool=False):
+        self.n=n; self._unico=rng if fluxo_unico else None; self._semente=None if fluxo_unico else int(rng.integers(2**63))
+        self._defs: Dict[str, Any]={}; self._vals: Dict[str, Any]={}
+        ctx=ctx or {}; self.inicio=ctx.get("_inicio", 0); self._chave_ids=ctx.get("_chave_ids", self._semente)
+
+    def ids(self, nome: str, espaco: int) -> np.ndarray:
+        # únicos na tabela inteira: a chave é da execução, não do pedaço
+        return ids_unicos(self.inicio, self.n, espaco, self._chave_ids ^ zlib.crc32(nome.encode()), nome)
+
+    def definir(self, **defs) -> None:
+        self._defs.update(defs)
+
+    def rng(self, nome: str) -> np.random.Generator:
+        if self._unico is not None: return self._unico
+        return np.random.default_rng([self._semente, zlib.crc32(nome.encode())])
+
+    def __getitem__(self, nome: str):
+        if nome not in self._vals: self._vals[nome]=self._defs[nome](self.rng(nome))
+        return self._vals[nome]
+
+    def tabela(self, nomes: List[str]) -> pd.DataFrame:
+        return pd.DataFrame({c: self[c] for c in nomes}, index=pd.RangeIndex(self.n))
+
+def _pedidas(tema: str, campos: Optional[List[str]]) -> List[str]:
+    # campos pedidos + o que KPIs e pivôs do tema leem, na ordem de CAMPOS_TEMA
+    if campos is None: return list(CAMPOS_TEMA[tema])
+    quer=set(campos)|set(_COLUNAS_SPEC.get(tema, ()))
+    return [c for c in CAMPOS_TEMA[tema] if c in quer]
+
+def _do_catalogo(tab: pd.DataFrame, coluna: str, idx: np.ndarray):
+    # valores da coluna nas linhas sorteadas do catálogo; category continua category
+    v=tab[coluna]
+    return v.array.take(idx) if isinstance(v.dtype, pd.CategoricalDtype) else v.to_numpy()[idx]
+
+# ========= catálogos fixos e tabelas agregadas dos temas =========
+_CULTURAS=["Soja","Milho","Cana-de-Açúcar","Café","Algodão","Arroz","Feijão","Trigo","Laranja","Uva"]
+_INSUMOS=["Fertilizante NPK","Calcário","Herbicida","Inseticida","Fungicida","Sementes Certificadas","Adubo Orgânico","Micronutrientes","Regulador de Crescimento"]
+_ALMOXARIFADOS = [f"AX-{i}" for i in range(1,6)]
+_CATEGORIAS_TV = ["Alimentos","Bebidas","Eletro","Varejo","Serviços","Automotivo","Apps"]
+_DENTES = [f"{arc}-{num}" for arc in ["Sup","Inf"] for num in range(11,49)]
+_CATEGORIAS_MENU = ["Prato","Bebida","Sobremesa"]
+_MENU = {"Prato":["PF Bife","PF Frango","Lasanha","Parmegiana","Feijoada","Strogonoff"],
+         "Bebida":["Refrigerante Lata","Suco 300ml","Água 500ml","Cerveja 600ml","Caipirinha"],
+         "Sobremesa":["Pudim","Mousse","Petit Gateau","Sorvete 2 bolas"]}
+_GRUPOS_MENU = [_MENU[x] for x in _CATEGORIAS_MENU]
+_ITENS_MENU = [i for g in _GRUPOS_MENU for i in g]
+
+def _juros_titulo(valor: np.ndarray, venc: np.ndarray, ref: np.ndarray) -> np.ndarray:
+    return np.where(ref>venc, np.round(0.00033*valor*np.maximum(0,(ref-venc)//np.timedelta64(1,'D')),2), 0.0)
+
+def _qtd_sinal(df: pd.DataFrame) -> np.ndarray:
+    qtd=df["qtd"].to_numpy().astype(np.int64)  # qtd vem em int16: a soma não pode estourar
+    return np.where(df["tipo"].to_numpy()=="Entrada", qtd, -qtd)
+
+def _posicao_estoque(df: pd.DataFrame) -> pd.DataFrame:
+    return (df.assign(saldo=_qtd_sinal(df), valor_mov=df["valor"])
+              .groupby(["sku","produto","categoria","ean13"], as_index=False, sort=True, observed=True).agg({"saldo":"sum","valor_mov":"sum"}).round(2))
+
+def _saldo_acumulado(diario: pd.DataFrame) -> pd.DataFrame:
+    # diario vem ordenado por sku/almox/data (groupby); o saldo corre dentro de cada sku/almox
+    return diario.assign(saldo=(diario["entradas"]-diario["saidas"]).groupby([diario["sku"], diario["almox"]], sort=False, observed=True).cumsum())
+
+def _saldo_diario(df: pd.DataFrame) -> pd.DataFrame:
+    entrada=df["tipo"].to_numpy()=="Entrada"; qtd=df["qtd"].to_numpy().astype(np.int64)
+    diario=(df[["sku","produto","almox","data"]].assign(entradas=np.where(entrada, qtd, 0), saidas=np.where(entrada, 0, qtd))
+              .groupby(["sku","produto","almox","data"], as_index=False, sort=True, observed=True).agg({"entradas":"sum","saidas":"sum"}))
+    return _saldo_acumulado(diario)
+
+# ========= temas declarativos =========
+# Um tema é um dicionário (ou um arquivo JSON/YAML, ver carregar_temas) que registrar_tema compila no
+# gerador por pedaço, nos campos e perfis e na spec da planilha. Chaves do tema:
+#   contexto   função _ctx_* (ou nome de um tema) que monta os catálogos; padrão: só a data de referência
+#   herda      tema de onde vêm o contexto e as colunas (as daqui acrescentam ou substituem)
+#   tabela     tabela principal do bundle; campos: ordem das colunas públicas (padrão: a de colunas)
+#   colunas    nome -> definição; nomes com "_" são internos (lidos por outras colunas, nunca saem)
+#   derivadas  tabela -> {"prob", "colunas"}: uma fração das linhas, com colunas sorteadas num fluxo só
+#   agregadas  tabela -> {"colunas", "gerar", "chaves", "funcs"[, "pos"]}: agrega colunas da principal
+#   abas, kpis (rótulo, calc, fmt), pivos, basico, apelidos
+# Definição de coluna: uma das chaves abaixo, mais "abs", "min", "max", "casas", "tipo" (nessa ordem) e "fmt".
+#   {"normal": (média, desvio)}   {"inteiros": (a, b)}   {"pesos": _Amostrador ou [[valor, peso], ...]}
+#   {"escolha": lista ou nome no contexto, "categorico"}   {"prob": p[, "rotulos": (sim, não)]}
+#   {"datas": dias, "meses", "semana", "horas", "comercial", "dia"}   {"fixo": valor}
+#   {"apos": expr, "dias"|"dias_entre"|"dias_de"|"prazo", "se"|"prob"|"nulo", "dia"}   {"doc": "cpf"|"cnpj"|"ie"}
+#   {"fk": tabela do contexto, "por": coluna de índice, "coluna"}   {"linha_de": tabela}   {"fake": método, "reserva"}
+#   {"id": espaço, "prefixo", "largura", "base"}   {"herda": coluna da tabela principal} (em derivadas)
+#   ou uma expressão numpy em texto, como "round(quantidade*preco_unit*(1-desconto), 2)": os nomes são colunas,
+#   itens do contexto ou funções ligadas ao fluxo da coluna (normal, uniforme, inteiros, escolha, sorteio, prazo...).
+#   Sem builtins, só chamadas dessas funções e atributos astype/itens/index: ver _validar_expressao e _global_expr.
+ESQUEMAS_TEMAS: Dict[str, Dict[str, Any]] = {
+    "Market": {
+        "contexto": _ctx_market, "tabela": "dados", "apelidos": ["mercado"],
+        "colunas": {
+            "_ci": {"linha_de": "_clientes"}, "_pi": {"linha_de": "produtos"},
+            "data": {"datas": 365, "meses": _SAZ_VAREJO, "horas": (8,22), "dia": True},
+            "cliente": {"fk": "_clientes", "por": "_ci", "coluna": "cliente_nome"},
+            "empresa": {"fk": "_clientes", "por": "_ci"}, "uf": {"fk": "_clientes", "por": "_ci"},
+            "cidade": {"fk": "_clientes", "por": "_ci"}, "segmento": {"fk": "_clientes", "por": "_ci"},
+            "sku": {"fk": "produtos", "por": "_pi"}, "ean13": {"fk": "produtos", "por": "_pi"}, "produto": {"fk": "produtos", "por": "_pi"},
+            "categoria": {"fk": "produtos", "por": "_pi"}, "marca": {"fk": "produtos", "por": "_pi"}, "unidade": {"fk": "produtos", "por": "_pi"},
+            "_preco_base": {"fk": "produtos", "por": "_pi", "coluna": "preco_base"},
+            "quantidade": {"normal": (3.0,1.4), "abs": True, "min": 1, "casas": 0, "tipo": "int16"},
+            "preco_unit": "round(_preco_base*sorteio(_FATOR_PRECO), 2)",
+            "desconto": {"pesos": _DESCONTOS, "casas": 2},
+            "receita": "round(quantidade*preco_unit*(1-desconto), 2)",
+            "pagamento": {"pesos": _PAGAMENTOS},
+        },
+        "basico": ["data","empresa","produto","categoria","unidade","quantidade","preco_unit","receita"],
+        "abas": [{"nome":"Vendas","fonte":"dados","freeze":"B2"},
+                 {"nome":"Clientes","fonte":"clientes","colunas":["empresa","cnpj","cidade","uf","segmento"]},
+                 {"nome":"Produtos","fonte":"produtos","colunas":["sku","ean13","produto","categoria","marca","unidade","preco_base"]}],
+        "kpis": [("Receita Total",("soma","dados","receita"),"currency"), ("Itens Vendidos",("soma","dados","quantidade"),"int"),
+                 ("Ticket Médio",("razao","dados","receita","quantidade"),"float")],
+        "pivos": [{"nome":"Receita por Categoria","aba":"Vendas","indice":"categoria","valores":{"receita":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Financeira": {
+        "contexto": _ctx_financeira, "tabela": "titulos",
+        "colunas": {
+            "_ci": {"linha_de": "_clientes"},
+            "_emissao": {"datas": 365, "comercial": True}, "_venc": {"apos": "_emissao", "dias": _PRAZOS},
+            "_data_pag": {"apos": "_venc", "prazo": (1.8,3.8), "se": "pago"},
+            "emissao": "dia(_emissao)", "vencimento": "dia(_venc)",
+            "empresa": {"fk": "_clientes", "por": "_ci"}, "cnpj": {"fk": "_clientes", "por": "_ci"},
+            "cidade": {"fk": "_clientes", "por": "_ci"}, "uf": {"fk": "_clientes", "por": "_ci"},
+            "banco": {"escolha": ["Banco do Brasil","Caixa","Bradesco","Itaú","Santander","Sicredi","Sicoob","BTG Pactual","Inter","Nubank","Safra"]},
+            "nosso_numero": {"id": 9*10**10, "base": 10**10},
+            "valor_face": {"pesos": _VALOR_TITULO, "casas": 2},
+            "multa": "round(where(pago & (_data_pag>_venc), 0.02*valor_face, 0.0), 2)",
+            "juros": "_juros_titulo(valor_face, _venc, where(pago, _data_pag, agora))",
+            "desconto": "where(pago & (uniforme()<0.1), round(sorteio(_DESC_TITULO).astype(float)*valor_face, 2), 0.0)",
+            "pago": {"prob": 0.88}, "data_pagamento": "dia(_data_pag)",
+            "valor_liquido": "where(pago, round((valor_face+multa+juros)-desconto, 2), 0.0)",
+        },
+        "basico": ["emissao","vencimento","empresa","valor_face","pago","valor_liquido"],
+        "abas": [{"nome":"Títulos","fonte":"titulos"}, {"nome":"Sacados","fonte":"sacados","colunas":["empresa","cnpj","cidade","uf","segmento"]}],
+        "kpis": [("Carteira (face)",("soma","titulos","valor_face"),"currency"), ("Recebido (líquido)",("soma","titulos","valor_liquido"),"currency"),
+                 ("% Pago",("pct","titulos","pago"),"float")],
+        "pivos": [{"nome":"Carteira por UF","aba":"Títulos","indice":"uf","valores":{"valor_face":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Logística": {
+        "contexto": _ctx_logistica, "tabela": "embarques", "apelidos": ["logistica"],
+        "colunas": {
+            "_ci": {"linha_de": "_clientes"}, "_mi": "indices(_MODAIS)",
+            "_coleta": {"datas": 365, "comercial": True, "horas": (7,19)}, "_prev": {"apos": "_coleta", "prazo": (3.6,1.5,1)},
+            "pedido": {"id": 10**8, "prefixo": "PED", "largura": 8},
+            "cliente": {"fk": "_clientes", "por": "_ci", "coluna": "empresa"},
+            "origem_uf": {"escolha": UFs}, "destino_uf": {"fk": "_clientes", "por": "_ci", "coluna": "uf"},
+            "modal": "de_codigos(_mi, _MODAIS.itens)",
+            "coleta": "dia(_coleta)", "previsao_entrega": "dia(_prev)",
+            "entrega": {"apos": "_prev", "prazo": (0.4,1.0), "se": "entregue", "dia": True},
+            "transportadora": {"escolha": ["Rapidão Norte","TransLog BR","ViaCargo","Azul Cargo","Correios","JadLog","Total Express","Sequoia","Loggi","Braspress","DDL Express"]},
+            "peso_kg": {"normal": (16,9), "min": 0.2, "casas": 2}, "volume_m3": {"normal": (0.14,0.08), "min": 0.01, "casas": 3},
+            "distancia_km": {"normal": (520,240), "abs": True, "min": 10, "tipo": "int32"},
+            "frete": "round(_FRETE_MODAL[_mi]*peso_kg + 0.28*distancia_km + 12, 2)",
+            "entregue": {"prob": 0.95},
+        },
+        "basico": ["pedido","cliente","destino_uf","modal","coleta","previsao_entrega","frete","entregue"],
+        "abas": [{"nome":"Embarques","fonte":"embarques","freeze":"B2"}, {"nome":"Clientes","fonte":"clientes","colunas":["empresa","cnpj","cidade","uf"]}],
+        "kpis": [("Frete Total",("soma","embarques","frete"),"currency"), ("Peso Total (kg)",("soma","embarques","peso_kg"),"float"),
+                 ("% Entregue",("pct","embarques","entregue"),"float")],
+        "pivos": [{"nome":"Frete por Modal","aba":"Embarques","indice":"modal","valores":{"frete":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Agro": {
+        "contexto": _ctx_agro, "tabela": "colheita",
+        "colunas": {
+            "_pi": {"linha_de": "_produtores"}, "_plantio": {"datas": 300, "meses": _SAZ_PLANTIO, "horas": (6,18)},
+            "produtor": {"fk": "_produtores", "por": "_pi"}, "uf": {"fk": "_produtores", "por": "_pi"},
+            "talhao": {"escolha": "_talhoes"}, "cultura": {"escolha": _CULTURAS},
+            "area_ha": {"normal": (48,22), "min": 1.0, "casas": 1},
+            "plantio": "dia(_plantio)", "colheita": {"apos": "_plantio", "dias": _CICLO_CULTURA, "dia": True},
+            "produtividade_t_ha": {"normal": (3.2,0.8), "min": 0.8, "casas": 2}, "producao_t": "round(produtividade_t_ha*area_ha, 2)",
+            "preco_t": {"pesos": _PRECO_TON, "casas": 2}, "receita": "round(producao_t*preco_t, 2)",
+        },
+        "derivadas": {"insumos": {"prob": 0.75, "colunas": {
+            "produtor": {"herda": "produtor"}, "talhao": {"herda": "talhao"}, "cultura": {"herda": "cultura"},
+            "_ii": {"linha_de": "catalogo"}, "item": {"fk": "catalogo", "por": "_ii"}, "sku": {"fk": "catalogo", "por": "_ii"},
+            "qtd": {"normal": (8,4), "abs": True, "min": 1, "tipo": "int16"},
+            "_preco": {"fk": "catalogo", "por": "_ii", "coluna": "preco_base"}, "custo_total": "round(_preco*qtd*sorteio(_FATOR_INSUMO), 2)",
+        }}},
+        "basico": ["produtor","cultura","area_ha","plantio","colheita","producao_t","receita"],
+        "abas": [{"nome":"Colheita","fonte":"colheita"}, {"nome":"Insumos","fonte":"insumos","colunas":["produtor","talhao","cultura","item","sku","qtd","custo_total"]},
+                 {"nome":"Produtores","fonte":"produtores","colunas":["produtor","cnpj","cpf","cidade","uf"]},
+                 {"nome":"Catálogo","fonte":"catalogo","colunas":["sku","item","cultura","preco_base"]}],
+        "kpis": [("Receita Total",("soma","colheita","receita"),"currency"), ("Área Total (ha)",("soma","colheita","area_ha"),"float"),
+                 ("Produtividade Média (t/ha)",("media","colheita","produtividade_t_ha"),"float")],
+        "pivos": [{"nome":"Receita por Cultura","aba":"Colheita","indice":"cultura","valores":{"receita":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Supermercado": {
+        "herda": "Market", "tabela": "dados", "apelidos": ["super-mercado"],
+        "colunas": {
+            "loja": {"escolha": [f"Loja {i:02d}" for i in range(1,16)]}, "gondola": {"escolha": [f"G{i:02d}" for i in range(1,31)]},
+            "lote": {"id": 10**8, "prefixo": "L", "largura": 8}, "validade": {"apos": "hoje", "prazo": (35,25,1)},
+        },
+        "campos": ["data","loja","gondola","lote","validade","sku","ean13","produto","categoria","marca","unidade","quantidade","preco_unit","desconto","receita","pagamento"],
+        "basico": ["data","loja","produto","categoria","quantidade","preco_unit","receita","validade"],
+        "abas": [{"nome":"Vendas Super","fonte":"dados","freeze":"B2"}],
+        "kpis": [("Receita (Super)",("soma","dados","receita"),"currency"), ("Itens",("soma","dados","quantidade"),"int")],
+        "pivos": [{"nome":"Itens por Loja","aba":"Vendas Super","indice":"loja","valores":{"quantidade":"sum"},"casas":0,"eixo":"Unid"}],
+    },
+    "Estoque": {
+        "contexto": _ctx_estoque, "tabela": "mov",
+        "colunas": {
+            "_pi": {"linha_de": "_produtos"},
+            "data": {"datas": 180, "comercial": True, "dia": True}, "almox": {"escolha": _ALMOXARIFADOS},
+            "sku": {"fk": "_produtos", "por": "_pi"}, "ean13": {"fk": "_produtos", "por": "_pi"},
+            "produto": {"fk": "_produtos", "por": "_pi"}, "categoria": {"fk": "_produtos", "por": "_pi"},
+            "_preco_base": {"fk": "_produtos", "por": "_pi", "coluna": "preco_base"},
+            "tipo": {"pesos": _TIPO_MOV}, "qtd": {"normal": (8,6), "abs": True, "min": 1, "tipo": "int16"},
+            "custo_unit": "round(_preco_base*sorteio(_FATOR_CUSTO), 2)", "valor": "round(qtd*custo_unit, 2)",
+        },
+        "agregadas": {
+            "posicao": {"colunas": ["sku","produto","categoria","ean13","tipo","qtd","valor"], "gerar": _posicao_estoque,
+                        "chaves": ["sku","produto","categoria","ean13"], "funcs": {"saldo":"sum","valor_mov":"sum"}},
+            "saldo_diario": {"colunas": ["sku","produto","almox","data","tipo","qtd"], "gerar": _saldo_diario,
+                             "chaves": ["sku","produto","almox","data"], "funcs": {"entradas":"sum","saidas":"sum"}, "pos": _saldo_acumulado},
+        },
+        "basico": ["data","almox","sku","produto","tipo","qtd","valor"],
+        "abas": [{"nome":"Movimentações","fonte":"mov"}, {"nome":"Posição","fonte":"posicao"}, {"nome":"Saldo Diário","fonte":"saldo_diario"}],
+        "kpis": [("Saldo Total (itens)",("soma","posicao","saldo"),"int"), ("Valor Movimentado",("soma","mov","valor"),"currency")],
+        "pivos": [{"nome":"Saldo por Categoria","aba":"Posição","indice":"categoria","valores":{"saldo":"sum"},"casas":0,"eixo":"Unid"}],
+    },
+
+    # novos
+    "Saúde": {
+        "contexto": _ctx_saude, "tabela": "consultas", "apelidos": ["saude","clinica","clínica"],
+        "colunas": {
+            "data": {"datas": 365, "comercial": True, "horas": (7,19), "dia": True}, "paciente": {"fake": "name", "reserva": "Paciente "},
+            "cpf": {"doc": "cpf"},
+            "especialidade": {"escolha": ["Clínico Geral","Cardiologia","Ortopedia","Dermatologia","Pediatria","Ginecologia","Oftalmologia"]},
+            "profissional": {"escolha": "_prof"}, "procedimento": {"fixo": "Consulta"},
+            "convenio": {"escolha": ["Particular","Unimed","Amil","Bradesco Saúde","SulAmérica","Hapvida","IPASGO"]},
+            "valor": {"pesos": _VALOR_CONSULTA, "casas": 2}, "pago": {"prob": 0.85},
+            "retorno_previsto": {"apos": "data", "dias_de": [7,15,30,0], "prob": 0.4},
+        },
+        "derivadas": {"exames": {"prob": 0.5, "colunas": {
+            "data": {"herda": "data"}, "paciente": {"herda": "paciente"},
+            "tipo_exame": {"escolha": ["Hemograma","Raio-X Tórax","US Abdômen","Colesterol","Glicemia","Eletrocardiograma"]},
+            "resultado": {"prob": 0.5, "rotulos": ("Aguardando","Normal")}, "valor": {"pesos": _VALOR_EXAME, "casas": 2}, "pago": {"prob": 0.8},
+        }}},
+        "basico": ["data","paciente","especialidade","procedimento","valor","pago"],
+        "abas": [{"nome":"Consultas","fonte":"consultas"}, {"nome":"Exames","fonte":"exames","opcional":True}],
+        "kpis": [("Faturamento Consultas",("soma","consultas","valor"),"currency"), ("% Pago",("pct","consultas","pago"),"float")],
+        "pivos": [{"nome":"Valor por Especialidade","aba":"Consultas","indice":"especialidade","valores":{"valor":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Educação": {
+        "contexto": _ctx_educacao, "tabela": "avaliacoes", "apelidos": ["educacao","escola"],
+        "colunas": {
+            "data": {"datas": 200, "meses": _SAZ_LETIVO, "semana": _UTEIS, "horas": (7,22), "dia": True},
+            "aluno": {"escolha": "_alunos"}, "turma": {"escolha": "_turmas"},
+            "disciplina": {"escolha": ["Português","Matemática","História","Geografia","Ciências","Inglês","Artes","Educação Física"]},
+            "avaliacao": {"escolha": ["P1","P2","Trabalho","Prova Final"]},
+            "nota": {"normal": (7.2,1.8), "min": 0, "max": 10, "casas": 1}, "frequencia_pct": {"normal": (88,8), "min": 40, "max": 100, "casas": 1},
+        },
+        "basico": ["data","aluno","disciplina","avaliacao","nota"],
+        "abas": [{"nome":"Avaliações","fonte":"avaliacoes"}, {"nome":"Matrículas","fonte":"matriculas"}],
+        "kpis": [("Média Geral",("media","avaliacoes","nota"),"float"), ("Presença Média (%)",("media","avaliacoes","frequencia_pct"),"float")],
+        "pivos": [{"nome":"Média por Disciplina","aba":"Avaliações","indice":"disciplina","valores":{"nota":"mean"},"casas":2,"eixo":"Nota"}],
+    },
+    "Televisão": {
+        "tabela": "audiencia", "apelidos": ["televisao","tv"],
+        "colunas": {
+            "data_hora": {"datas": 90, "horas": (6,24)},
+            "emissora": {"escolha": ["Globo","SBT","Record","Band","RedeTV!","Cultura"]},
+            "programa": {"escolha": ["Jornal da Noite","Novela das 9","Reality Show","Talk Show","Esporte Total","Filme"]},
+            "duracao_min": {"normal": (60,25), "abs": True, "min": 20, "max": 180, "tipo": "int16"},
+            "audiencia_pontos": {"normal": ("where(emissora=='Globo', 8.0, 3.0)", 2.0), "min": 0.2, "casas": 2},
+            "share_pct": {"normal": ("where(emissora=='Globo', 24, 10)", 6), "min": 1, "max": 60, "casas": 2},
+        },
+        "derivadas": {"comerciais": {"prob": 0.6, "colunas": {
+            "data_hora": {"herda": "data_hora"}, "emissora": {"herda": "emissora"}, "programa": {"herda": "programa"},
+            "anunciante": "juntar(escolha(_CATEGORIAS_TV).astype(str), ' ', inteiros(1, 100).astype(str))",
+            "categoria": {"escolha": _CATEGORIAS_TV}, "preco_30s": {"pesos": _PRECO_30S, "casas": 2},
+        }}},
+        "basico": ["data_hora","emissora","programa","audiencia_pontos","share_pct"],
+        "abas": [{"nome":"Audiência","fonte":"audiencia"}, {"nome":"Comerciais","fonte":"comerciais"}],
+        "kpis": [("Pontos Médios",("media","audiencia","audiencia_pontos"),"float"), ("Share Médio (%)",("media","audiencia","share_pct"),"float")],
+        "pivos": [{"nome":"Audiência por Emissora","aba":"Audiência","indice":"emissora","valores":{"audiencia_pontos":"mean"},"casas":2,
+                   "titulo":"Pontos médios por Emissora","eixo":"Pontos"}],
+    },
+    "Informática": {
+        "contexto": _ctx_informatica, "tabela": "tickets", "apelidos": ["informatica","helpdesk","ti"],
+        "colunas": {
+            "_fechado": "isin(status, ['Resolvido','Cancelado'])",
+            "_horas": {"normal": ("sla_h*0.8", "sla_h*0.4"), "abs": True, "min": 1, "tipo": "int64"},
+            "ticket": {"id": 10**8, "prefixo": "INC", "largura": 8}, "abertura": {"datas": 180, "comercial": True},
+            "solicitante": {"escolha": "_usuarios"},
+            "categoria": {"escolha": ["Acesso","Email","Impressora","Rede","Hardware","Software","Backup","Segurança"]},
+            "prioridade": {"escolha": ["Baixa","Média","Alta","Crítica"]},
+            "sla_h": {"normal": (16,8), "abs": True, "min": 2, "tipo": "int16"},
+            "fechamento": "where(_fechado, abertura+_horas.astype('timedelta64[h]'), NaT)",
+            "status": {"pesos": _STATUS_TICKET}, "tempo_atendimento_h": "where(_fechado, round(_horas, 1), nan)",
+            "satisfacao": "com_nulos(inteiros(3, 6).astype(int8), status!='Resolvido')",
+        },
+        "basico": ["ticket","abertura","categoria","prioridade","status","tempo_atendimento_h"],
+        "abas": [{"nome":"Tickets","fonte":"tickets","freeze":"B2"}, {"nome":"Ativos","fonte":"ativos"}],
+        "kpis": [("% Resolvidos",("pct_igual","tickets","status","Resolvido"),"float"), ("Satisfação Média",("media","tickets","satisfacao"),"float"),
+                 ("TMA (h)",("media","tickets","tempo_atendimento_h"),"float")],
+        "pivos": [{"nome":"Tickets por Categoria","aba":"Tickets","indice":"categoria","valores":{"ticket":"count"},"casas":0,"eixo":"Qtde"}],
+    },
+    "Odontologia": {
+        "contexto": _ctx_odontologia, "tabela": "atendimentos", "apelidos": ["odonto"],
+        "colunas": {
+            "data": {"datas": 365, "comercial": True, "dia": True}, "paciente": {"fake": "name", "reserva": "Paciente "},
+            "dentista": {"escolha": "_dentistas"},
+            "procedimento": {"escolha": ["Profilaxia","Restauração","Canal","Extração","Clareamento","Implante","Consulta"]},
+            "dente": "where(isin(procedimento, ['Restauração','Canal','Extração','Implante']), escolha(_DENTES), None)",
+            "convenio": {"escolha": ["Particular","OdontoPrev","Amil Dental","Bradesco Dental","SulAmérica Odonto"]},
+            "valor": {"pesos": _VALOR_ODONTO, "casas": 2}, "pago": {"prob": 0.85},
+        },
+        "basico": ["data","paciente","procedimento","valor","pago"],
+        "abas": [{"nome":"Atendimentos","fonte":"atendimentos"}],
+        "kpis": [("Faturamento Odonto",("soma","atendimentos","valor"),"currency"), ("% Pago",("pct","atendimentos","pago"),"float")],
+        "pivos": [{"nome":"Valor por Procedimento","aba":"Atendimentos","indice":"procedimento","valores":{"valor":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Restaurante": {
+        "tabela": "pedidos", "apelidos": ["bar","lanchonete"],
+        "colunas": {
+            "_ci": {"inteiros": (0, len(_CATEGORIAS_MENU))},
+            "data": {"datas": 120, "semana": _SEMANA_BAR, "horas": (11,24), "dia": True},
+            "mesa": {"escolha": [f"M{i:02d}" for i in range(1,40)]}, "garcom": {"escolha": [f"Garçom {i:02d}" for i in range(1,25)]},
+            "categoria": "de_codigos(_ci, _CATEGORIAS_MENU)", "item": "categorias(escolha_por_grupo(_GRUPOS_MENU, _ci), _ITENS_MENU)",
+            "quantidade": {"normal": (1.4,0.9), "abs": True, "min": 1, "tipo": "int16"},
+            "preco_unit": "round(where(_ci==_CATEGORIAS_MENU.index('Bebida'), sorteio(_PRECO_BEBIDA), sorteio(_PRECO_PRATO)).astype(float), 2)",
+            "total": "round(preco_unit*quantidade, 2)", "pagamento": {"escolha": ["Pix","Crédito","Débito","Dinheiro"]},
+        },
+        "basico": ["data","mesa","item","quantidade","preco_unit","total"],
+        "abas": [{"nome":"Pedidos","fonte":"pedidos"}],
+        "kpis": [("Faturamento",("soma","pedidos","total"),"currency"), ("Ticket Médio",("media","pedidos","total"),"currency"),
+                 ("Itens Vendidos",("soma","pedidos","quantidade"),"int")],
+        "pivos": [{"nome":"Vendas por Categoria","aba":"Pedidos","indice":"categoria","valores":{"total":"sum"},"casas":2,"eixo":"R$"}],
+    },
+    "Construção": {
+        "contexto": _ctx_construcao, "tabela": "obras", "apelidos": ["construcao","obra"],
+        "colunas": {
+            "obra": {"escolha": [f"Obra {i:03d}" for i in range(1,60)], "categorico": False}, "cliente": {"escolha": "_clientes"},
+            "cidade": {"fake": "city", "reserva": ("Cidade ", 1, 201)},
+            "data_inicio": {"datas": 540, "comercial": True, "dia": True}, "data_prev_fim": {"apos": "data_inicio", "dias_entre": (90,421)},
+            "data_fim": {"apos": "data_prev_fim", "prazo": (10,20), "nulo": 0.7},
+            "etapa": {"escolha": ["Projeto","Fundação","Estrutura","Alvenaria","Instalações","Acabamento","Entrega"]},
+            "progresso_pct": {"normal": (45,30), "min": 0, "max": 100, "casas": 1},
+            "custo_orcado": {"pesos": _ORCAMENTO, "casas": 2}, "custo_real": "round(custo_orcado*sorteio(_DESVIO_OBRA), 2)",
+        },
+        "derivadas": {"compras": {"prob": 0.8, "colunas": {
+            "obra": {"herda": "obra"},
+            "material": {"escolha": ["Cimento","Areia","Brita","Tijolo","Aço","Piso","Revestimento","Tinta","Cano PVC"]},
+            "unidade": {"escolha": ["saco","m³","kg","un","m²"]},
+            "qtd": {"normal": (50,40), "abs": True, "min": 1, "tipo": "int16"}, "custo_total": {"pesos": _CUSTO_COMPRA, "casas": 2},
+        }}},
+        "basico": ["obra","etapa","progresso_pct","custo_real"],
+        "abas": [{"nome":"Obras","fonte":"obras"}, {"nome":"Compras","fonte":"compras"}],
+        "kpis": [("Desvio Orçamentário (R$)",("dif","obras","custo_real","custo_orcado"),"currency"), ("% Conclusão Média",("media","obras","progresso_pct"),"float")],
+        "pivos": [{"nome":"Custo por Etapa","aba":"Obras","indice":"etapa","valores":{"custo_real":"sum"},"casas":2,"eixo":"R$"}],
+    },
+}
+
+# ========= compilador de temas =========
+# registrar_tema transforma cada definição de coluna em f(c, r, ctx) -> array do pedaço inteiro e
+# preenche os registros abaixo, que o resto do módulo consulta pelo nome do tema.
+_ESQUEMAS: Dict[str, Dict[str, Any]] = {}
+_TEMAS: Dict[str, Any] = {}
+_CONTEXTOS: Dict[str, Any] = {}
+CAMPOS_TEMA: Dict[str, List[str]] = {}
+PERFIL_IDX: Dict[str, Dict[str, List[str]]] = {}
+_COLUNAS_SPEC: Dict[str, Tuple[str, ...]] = {}  # colunas que KPIs e pivôs leem: geradas mesmo fora dos campos
+_AGREGADAS: Dict[str, Dict[str, Tuple]] = {}    # ao juntar pedaços são reagregadas (chaves, {coluna: função}[, pós-processo])
+_FMT_DECLARADO: Dict[str, Dict[str, str]] = {}  # tema -> {coluna: "fmt" declarado}, antes das listas de _col_def
+_TEMAS_EXTERNOS: Dict[str, str] = {}            # temas fora de ESQUEMAS_TEMAS -> assinatura (entra na chave do cache)
+ALIASES: Dict[str, str] = {}
+
+_EXPR_NUMPY = {"where":np.where, "maximum":np.maximum, "minimum":np.minimum, "clip":np.clip, "isin":np.isin, "round":np.round, "abs":np.abs,
+               "rint":np.rint, "nan":np.nan, "NaT":np.datetime64("NaT"), "int8":np.int8, "int16":np.int16, "int32":np.int32, "int64":np.int64,
+               "dias":_dias, "juntar":_juntar, "prefixo":_prefixo, "categorias":_categorias,
+               "de_codigos":lambda codigos, categorias: pd.Categorical.from_codes(codigos, categorias),
+               "float":float, "int":int, "bool":bool, "str":str, "len":len}
+# Expressões vêm também de arquivos (--temas): só aritmética, comparações, chamadas e subscritos, sem builtins.
+# Do módulo, alcançam só dados (_valor_expr: arrays, escalares, _Amostrador, listas/tuplas deles), nunca
+# dicionários de registro, funções, classes ou módulos. Chamadas só de nomes de _EXPR_NUMPY, das funções
+# do fluxo (_Escopo), de _FUNCOES_MODULO_EXPR e dos métodos de _METODOS_EXPR; atributos, só os de _ATRIBUTOS_EXPR.
+_FUNCOES_MODULO_EXPR = {"_juros_titulo"}
+_FUNCOES_FLUXO = {"normal","uniforme","inteiros","escolha","sorteio","indices","prazo","escolha_por_grupo","dia","com_nulos"}
+_ATRIBUTOS_EXPR = {"astype", "itens", "index"}
+_METODOS_EXPR = {"astype", "index"}
+
+def _valor_expr(v) -> bool:
+    if isinstance(v, (list, tuple)): return all(_valor_expr(x) for x in v)
+    if isinstance(v, np.ndarray): return v.dtype!=object or all(_valor_expr(x) for x in v.ravel())
+    return v is None or isinstance(v, (_Amostrador, str, int, float, np.generic, datetime))
+
+def _global_expr(nome: str):
+    v=globals().get(nome, _global_expr)
+    if v is not _global_expr and not nome.startswith("__") and _valor_expr(v): return v
+    raise NameError(f"nome {nome!r} não disponível em expressões de coluna")
+
+class _Escopo(dict):
+    """Nomes de uma expressão de coluna: funções ligadas ao fluxo aleatório da coluna, depois as colunas
+    da tabela e os itens do contexto; o que sobra vem das tabelas do módulo (_FATOR_PRECO, ...; ver _global_expr).
+    Funções só estão nos nomes fixos; __missing__ nunca devolve algo chamável."""
+    def __init__(self, c: _Colunas, r: np.random.Generator, ctx: Dict[str, Any]):
+        n=c.n; agora=ctx["_agora"]; self._c=c; self._ctx=ctx
+        super().__init__(_EXPR_NUMPY, **{f: globals()[f] for f in _FUNCOES_MODULO_EXPR}, n=n, r=r, ctx=ctx, agora=agora, hoje=agora.astype('datetime64[D]'),
+                         normal=lambda m, s: r.normal(m, s, n), uniforme=lambda: r.random(n), inteiros=lambda a, b: r.integers(a, b, n),
+                         escolha=lambda op, categorico=False: _escolha(r, op, n, categorico), sorteio=lambda a, categorico=False: a.amostrar(r, n, categorico),
+                         indices=lambda a: a.indices(r, n), prazo=lambda m, s, minimo=0, unidade='D': _prazo(r, n, m, s, minimo, unidade),
+                         escolha_por_grupo=lambda grupos, gi: _escolha_por_grupo(r, grupos, gi), dia=lambda v: v.astype('datetime64[D]'),
+                         com_nulos=lambda v, mascara: pd.arrays.IntegerArray(v, np.asarray(mascara)))
+    def __missing__(self, nome: str):
+        if nome in self._c._defs: v=self._c[nome]
+        elif nome in self._ctx: v=self._ctx[nome]
+        else: return _global_expr(nome)
+        if callable(v): raise NameError(f"nome {nome!r} não disponível em expressões de coluna")
+        return v
+
+_CHAMAVEIS_EXPR = {k for k, v in _EXPR_NUMPY.items() if callable(v)} | _FUNCOES_FLUXO | _FUNCOES_MODULO_EXPR
+
+def _validar_expressao(onde: str, arvore) -> None:
+    import ast
+    nos=(ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.keyword, ast.Name, ast.Load, ast.Constant,
+         ast.Attribute, ast.Subscript, ast.Slice, ast.List, ast.Tuple, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+    for no in ast.walk(arvore):
+        if not isinstance(no, nos): raise ValueError(f"{onde}: {type(no).__name__} não é permitido em expressões de coluna")
+        if isinstance(no, ast.Name) and no.id.startswith("__"): raise ValueError(f"{onde}: nome {no.id!r} não é permitido")
+        if isinstance(no, ast.Attribute) and no.attr not in _ATRIBUTOS_EXPR: raise ValueError(f"{onde}: atributo {no.attr!r} não é permitido (só {sorted(_ATRIBUTOS_EXPR)})")
+        if isinstance(no, ast.Call) and not (isinstance(no.func, ast.Name) and no.func.id in _CHAMAVEIS_EXPR or isinstance(no.func, ast.Attribute) and no.func.attr in _METODOS_EXPR):
+            raise ValueError(f"{onde}: {ast.unparse(no.func)!r} não pode ser chamado (só funções de expressão e os métodos {sorted(_METODOS_EXPR)})")
+
+def _expressao(onde: str, texto: str):
+    import ast
+    arvore=ast.parse(texto, f"<{onde}>", mode="eval"); _validar_expressao(onde, arvore)
+    codigo=compile(arvore, f"<{onde}>", "eval")
+    return lambda c, r, ctx: eval(codigo, {"__builtins__": {}}, _Escopo(c, r, ctx))
+
+def _param(v, onde: str):
+    # parâmetro numérico ou expressão (ex.: a média da normal depender de outra coluna)
+    if isinstance(v, str): return _expressao(onde, v)
+    return lambda c, r, ctx: v
+
+def _referencia(v, ctx: Dict[str, Any]):
+    # nome no contexto ou constante do módulo (arquivos JSON/YAML não têm como passar objetos)
+    if not isinstance(v, str): return v
+    return ctx[v] if v in ctx else _global_expr(v)
+
+def _amostrador(v) -> _Amostrador:
+    if isinstance(v, str): v=_global_expr(v)
+    return v if isinstance(v, _Amostrador) else _Amostrador([tuple(p) for p in v])
+
+def _pos(v, d: Dict[str, Any]):
+    if d.get("abs"): v=np.abs(v)
+    lo, hi = d.get("min"), d.get("max")
+    if lo is not None and hi is not None: v=np.clip(v, lo, hi)
+    elif lo is not None: v=np.maximum(lo, v)
+    elif hi is not None: v=np.minimum(v, hi)
+    if "casas" in d: v=np.round(v, d["casas"])
+    return v.astype(d["tipo"]) if "tipo" in d else v
+
+def _col_normal(onde, nome, d):
+    m, s = (_param(p, onde) for p in d["normal"])
+    return lambda c, r, ctx: _pos(r.normal(m(c, r, ctx), s(c, r, ctx), c.n), d)
+
+def _col_inteiros(onde, nome, d):
+    a, b = d["inteiros"]
+    return lambda c, r, ctx: _pos(r.integers(a, b, c.n), d)
+
+def _col_pesos(onde, nome, d):
+    a=_amostrador(d["pesos"])
+    if a.itens.dtype==object: return lambda c, r, ctx: a.amostrar(r, c.n, True)
+    return lambda c, r, ctx: _pos(a.amostrar(r, c.n).astype(float), d)
+
+def _col_escolha(onde, nome, d):
+    op=d["escolha"]; cat=d.get("categorico", not isinstance(op, str))
+    if not isinstance(op, str): op=np.asarray(op, dtype=object)
+    return lambda c, r, ctx: _escolha(r, _referencia(op, ctx), c.n, cat)
+
+def _col_prob(onde, nome, d):
+    p=d["prob"]; rot=d.get("rotulos")
+    if rot is None: return lambda c, r, ctx: r.random(c.n)<p
+    return lambda c, r, ctx: pd.Categorical.from_codes((r.random(c.n)>=p).astype(np.int8), list(rot))
+
+def _col_datas(onde, nome, d):
+    semana=d.get("semana", _UTEIS if d.get("comercial") else None); horas=tuple(d.get("horas", (8,18) if d.get("comercial") else (0,24)))
+    def f(c, r, ctx):
+        v=_amostrar_datas(r, c.n, _janela(ctx, d["datas"]), ctx["_agora"], meses=_referencia(d.get("meses"), ctx), semana=_referencia(semana, ctx), horas=horas)
+        return v.astype('datetime64[D]') if d.get("dia") else v
+    return f
+
+def _col_apos(onde, nome, d):
+    base=_param(d["apos"], onde); se=_param(d["se"], onde) if "se" in d else None
+    if "dias" in d: a=_amostrador(d["dias"]); desloc=lambda c, r: _dias(a.amostrar(r, c.n))
+    elif "dias_entre" in d: lo, hi = d["dias_entre"]; desloc=lambda c, r: _dias(r.integers(lo, hi, c.n))
+    elif "dias_de" in d: op=np.asarray(d["dias_de"]); desloc=lambda c, r: _dias(op[r.integers(0, len(op), c.n)])
+    elif "prazo" in d: pz=tuple(d["prazo"]); desloc=lambda c, r: _prazo(r, c.n, *pz)
+    else: raise ValueError(f"{onde}: 'apos' precisa de dias, dias_entre, dias_de ou prazo")
+    def f(c, r, ctx):
+        u=r.random(c.n) if "prob" in d or "nulo" in d else None  # sorteado antes do deslocamento
+        v=base(c, r, ctx)+desloc(c, r)
+        if se is not None: v=np.where(se(c, r, ctx), v, np.datetime64('NaT'))
+        elif "prob" in d: v=np.where(u<d["prob"], v, np.datetime64('NaT'))
+        elif "nulo" in d: v=np.where(u<d["nulo"], np.datetime64('NaT'), v)
+        return v.astype('datetime64[D]') if d.get("dia") else v
+    return f
+
+def _col_fk(onde, nome, d):
+    tab, por, col = d["fk"], d["por"], d.get("coluna", nome)
+    return lambda c, r, ctx: _do_catalogo(ctx[tab], col, c[por])
+
+def _col_linha_de(onde, nome, d):
+    return lambda c, r, ctx: r.integers(0, len(ctx[d["linha_de"]]), c.n)
+
+def _col_id(onde, nome, d):
+    espaco, pre, larg, base = d["id"], d.get("prefixo"), d.get("largura", 0), d.get("base", 0)
+    def f(c, r, ctx):
+        v=c.ids(nome, espaco)
+        if base: v=base+v
+        return _prefixo(pre, v, larg) if pre is not None else v.astype(str)
+    return f
+
+def _col_fake(onde, nome, d):
+    metodo, res = d["fake"], d.get("reserva", "")
+    if isinstance(res, str): return lambda c, r, ctx: _fake_vet(metodo, c.n, r, res)
+    pre, lo, hi = res  # sem Faker: prefixo + inteiro em [lo, hi)
+    return lambda c, r, ctx: _fake_vet(metodo, c.n, r, pre) if _FAKER_OK else _prefixo(pre, r.integers(lo, hi, c.n))
+
+def _col_doc(onde, nome, d):
+    f={"cpf":cpf_vet, "cnpj":cnpj_vet, "ie":ie_vet}[d["doc"]]
+    return lambda c, r, ctx: f(r, c.n)
+
+def _col_fixo(onde, nome, d):
+    return lambda c, r, ctx: pd.Categorical.from_codes(np.zeros(c.n, dtype=np.int8), [d["fixo"]])
+
+def _col_herda(onde, nome, d):
+    return lambda c, r, ctx: c.pai[d["herda"]][c.mascara]
+
+def _col_expr(onde, nome, d):
+    return _expressao(onde, d["expr"])
+
+_TIPOS_COLUNA = {"normal":_col_normal, "inteiros":_col_inteiros, "pesos":_col_pesos, "escolha":_col_escolha, "prob":_col_prob, "datas":_col_datas,
+                 "apos":_col_apos, "fk":_col_fk, "linha_de":_col_linha_de, "id":_col_id, "fake":_col_fake, "doc":_col_doc, "fixo":_col_fixo,
+                 "herda":_col_herda, "expr":_col_expr}
+
+def _compilar_colunas(onde: str, colunas: Dict[str, Any]) -> Dict[str, Any]:
+    out={}
+    for nome, d in colunas.items():
+        if isinstance(d, str): d={"expr": d}
+        tipo=next((t for t in _TIPOS_COLUNA if t in d), None)
+        if tipo is None: raise ValueError(f"{onde}.{nome}: definição sem tipo conhecido (use uma de {sorted(_TIPOS_COLUNA)})")
+        out[nome]=_TIPOS_COLUNA[tipo](f"{onde}.{nome}", nome, d)
+    return out
+
+def _formatos_declarados(*colunas: Dict[str, Any]) -> Dict[str, str]:
+    return {nome: d["fmt"] for cols in colunas for nome, d in cols.items() if isinstance(d, dict) and "fmt" in d}
+
+def _definir(c: _Colunas, compiladas: Dict[str, Any], ctx: Dict[str, Any]) -> None:
+    c.definir(**{nome: (lambda r, f=f: f(c, r, ctx)) for nome, f in compiladas.items()})
+
+def _gerador_tema(tema: str, contexto, tabela: str, colunas, derivadas, agregadas):
+    def gerar(n=1000, rng=None, ctx=None, campos=None):
+        rng=_rng(rng); ctx=ctx or contexto(n, rng)
+        c=_Colunas(n, rng, ctx); _definir(c, colunas, ctx)
+        out={tabela: c.tabela(_pedidas(tema, campos))}
+        for nome, (p, cols) in derivadas.items():
+            r=c.rng("_"+nome); m=r.random(n)<p
+            s=_Colunas(int(m.sum()), r, ctx, fluxo_unico=True); s.pai, s.mascara = c, m; _definir(s, cols, ctx)
+            out[nome]=s.tabela([k for k in cols if not k.startswith("_")])
+        for nome, (cols, f) in agregadas.items(): out[nome]=f(c.tabela(cols))
+        return {**out, **_tabelas_ctx(ctx)}
+    gerar.__name__=f"dataset_{tema}"
+    return gerar
+
+def _lista(v) -> List[Any]:
+    return [v] if isinstance(v, str) else list(v)
+
+def _colunas_lidas(tabela: str, abas, kpis, pivos) -> Tuple[str, ...]:
+    fontes={a["nome"]: a["fonte"] for a in abas}; lidas=[]
+    for _, calc, _ in kpis:
+        if calc[1]==tabela: lidas+=calc[2:3] if calc[0]=="pct_igual" else calc[2:]
+    for pv in pivos:
+        if fontes.get(pv["aba"])==tabela: lidas+=[*_lista(pv["indice"]), *pv["valores"]]
+    return tuple(dict.fromkeys(lidas))
+
+def registrar_tema(nome: str, esquema: Dict[str, Any]) -> None:
+    """Compila um tema declarativo (formato em ESQUEMAS_TEMAS) e o registra: gerador, campos, perfis,
+    KPIs, pivôs e apelidos. Registrar de novo com o mesmo nome substitui o tema."""
+    if "herda" in esquema and esquema["herda"] not in _ESQUEMAS: raise ValueError(f"Tema {nome}: herda de tema desconhecido {esquema['herda']!r}")
+    pai=_ESQUEMAS.get(esquema.get("herda"), {})
+    colunas={**pai.get("colunas", {}), **esquema.get("colunas", {})}
+    contexto=esquema.get("contexto", pai.get("contexto", _ctx_vazio))
+    if isinstance(contexto, str): contexto=_CONTEXTOS[normaliza_tema(contexto)]
+    tabela=esquema["tabela"]; campos=list(esquema.get("campos", [k for k in colunas if not k.startswith("_")]))
+    faltam=[k for k in campos+list(esquema.get("basico", ())) if k not in colunas]
+    if faltam: raise ValueError(f"Tema {nome}: campos sem definição {faltam}")
+    abas=list(esquema.get("abas", [{"nome":nome, "fonte":tabela}])); kpis=[(k[0], tuple(k[1]), k[2]) for k in esquema.get("kpis", ())]
+    pivos=list(esquema.get("pivos", ())); nomes_abas={a["nome"] for a in abas}
+    for pv in pivos:
+        if pv["aba"] not in nomes_abas: raise ValueError(f"Tema {nome}: pivô {pv['nome']!r} lê a aba inexistente {pv['aba']!r}")
+    compiladas=_compilar_colunas(nome, colunas)
+    derivadas={t: (float(d["prob"]), _compilar_colunas(f"{nome}.{t}", d["colunas"])) for t, d in esquema.get("derivadas", {}).items()}
+    agregadas=esquema.get("agregadas", {})
+    _FMT_DECLARADO[nome]=_formatos_declarados(colunas, *(d["colunas"] for d in esquema.get("derivadas", {}).values()))
+    _ESQUEMAS[nome]={**esquema, "colunas":colunas, "contexto":contexto, "tabela":tabela, "abas":abas, "kpis":kpis, "pivos":pivos}
+    _TEMAS[nome]=_gerador_tema(nome, contexto, tabela, compiladas, derivadas, {t: (a["colunas"], a["gerar"]) for t, a in agregadas.items()})
+    _CONTEXTOS[nome]=contexto; CAMPOS_TEMA[nome]=campos
+    PERFIL_IDX[nome]={"basico":list(esquema.get("basico", campos)), "completo":campos}
+    _COLUNAS_SPEC[nome]=_colunas_lidas(tabela, abas, kpis, pivos)
+    _AGREGADAS.pop(nome, None)
+    if agregadas: _AGREGADAS[nome]={t: (a["chaves"], a["funcs"], *([a["pos"]] if "pos" in a else [])) for t, a in agregadas.items()}
+    for apelido in esquema.get("apelidos", ()): ALIASES[apelido.lower()]=nome
+    if ESQUEMAS_TEMAS.get(nome) is not esquema:  # o código do módulo já entra na chave do cache; temas de fora, pela assinatura
+        import hashlib
+        _TEMAS_EXTERNOS[nome]=hashlib.sha256(json.dumps(esquema, sort_keys=True, default=repr, ensure_ascii=False).encode()).hexdigest()[:16]
+
+def carregar_temas(caminho: str) -> List[str]:
+    """Registra os temas de um arquivo JSON ou YAML ({nome: esquema}). Sem objetos Python, pesos vêm como
+    [[valor, peso], ...] e tabelas/constantes pelo nome (contexto pode ser o nome de um tema). As expressões
+    passam por _validar_expressao, então um arquivo de tema não tem como executar código arbitrário."""
+    with open(caminho, encoding="utf-8") as f:
+        if caminho.lower().endswith((".yaml",".yml")):
+            try: import yaml
+            except ImportError as e: raise RuntimeError("Temas em YAML precisam do pacote 'pyyaml' (pip install pyyaml)") from e
+            dados=yaml.safe_load(f)
+        else: dados=json.load(f)
+    for nome, esquema in dados.items(): registrar_tema(nome, esquema)
+    return list(dados)
+
+# ========= formatos de coluna =========
+_LARGURA_FMT = {"date":14, "int":12, "currency":13, "float":13}
+
+def _col_def(name: str, dtype=None, tema: Optional[str]=None) -> Dict[str, Any]:
+    declarados=_FMT_DECLARADO.get(tema, {})  # "fmt" das colunas do tema vale só nele
+    if name in declarados: fmt=declarados[name]; return {"name":name,"fmt":fmt,"width":_LARGURA_FMT.get(fmt) or max(10,min(26,len(name)+6))}
+    if name in ("data","emissao","vencimento","coleta","previsao_entrega","entrega","plantio","colheita","data_pagamento","validade","abertura","fechamento","data_hora","data_inicio","data_prev_fim","data_fim","retorno_previsto"): return {"name":name,"fmt":"date","width":14}
+    if name in ("quantidade","qtd","saldo","entradas","saidas","sla_h","duracao_min","satisfacao"): return {"name":name,"fmt":"int","width":12}
+    if name in ("preco_unit","valor_face","multa","juros","desconto","valor_liquido","frete","preco_t","receita","custo_total","total","preco_kg","cambio","valor","valor_beneficios","salario","descontos","liquido","preco_unit_moeda","total_moeda","total_brl","preco_30s","custo_orcado","custo_real","valor_mov"): return {"name":name,"fmt":"currency","width":13}
+    if name in ("peso_kg","volume_m3","area_ha","produtividade_t_ha","producao_t","mao_obra_horas","tempo_atendimento_h","nota","frequencia_pct","audiencia_pontos","share_pct","progresso_pct"): return {"name":name,"fmt":"float","width":13}
+    if dtype is not None and not pd.api.types.is_bool_dtype(dtype):  # fora das listas, o tipo da coluna decide
+        if pd.api.types.is_datetime64_any_dtype(dtype): return {"name":name,"fmt":"date","width":14}
+        if pd.api.types.is_integer_dtype(dtype): return {"name":name,"fmt":"int","width":12}
+        if pd.api.types.is_float_dtype(dtype): return {"name":name,"fmt":"float","width":13}
+    return {"name":name,"fmt":"text","width":max(10,min(26,len(name)+6))}
+
+def _colunas_def(df: pd.DataFrame, tema: Optional[str]=None) -> List[Dict[str, Any]]:
+    return [_col_def(c, df[c].dtype, tema) for c in df.columns]
+
+# ========= KPIs =========
+# calc = (op, tabela do bundle, colunas...). Cada KPI é calculado a partir de parciais somáveis
+# (soma, contagem) por coluna, o que permite acumulá-lo pedaço a pedaço.
+def _kpi_parcial(calc: Tuple, bundle: Dict[str, pd.DataFrame]) -> Tuple:
+    op, tab, *cols = calc; df=bundle[tab]
+    if op=="pct_igual": cols, eq = cols[:1], cols[1]
+    out=[]
+    for c in cols:
+        s=df[c].eq(eq) if op=="pct_igual" else pd.to_numeric(df[c], errors="coerce")
+        out += [float(s.sum()), int(s.count())]
+    return tuple(out)
+
+def _kpi_valor(calc: Tuple, parc: Tuple, fmt: Optional[str]=None):
+    op=calc[0]
+    if op=="soma": v=parc[0]
+    elif op=="media": v=parc[0]/parc[1] if parc[1] else float("nan")
+    elif op in ("pct","pct_igual"): v=100*parc[0]/parc[1] if parc[1] else 0.0
+    elif op=="razao": v=parc[0]/max(1,parc[2])
+    elif op=="dif": v=parc[0]-parc[2]
+    else: raise ValueError(f"KPI desconhecido: {op}")
+    # somas por pedaço (streaming, incremental) e da coluna inteira diferem no último bit: arredonda esse ruído
+    return int(v) if fmt=="int" else round(float(v), 9)
+
+def _kpi(bundle: Dict[str, pd.DataFrame], label: str, calc: Tuple, fmt: str) -> Dict[str, Any]:
+    return {"label":label,"calc":calc,"fmt":fmt,"value":_kpi_valor(calc, _kpi_parcial(calc, bundle), fmt)}
+
+# ========= builders de planilha por tema =========
+def build_spec_from_bundle(tema: str, bundle: Dict[str,pd.DataFrame], campos: List[str]) -> Dict[str,Any]:
+    """Spec do tema. Cada aba leva em 'tabela' a tabela inteira do bundle, de onde saem os pivôs
+    (a aba em si só tem os campos escolhidos)."""
+    spec=_spec_tema(tema, bundle, campos)
+    for sh in spec.get('sheets', []): sh.setdefault("tabela", bundle.get(sh.get("fonte")))
+    return spec
+
+def _spec_tema(tema: str, bundle: Dict[str,pd.DataFrame], campos: List[str]) -> Dict[str,Any]:
+    esq=_ESQUEMAS.get(tema)
+    if esq is None: raise ValueError("Tema não suportado")
+    sheets=[]
+    for aba in esq["abas"]:
+        tab=bundle.get(aba["fonte"])
+        if tab is None or (aba.get("opcional") and tab.empty): continue
+        df=tab[campos].copy() if aba["fonte"]==esq["tabela"] else tab[list(aba["colunas"])] if "colunas" in aba else tab
+        chaves=[c for c in df.columns if isinstance(esq["colunas"].get(c), dict) and "id" in esq["colunas"][c]] if aba["fonte"]==esq["tabela"] else []
+        sheets.append({"name":aba["nome"],"fonte":aba["fonte"],"data":df,"columns":_colunas_def(df, tema),"chaves":chaves,"freeze":aba.get("freeze","A2"),"autofilter":True})
+    return {"workbook":{"title":f"Relatório {tema}","author":"Gerador Interativo","created_at":datetime.now()},"dashboard_name":"Dashboard",
+            "sheets":sheets, "kpis":[_kpi(bundle, rotulo, calc, fmt) for rotulo, calc, fmt in esq["kpis"]], "pivots":[_pivo_esquema(pv) for pv in esq["pivos"]]}
+
+def _pivo_esquema(pv: Dict[str, Any]) -> Dict[str, Any]:
+    return {"name":pv["nome"],"data_sheet":pv["aba"],"index":_lista(pv["indice"]),"columns":[],"values":dict(pv["valores"]),"fill_value":0,"round":pv.get("casas",2),
+            "chart":{"type":"column","title":pv.get("titulo", pv["nome"]),"y_title":pv.get("eixo","")}}
+
+# ========= API =========
+PERFIS = ["Básico","Completo","Personalizado"]
+
+def listar_temas()->List[str]: return list(_TEMAS.keys())
+
+for _nome, _esquema in ESQUEMAS_TEMAS.items(): registrar_tema(_nome, _esquema)
+
+# ========= geração em pedaços (semente + processos) =========
+LINHAS_POR_PEDACO = 100_000  # fixo: o resultado não depende do nº de processos
+
+_CTX_PROCESSO: Dict[str, Any] = {}
+_CACHE_CTX: Optional[Dict[Tuple, Dict[str, Any]]] = None  # ligado no modo lote e no servidor: catálogos por (tema, linhas, semente)
+CACHE_CTX_MAX = 32  # contextos guardados por processo; sai o mais antigo
+
+def _init_processo(ctx: Dict[str, Any], pools: Optional[Dict[str, Any]]=None) -> None:
+    _CTX_PROCESSO["ctx"]=ctx
+    if pools is not None:  # pools já montados no processo pai não são refeitos
+        configurar_pools(pools["tamanho"], pools["semente"]); _POOLS.update(pools["valores"]); configurar_documentos(pools["docs"])
+
+def _gerar_pedaco(tarefa) -> Dict[str, pd.DataFrame]:
+    tema, m, semente, campos, inicio = tarefa; ctx={**_CTX_PROCESSO["ctx"], "_inicio": inicio}
+    # catálogos não voltam do processo: o chamador já tem os originais
+    return {k:v for k,v in _TEMAS[tema](m, np.random.default_rng(semente), ctx, campos).items() if k not in ctx}
+
+DATA_REFERENCIA_SEMENTE = datetime(2025, 1, 1)  # "agora" das execuções com semente, sem data_referencia
+
+def _data_referencia(seed: Optional[int], data_referencia=None) -> datetime:
+    # a referência "agora" das datas: a dada (datetime, date ou 'AAAA-MM-DD'), senão uma fixa com semente
+    # (a mesma saída em qualquer dia), senão o relógio
+    if data_referencia is None: return DATA_REFERENCIA_SEMENTE if seed is not None else datetime.now()
+    if isinstance(data_referencia, str): return datetime.fromisoformat(data_referencia)
+    return data_referencia if isinstance(data_referencia, datetime) else datetime.combine(data_referencia, datetime.min.time())
+
+def iter_pedacos(tema: str, n_linhas: int, seed: Optional[int]=None, processos: int=1, tam_pedaco: int=LINHAS_POR_PEDACO, campos: Optional[List[str]]=None,
+                 data_referencia=None):
+    """Gera o tema em pedaços de até tam_pedaco linhas, na ordem, cada um com seu próprio fluxo
+    derivado de SeedSequence(seed). Os catálogos vêm de um fluxo separado e são comuns a todos.
+    Com campos, a tabela principal só tem esses campos (mais os que KPIs e pivôs usam).
+    As datas contam a partir de data_referencia (ver _data_referencia)."""
+    if tema not in _TEMAS: raise ValueError(f"Tema inválido. Opções: {listar_temas()}")
+    ctx, ss_linhas = _ctx_execucao(tema, n_linhas, seed, data_referencia)
+    yield from _pedacos_ctx(tema, ctx, ss_linhas, n_linhas, processos, tam_pedaco, campos)
+
+def _ctx_execucao(tema: str, n_linhas: int, seed, data_referencia=None) -> Tuple[Dict[str, Any], np.random.SeedSequence]:
+    # fluxos filhos de SeedSequence(seed): 0 = catálogos, 1 = linhas, 2 = chave dos IDs
+    ss_ctx, ss_linhas, ss_ids = np.random.SeedSequence(seed).spawn(3)
+    agora=_data_referencia(seed, data_referencia); chave=(tema, n_linhas, seed, agora)
+    if _CACHE_CTX is not None and seed is not None and chave in _CACHE_CTX: return _CACHE_CTX[chave], ss_linhas
+    ctx=_CONTEXTOS[tema](n_linhas, np.random.default_rng(ss_ctx), agora); ctx["_chave_ids"]=int(ss_ids.generate_state(1, np.uint64)[0])
+    if _CACHE_CTX is not None and seed is not None:
+        if len(_CACHE_CTX)>=CACHE_CTX_MAX: _CACHE_CTX.pop(next(iter(_CACHE_CTX)))
+        _CACHE_CTX[chave]=ctx
+    return ctx, ss_linhas
+
+def _pedacos_ctx(tema: str, ctx: Dict[str, Any], ss_linhas: np.random.SeedSequence, n_linhas: int, processos: int=1, tam_pedaco: int=LINHAS_POR_PEDACO,
+                 campos: Optional[List[str]]=None, inicio: int=0):
+    # inicio: posição da primeira linha na tabela inteira (o modo incremental continua a numeração dos IDs)
+    tams=[min(tam_pedaco, n_linhas-i) for i in range(0, n_linhas, tam_pedaco)] or [0]
+    inicios=(inicio+np.cumsum([0]+tams[:-1])).tolist()
+    tarefas=[(tema, m, ss, campos, i0) for m, ss, i0 in zip(tams, ss_linhas.spawn(len(tams)), inicios)]
+    tabelas=_tabelas_ctx(ctx)
+    if processos<=1 or len(tarefas)==1:
+        _init_processo(ctx)
+        for t in tarefas: yield {**_gerar_pedaco(t), **tabelas}
+        return
+    from concurrent.futures import ProcessPoolExecutor  # só quem abre pool paga o import
+    with ProcessPoolExecutor(min(processos, len(tarefas)), initializer=_init_processo,
+                             initargs=(ctx, {"tamanho":TAM_POOL_FAKER, "semente":SEMENTE_POOL, "valores":dict(_POOLS), "docs":DOCS_FORMATADOS})) as ex:
+        fila=[]
+        for t in tarefas:  # janela limitada de pedaços em voo, devolvidos em ordem
+            fila.append(ex.submit(_gerar_pedaco, t))
+            if len(fila)>=2*processos: yield {**fila.pop(0).result(), **tabelas}
+        for f in fila: yield {**f.result(), **tabelas}
+
+def gerar_bundle(tema: str, n_linhas: int, seed: Optional[int]=None, processos: int=1, tam_pedaco: int=LINHAS_POR_PEDACO,
+                 campos: Optional[List[str]]=None, data_referencia=None) -> Dict[str, pd.DataFrame]:
+    pedacos=list(iter_pedacos(tema, n_linhas, seed, processos, tam_pedaco, campos, data_referencia))
+    if len(pedacos)==1: return pedacos[0]
+    agregadas=_AGREGADAS.get(tema, {}); bundle={}
+    for k, v in pedacos[0].items():
+        if all(p[k] is v for p in pedacos): bundle[k]=v  # catálogo compartilhado
+        elif k in agregadas:
+            bundle[k]=_reagregar(pd.concat([p[k] for p in pedacos], ignore_index=True), *agregadas[k])
+        else: bundle[k]=pd.concat([p[k] for p in pedacos], ignore_index=True)
+    return bundle
+
+def gerar_excel_tema(tema: str, n_linhas: int, campos: List[str], output_path: str, estilo="Azul", seed: Optional[int]=None, processos: int=1, streaming: bool=False,
+                     max_linhas_aba: int=MAX_LINHAS_ABA, dividir_em: str="abas", rapido: bool=False, alertas_hoje: bool=False, formato: str="xlsx",
+                     cache: bool=True, pivos_visao: bool=False, abas_paralelas: bool=False, data_referencia=None) -> str:
+    """Com semente (e cache ligado), a saída pronta e o bundle vêm do cache em disco quando já foram gerados.
+    data_referencia é o "agora" das datas; com semente e sem ela, DATA_REFERENCIA_SEMENTE."""
+    if tema not in _TEMAS: raise ValueError(f"Tema inválido. Opções: {listar_temas()}")
+    if formato not in FORMATOS: raise ValueError(f"Formato inválido. Opções: {FORMATOS}")
+    if n_linhas<1: raise ValueError("n_linhas deve ser >= 1")
+    chave=None; ref=_data_referencia(seed, data_referencia)
+    if cache and CACHE_ATIVO and seed is not None and dividir_em=="abas":  # com 'arquivos' a saída pode ser vários arquivos
+        chave=chave_cache("saida", tema=tema, linhas=n_linhas, campos=campos, estilo=estilo, seed=seed, referencia=ref, streaming=streaming,
+                          max_linhas_aba=max_linhas_aba, rapido=rapido, alertas_hoje=alertas_hoje, formato=formato, pivos_visao=pivos_visao,
+                          abas_paralelas=abas_paralelas and processos>1)
+        nome="saida.xlsx" if formato=="xlsx" else "saida.sqlite" if formato=="sqlite" else "saida"
+        with _etapa("cache", tipo="saida") as ev:
+            entrada=_cache_buscar(chave); ev["acerto"]=entrada is not None
+            if entrada is not None:
+                destino=output_path if formato=="xlsx" else _arquivo_banco(output_path) if formato=="sqlite" else os.path.splitext(output_path)[0]
+                return _copiar_saida(os.path.join(entrada, nome), destino, formato)
+    caminho=_gerar_excel_tema(tema, n_linhas, campos, output_path, estilo, seed, processos, streaming, max_linhas_aba, dividir_em, rapido, alertas_hoje, formato, cache,
+                              pivos_visao, abas_paralelas, ref)
+    if chave is not None: _cache_guardar(chave, lambda pasta: _copiar_saida(caminho, os.path.join(pasta, nome), formato))
+    return caminho
+
+def _gerar_excel_tema(tema, n_linhas, campos, output_path, estilo, seed, processos, streaming, max_linhas_aba, dividir_em, rapido, alertas_hoje, formato, cache,
+                      pivos_visao, abas_paralelas, ref) -> str:
+    criado=ref if seed is not None else None
+    with _etapa("gerar", tema=tema, linhas=n_linhas, formato=formato, streaming=streaming):
+        if formato=="sqlite" and streaming:
+            with _etapa("banco"): return gerar_banco_streaming(tema, iter_pedacos(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref), campos, output_path, criado,
+                                                               pivos_visao=pivos_visao)
+        if formato!="xlsx" and streaming:
+            with _etapa("tabelas"): return gerar_tabelas_streaming(tema, iter_pedacos(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref), campos, output_path, formato, created_at=criado)
+        if streaming:
+            with _etapa("xlsx"):
+                gerar_planilha_streaming(tema, iter_pedacos(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref), campos, output_path, estilo_key=estilo, created_at=criado,
+                                         max_linhas_aba=max_linhas_aba, dividir_em=dividir_em, rapido=rapido, alertas_hoje=alertas_hoje)
+            return output_path
+        with _etapa("bundle", linhas=n_linhas): bundle=(_bundle_com_cache(tema, n_linhas, seed, processos, campos, ref) if cache else
+                                                        gerar_bundle(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref))
+        with _etapa("spec") as ev:
+            spec=build_spec_from_bundle(tema, bundle, campos); ev["linhas"]=sum(len(sh.get('data', [])) for sh in spec.get('sheets', []))
+        if criado is not None: spec["workbook"]["created_at"]=criado
+        if formato=="sqlite":
+            with _etapa("banco"): return gerar_banco(spec, output_path, pivos_visao)
+        if formato!="xlsx":
+            with _etapa("tabelas"): return gerar_tabelas(spec, output_path, formato)
+        with _etapa("xlsx"):
+            gerar_planilha(spec, output_path, estilo_key=estilo, max_linhas_aba=max_linhas_aba, dividir_em=dividir_em, rapido=rapido, alertas_hoje=alertas_hoje, processos=processos,
+                           abas_paralelas=abas_paralelas)
+        return output_path
+
+# ========= cache em disco =========
+# Com semente a saída é determinística: cada resultado fica numa pasta endereçada pelo hash de tudo o que
+# o muda (tema, linhas, campos, estilo, semente, data de referência, pools e versão do gerador). Guarda a
+# saída pronta (xlsx ou pasta de tabelas) e, com pyarrow, o bundle em Parquet, que serve a outro estilo
+# ou formato do mesmo dado. Cada acerto renova o mtime; acima de CACHE_MAX_MB saem os menos usados.
+CACHE_PASTA = os.environ.get("GERADOR_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "gerador_planilhas")
+CACHE_MAX_MB = 1024
+CACHE_ATIVO = True
+_PYARROW_OK = importlib.util.find_spec("pyarrow") is not None
+_VERSAO_GERADOR: Optional[str] = None
+
+def configurar_cache(ativo: Optional[bool]=None, pasta: Optional[str]=None, max_mb: Optional[float]=None) -> None:
+    global CACHE_ATIVO, CACHE_PASTA, CACHE_MAX_MB
+    if max_mb is not None and max_mb<0: raise ValueError("max_mb deve ser >= 0")
+    if ativo is not None: CACHE_ATIVO=bool(ativo)
+    if pasta is not None: CACHE_PASTA=pasta
+    if max_mb is not None: CACHE_MAX_MB=max_mb
+
+def _versao_gerador() -> str:
+    # hash do próprio código + versões das bibliotecas que mudam os dados: qualquer edição invalida o cache
+    global _VERSAO_GERADOR
+    if _VERSAO_GERADOR is None:
+        import hashlib
+        from importlib.metadata import version, PackageNotFoundError
+        with open(os.path.abspath(__file__), "rb") as f: h=hashlib.sha256(f.read())
+        for pacote in ("numpy","pandas","xlsxwriter","faker","faker-commerce"):
+            try: h.update(f"{pacote}={version(pacote)};".encode())
+            except PackageNotFoundError: h.update(f"{pacote}=-;".encode())
+        _VERSAO_GERADOR=h.hexdigest()[:16]
+    return _VERSAO_GERADOR
+
+def chave_cache(tipo: str, **partes) -> str:
+    import hashlib
+    partes={**partes, "versao":_versao_gerador(), "pools":[TAM_POOL_FAKER, SEMENTE_POOL, DOCS_FORMATADOS, _FAKER_OK], "temas":_TEMAS_EXTERNOS}
+    return f"{tipo}-" + hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+def _ler_contagem() -> Dict[str, Dict[str, int]]:
+    try:
+        with open(os.path.join(CACHE_PASTA, "contagem.json"), encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def _contar_cache(tipo: str, acerto: bool) -> None:
+    # melhor esforço: com vários processos uma contagem pode se perder, nunca a geração
+    try:
+        os.makedirs(CACHE_PASTA, exist_ok=True); cont=_ler_contagem()
+        c=cont.setdefault(tipo, {"acertos":0, "faltas":0}); c["acertos" if acerto else "faltas"]+=1
+        with open(os.path.join(CACHE_PASTA, "contagem.json"), "w", encoding="utf-8") as f: json.dump(cont, f)
+    except OSError: pass
+
+def _cache_buscar(chave: str) -> Optional[str]:
+    caminho=os.path.join(CACHE_PASTA, chave); achou=os.path.isdir(caminho)
+    if achou: os.utime(caminho)  # LRU pelo mtime
+    _contar_cache(chave.split("-")[0], achou)
+    return caminho if achou else None
+
+def _cache_guardar(chave: str, preencher) -> None:
+    """preencher(pasta) grava a entrada numa pasta temporária, que só vira a entrada quando completa."""
+    import shutil
+    destino=os.path.join(CACHE_PASTA, chave); tmp=f"{destino}.tmp{os.getpid()}"
+    try:
+        os.makedirs(tmp, exist_ok=True); preencher(tmp); os.replace(tmp, destino)
+    except (OSError, ValueError, TypeError): pass  # disco cheio, outro processo gravou antes, tipo que o Parquet não aceita
+    finally: shutil.rmtree(tmp, ignore_errors=True)
+    _despejar_cache()
+
+def _entradas_cache() -> List[Tuple[float, int, str]]:
+    if not os.path.isdir(CACHE_PASTA): return []
+    entradas=[]
+    for e in os.scandir(CACHE_PASTA):
+        if e.is_dir() and ".tmp" not in e.name:
+            tam=sum(os.path.getsize(os.path.join(r, a)) for r, _, arqs in os.walk(e.path) for a in arqs)
+            entradas.append((e.stat().st_mtime, tam, e.path))
+    return sorted(entradas)
+
+def _despejar_cache() -> None:
+    import shutil
+    entradas=_entradas_cache(); total=sum(t for _, t, _ in entradas)
+    for _, tam, caminho in entradas:
+        if total<=CACHE_MAX_MB*2**20: break
+        shutil.rmtree(caminho, ignore_errors=True); total-=tam
+
+def estatisticas_cache() -> Dict[str, Any]:
+    entradas=_entradas_cache(); cont=_ler_contagem(); tipos: Dict[str, Dict[str, Any]]={}
+    for _, tam, caminho in entradas:
+        t=tipos.setdefault(os.path.basename(caminho).split("-")[0], {"entradas":0, "mb":0.0}); t["entradas"]+=1; t["mb"]+=tam/2**20
+    for tipo, c in cont.items(): tipos.setdefault(tipo, {"entradas":0, "mb":0.0}).update(c)
+    for t in tipos.values(): t["mb"]=round(t["mb"], 2)
+    return {"pasta":CACHE_PASTA, "ativo":CACHE_ATIVO, "max_mb":CACHE_MAX_MB, "entradas":len(entradas),
+            "mb":round(sum(t for _, t, _ in entradas)/2**20, 2), "tipos":tipos}
+
+def limpar_cache() -> None:
+    import shutil
+    shutil.rmtree(CACHE_PASTA, ignore_errors=True)
+
+def _copiar_saida(origem: str, destino: str, formato: str) -> str:
+    # xlsx e sqlite são um arquivo; os formatos de tabela são uma pasta
+    import shutil
+    if formato in ("xlsx","sqlite"): shutil.copyfile(origem, destino)
+    else: shutil.copytree(origem, destino, dirs_exist_ok=True)
+    return destino
+
+def _bundle_com_cache(tema: str, n_linhas: int, seed: Optional[int], processos: int, campos: Optional[List[str]], ref: datetime) -> Dict[str, pd.DataFrame]:
+    if not (CACHE_ATIVO and seed is not None and _PYARROW_OK): return gerar_bundle(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref)
+    chave=chave_cache("bundle", tema=tema, linhas=n_linhas, campos=campos, seed=seed, referencia=ref)
+    with _etapa("cache", tipo="bundle") as ev:
+        entrada=_cache_buscar(chave); ev["acerto"]=entrada is not None
+    if entrada is not None:
+        with open(os.path.join(entrada, "tabelas.json"), encoding="utf-8") as f: nomes=json.load(f)
+        return {nome: pd.read_parquet(os.path.join(entrada, f"{i}.parquet")) for i, nome in enumerate(nomes)}
+    bundle=gerar_bundle(tema, n_linhas, seed, processos, campos=campos, data_referencia=ref)
+    def _gravar(pasta):
+        for i, df in enumerate(bundle.values()): df.to_parquet(os.path.join(pasta, f"{i}.parquet"))
+        with open(os.path.join(pasta, "tabelas.json"), "w", encoding="utf-8") as f: json.dump(list(bundle), f, ensure_ascii=False)
+    _cache_guardar(chave, _gravar)
+    return bundle
+
+# ========= modo incremental =========
+# Para testes de longa duração que crescem dia a dia. A primeira rodada gera a base e grava o estado:
+# catálogos, chave dos IDs, semente, linhas já geradas, referência "agora" e os parciais de KPIs,
+# pivôs e tabelas agregadas. Cada rodada seguinte gera só as linhas novas, num arquivo próprio, com
+# datas a partir do dia seguinte à última data gravada, IDs continuando a numeração e KPIs/pivôs somando tudo o
+# que já foi gerado. O custo é o das linhas novas (mais o tamanho dos pivôs), não o do total.
+_VERSAO_ESTADO = 1
+
+def _ler_estado(caminho: str) -> Dict[str, Any]:
+    import pickle
+    with open(caminho, "rb") as f: estado=pickle.load(f)
+    if estado.get("versao")!=_VERSAO_ESTADO: raise ValueError(f"Estado de outra versão do modo incremental: {caminho}")
+    return estado
+
+def _gravar_estado(caminho: str, estado: Dict[str, Any]) -> None:
+    import pickle
+    with open(caminho+".tmp", "wb") as f: pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(caminho+".tmp", caminho)  # a rodada só conta com o estado gravado inteiro
+
+def _anotar_ultima_data(pedacos, limite: np.datetime64, acc: Dict[str, Any]):
+    # repassa os pedaços guardando em acc["ultima"] o último dia com dados antes de `limite` (datas
+    # derivadas no futuro, como vencimentos, não contam)
+    for p in pedacos:
+        for df in p.values():
+            for c in df.select_dtypes(include="datetime").columns:
+                v=df[c].to_numpy().astype('datetime64[D]'); v=v[v<limite]
+                if len(v): acc["ultima"]=max(acc.get("ultima", v.max()), v.max())
+        yield p
+
+def gerar_incremental(estado_path: str, output_path: str, n_linhas: int, tema: Optional[str]=None, campos: Optional[List[str]]=None, seed: Optional[int]=None,
+                      dias_novos: int=1, estilo="Azul", processos: int=1, max_linhas_aba: int=MAX_LINHAS_ABA, dividir_em: str="abas", rapido: bool=False,
+                      alertas_hoje: bool=False, formato: str="xlsx", pivos_visao: bool=False, data_referencia=None) -> str:
+    """Sem estado_path, gera a base (tema, campos, seed) e cria o estado. Com ele, gera n_linhas novas
+    nos dias_novos dias seguintes; tema e campos vêm do estado. A saída tem só as linhas da rodada,
+    mas KPIs, pivôs e tabelas agregadas acumulam todas as rodadas."""
+    if formato not in FORMATOS: raise ValueError(f"Formato inválido. Opções: {FORMATOS}")
+    if dias_novos<1: raise ValueError("dias_novos deve ser >= 1")
+    if not os.path.exists(estado_path):
+        if tema not in _TEMAS: raise ValueError(f"Tema inválido. Opções: {listar_temas()}")
+        entropia=np.random.SeedSequence(seed).entropy  # sem semente, a sorteada fica no estado
+        ref=_data_referencia(seed, data_referencia); ctx, ss = _ctx_execucao(tema, n_linhas, entropia, ref)
+        estado={"versao":_VERSAO_ESTADO, "tema":tema, "campos":list(campos if campos is not None else PERFIL_IDX[tema]["basico"]),
+                "entropia":entropia, "ctx":ctx, "agora":ref, "linhas":0, "rodada":0, "parciais":{}}
+    else:
+        estado=_ler_estado(estado_path)
+        if tema is not None and tema!=estado["tema"]: raise ValueError(f"O estado é do tema {estado['tema']}, não {tema}")
+        # a janela da rodada são os dias_novos dias depois da última data gravada, não da referência
+        ultima=estado.get("ultima", estado["agora"].date()-timedelta(days=1))
+        estado["rodada"]+=1; estado["agora"]=datetime.combine(ultima+timedelta(days=dias_novos+1), estado["agora"].time())
+        ctx={**estado["ctx"], "_agora":np.datetime64(estado["agora"], 's'), "_dias_novos":dias_novos}
+        ss=np.random.SeedSequence(estado["entropia"], spawn_key=(3, estado["rodada"]))  # 0..2 são os fluxos da base
+    tema, campos = estado["tema"], estado["campos"]
+    with _etapa("gerar", tema=tema, linhas=n_linhas, formato=formato, rodada=estado["rodada"]):
+        ult={}; limite=np.datetime64(estado["agora"], 'D')
+        pedacos=_anotar_ultima_data(_pedacos_ctx(tema, ctx, ss, n_linhas, processos, campos=campos, inicio=estado["linhas"]), limite, ult)
+        if formato=="sqlite":
+            with _etapa("banco"): caminho=gerar_banco_streaming(tema, pedacos, campos, output_path, estado["agora"], estado["parciais"], pivos_visao)
+        elif formato!="xlsx":
+            with _etapa("tabelas"): caminho=gerar_tabelas_streaming(tema, pedacos, campos, output_path, formato, estado["agora"], estado["parciais"])
+        else:
+            with _etapa("xlsx"):
+                gerar_planilha_streaming(tema, pedacos, campos, output_path, estilo, estado["agora"], max_linhas_aba, dividir_em, rapido, alertas_hoje, estado["parciais"])
+            caminho=output_path
+    estado["ultima"]=ult["ultima"].astype(datetime) if "ultima" in ult else estado["agora"].date()-timedelta(days=1)
+    estado["linhas"]+=n_linhas; _gravar_estado(estado_path, estado)
+    return caminho
+
+# ========= lote (manifesto) =========
+# Manifesto JSON/YAML: uma lista de jobs, {"padrao": {...}, "jobs": [...]} ou um job só. Cada job aceita
+# tema, linhas, perfil, campos, saida e os demais parâmetros de gerar_excel_tema.
+# Com caminho "-", o manifesto vem do stdin (JSON ou um job JSON por linha): muitos jobs pequenos
+# pagam o import uma vez só, em vez de um processo por job.
+_CHAVES_JOB = {"tema","linhas","perfil","campos","saida","estilo","seed","processos","streaming","max_linhas_aba","dividir_em","rapido","alertas_hoje","formato","cache","pivos_visao","abas_paralelas","data_referencia"}
+
+def _ler_json_ou_linhas(texto: str):
+    try: return json.loads(texto)
+    except json.JSONDecodeError: return [json.loads(l) for l in texto.splitlines() if l.strip()]
+
+def carregar_manifesto(caminho: str) -> List[Dict[str, Any]]:
+    if caminho=="-": return _jobs_manifesto(_ler_json_ou_linhas(sys.stdin.read()))
+    with open(caminho, encoding="utf-8") as f:
+        if caminho.lower().endswith((".yaml",".yml")):
+            try: import yaml
+            except ImportError as e: raise RuntimeError("Manifestos YAML precisam do pacote 'pyyaml' (pip install pyyaml)") from e
+            dados=yaml.safe_load(f)
+        else: dados=_ler_json_ou_linhas(f.read())
+    return _jobs_manifesto(dados)
+
+def _jobs_manifesto(dados) -> List[Dict[str, Any]]:
+    if isinstance(dados, dict) and not {"padrao","jobs"} & set(dados): dados=[dados]  # um job só
+    if not isinstance(dados, (list, dict)): raise ValueError("o manifesto deve ser uma lista de jobs, um job ou {'padrao', 'jobs'}")
+    padrao, jobs = ({}, dados) if isinstance(dados, list) else (dados.get("padrao", {}), dados.get("jobs", []))
+    if not jobs: raise ValueError("manifesto sem jobs")
+    saida=[]
+    for i, j in enumerate(jobs, 1):
+        job={**padrao, **j}; extras=set(job)-_CHAVES_JOB
+        if extras: raise ValueError(f"Job {i}: chaves desconhecidas {sorted(extras)}")
+        if "tema" not in job: raise ValueError(f"Job {i}: 'tema' é obrigatório")
+        job["tema"]=normaliza_tema(str(job["tema"])); job.setdefault("saida", f"{job['tema']}_{i}.xlsx")
+        saida.append(job)
+    return saida
+
+def _executar_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    t0=time.perf_counter(); job=dict(job); tema=job.pop("tema"); linhas=int(job.pop("linhas", 1000)); saida=job.pop("saida")
+    campos=job.pop("campos", None); perfil=str(job.pop("perfil", "basico" if campos is None else "personalizado"))  # campos sem perfil: personalizado
+    try:
+        if campos is not None and not perfil.lower().startswith("p"): raise ValueError(f"'campos' só vale com o perfil personalizado (perfil: {perfil})")
+        if not isinstance(campos, list):
+            perfil="Básico" if perfil.lower().startswith("b") else "Completo" if perfil.lower().startswith("c") else "Personalizado"
+            campos=resolve_campos_por_perfil(tema, perfil, expr="" if campos is None else str(campos))
+        caminho=gerar_excel_tema(tema, linhas, campos, saida, **job); erro=None
+    except Exception as e:
+        caminho=saida; erro=f"{type(e).__name__}: {e}"
+    return {"tema":tema, "linhas":linhas, "saida":caminho, "segundos":time.perf_counter()-t0, "erro":erro}
+
+def _executar_grupo(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [_executar_job(j) for j in jobs]
+
+def _init_lote(pools: Dict[str, Any]) -> None:
+    global _CACHE_CTX
+    _CACHE_CTX={}; configurar_pools(pools["tamanho"], pools["semente"]); _POOLS.update(pools["valores"]); configurar_documentos(pools["docs"])
+    configurar_cache(*pools["cache"])
+
+def executar_lote(jobs: List[Dict[str, Any]], trabalhadores: int=1, relatorio=print) -> List[Dict[str, Any]]:
+    """Roda os jobs num pool de processos que importa tudo uma vez só. Jobs com a mesma semente vão
+    juntos para o mesmo processo e reaproveitam os catálogos (clientes, produtos...) já montados."""
+    grupos: Dict[Any, List[Dict[str, Any]]] = {}
+    for i, j in enumerate(jobs):
+        grupos.setdefault(("seed", j["seed"]) if j.get("seed") is not None else ("job", i), []).append(j)
+    pools={"tamanho":TAM_POOL_FAKER, "semente":SEMENTE_POOL, "valores":dict(_POOLS), "docs":DOCS_FORMATADOS, "cache":(CACHE_ATIVO, CACHE_PASTA, CACHE_MAX_MB)}
+    t0=time.perf_counter(); resultados=[]
+    def _relatar(rs):
+        for r in rs:
+            resultados.append(r)
+            if r["erro"]: relatorio(f"❌ {r['saida']} ({r['tema']}): {r['erro']}")
+            else: relatorio(f"✅ {r['saida']} ({r['tema']}, {r['linhas']:,} linhas) em {r['segundos']:.2f}s")
+    if trabalhadores<=1 or len(grupos)==1:
+        global _CACHE_CTX
+        anterior=_CACHE_CTX; _CACHE_CTX={}
+        try:
+            for g in grupos.values(): _relatar(_executar_grupo(g))
+        finally: _CACHE_CTX=anterior
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(trabalhadores, len(grupos)), initializer=_init_lote, initargs=(pools,)) as ex:
+            for rs in ex.map(_executar_grupo, grupos.values()): _relatar(rs)
+    ok=[r for r in resultados if not r["erro"]]
+    relatorio(f"Lote: {len(ok)}/{len(resultados)} jobs ok, {sum(r['linhas'] for r in ok):,} linhas em {time.perf_counter()-t0:.2f}s "
+              f"(soma dos jobs: {sum(r['segundos'] for r in resultados):.2f}s)")
+    return resultados
+
+# ========= servidor HTTP (modo servir) =========
+# Um processo fica de pé com processos filhos já aquecidos (pandas, xlsxwriter, pools do Faker e o código
+# de cada tema exercitado uma vez antes do fork), e cada pedido vira um job de lote:
+#   GET  /temas                      temas com campos e perfil básico
+#   GET  /saude                      processos, pedidos em andamento e na fila
+#   GET  /gerar?tema=..&linhas=..    ou POST /gerar com o job em JSON (chaves do manifesto de lote, sem saida nem dividir_em)
+# A resposta é o xlsx ou o .sqlite (ou um zip com as tabelas csv/parquet/arrow) enviado do disco com sendfile, sem
+# passar pela memória; o xlsx é um zip que só fica válido no close, então o envio começa quando ele fecha.
+# Com seed, pedidos repetidos saem do cache em disco e dos catálogos guardados em cada processo.
+# Acima de trabalhadores+fila pedidos simultâneos, o servidor responde 503 com Retry-After. Se um processo
+# filho morre, o pedido responde 500 e o pool é recriado para os próximos.
+SERVIR_PORTA = 8765
+SERVIR_FILA = 32
+SERVIR_CORPO_MAX = 1<<20  # bytes de um POST /gerar (o job é um JSON pequeno)
+_CHAVES_PEDIDO = _CHAVES_JOB-{"saida","processos","abas_paralelas","dividir_em"}  # a resposta é um arquivo só: partes em abas
+_TIPOS_HTTP = {"xlsx":"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "sqlite":"application/vnd.sqlite3", "zip":"application/zip"}
+
+def _pedido_http(dados: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida um pedido (query string ou JSON) e o converte num job; ValueError vira 400."""
+    extras=set(dados)-_CHAVES_PEDIDO
+    if extras: raise ValueError(f"chaves desconhecidas {sorted(extras)}")
+    if "tema" not in dados: raise ValueError("'tema' é obrigatório")
+    job=dict(dados); job["tema"]=normaliza_tema(str(job["tema"]))
+    for k in ("linhas","seed","max_linhas_aba"):
+        if job.get(k) is None: job.pop(k, None)  # null é o mesmo que ausente
+        else: job[k]=int(job[k])
+    for k in ("streaming","rapido","alertas_hoje","cache","pivos_visao"):
+        if isinstance(job.get(k), str): job[k]=job[k].lower() in ("1","true","sim","s","yes")
+    if job.get("formato", "xlsx") not in FORMATOS: raise ValueError(f"Formato inválido. Opções: {FORMATOS}")
+    if job.get("estilo", "Azul") not in ESTILOS: raise ValueError(f"Estilo inválido. Opções: {list(ESTILOS)}")
+    if not 1<=job.get("linhas", 1000)<=EXCEL_MAX_LINHAS*16: raise ValueError("'linhas' fora do intervalo")
+    if job.get("seed", 0)<0: raise ValueError("'seed' deve ser >= 0")
+    if not 1<=job.get("max_linhas_aba", MAX_LINHAS_ABA)<=MAX_LINHAS_ABA: raise ValueError(f"'max_linhas_aba' deve estar entre 1 e {MAX_LINHAS_ABA}")
+    perfil=str(job.get("perfil", "personalizado" if job.get("campos") is not None else "basico")).lower()
+    if not perfil.startswith(("b","c","p")): raise ValueError("'perfil' deve ser basico, completo ou personalizado")
+    if job.get("campos") is not None and not perfil.startswith("p"): raise ValueError("'campos' só vale com o perfil personalizado")
+    if job.get("data_referencia") is not None: _data_referencia(None, job["data_referencia"])  # data inválida é 400, não erro no processo
+    campos=job.get("campos")
+    if isinstance(campos, str) and any(c.isalpha() for c in campos):
+        job["campos"]=[c.strip() for c in campos.split(",")]  # nomes; só dígitos é uma expressão de índices ('1-5,8')
+    elif isinstance(campos, str) and not parse_ranges_to_indices(campos, len(CAMPOS_TEMA[job["tema"]])): raise ValueError(f"expressão de campos inválida: {campos!r}")
+    if isinstance(job.get("campos"), list):
+        faltam=[c for c in job["campos"] if c not in CAMPOS_TEMA[job["tema"]]]
+        if faltam: raise ValueError(f"campos desconhecidos para {job['tema']}: {faltam}")
+    return job
+
+def _servir_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    # roda no processo filho; tabelas (pasta) voltam num zip sem compressão: parquet/arrow já são comprimidos
+    r=_executar_job(job)
+    if r["erro"] is None and job.get("formato", "xlsx") in _EXTENSOES:
+        import shutil, zipfile
+        pasta=r["saida"]; r["saida"]=pasta+".zip"
+        with zipfile.ZipFile(r["saida"], "w", zipfile.ZIP_STORED) as z:
+            for nome in sorted(os.listdir(pasta)): z.write(os.path.join(pasta, nome), nome)
+        shutil.rmtree(pasta, ignore_errors=True)
+    return r
+
+def _aquecer_servidor() -> None:
+    """Exercita imports, pools do Faker e o código de cada tema antes de criar os processos (que herdam tudo no fork)."""
+    import tempfile, xlsxwriter  # noqa: F401
+    preparar_pools()
+    with tempfile.TemporaryDirectory() as tmp, _sem_metricas():
+        for tema in listar_temas(): gerar_excel_tema(tema, 50, list(CAMPOS_TEMA[tema]), os.path.join(tmp, "aquecer.xlsx"), seed=0, cache=False)
+
+def servir(host: str="127.0.0.1", porta: int=SERVIR_PORTA, trabalhadores: int=2, fila: int=SERVIR_FILA, relatorio=print) -> None:
+    """Serve gerar_excel_tema por HTTP até Ctrl+C (ver o topo da seção)."""
+    import shutil, signal, tempfile, threading, urllib.parse
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    t0=time.perf_counter(); _aquecer_servidor()
+    pools={"tamanho":TAM_POOL_FAKER, "semente":SEMENTE_POOL, "valores":dict(_POOLS), "docs":DOCS_FORMATADOS, "cache":(CACHE_ATIVO, CACHE_PASTA, CACHE_MAX_MB)}
+    def _novo_pool():
+        ex=ProcessPoolExecutor(max(1, trabalhadores), initializer=_init_lote, initargs=(pools,))
+        for f in [ex.submit(os.getpid) for _ in range(max(1, trabalhadores))]: f.result()  # processos de pé antes de receber jobs
+        return ex
+    ex=[_novo_pool()]
+    pasta=tempfile.mkdtemp(prefix="gerador_servir_"); vagas=threading.BoundedSemaphore(max(1, trabalhadores)+max(0, fila))
+    estado={"andamento":0, "pedidos":0}; trava=threading.Lock()
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version="HTTP/1.1"
+        server_version="GeradorPlanilhas"
+
+        def log_message(self, fmt, *args): pass
+
+        def _json(self, codigo: int, corpo, **cabecalhos) -> None:
+            dados=json.dumps(corpo, ensure_ascii=False).encode()
+            self.send_response(codigo); self.send_header("Content-Type", "application/json; charset=utf-8"); self.send_header("Content-Length", str(len(dados)))
+            for k, v in cabecalhos.items(): self.send_header(k.replace("_", "-"), str(v))
+            self.end_headers(); self.wfile.write(dados)
+
+        def do_GET(self):
+            url=urllib.parse.urlsplit(self.path)
+            if url.path=="/temas": return self._json(200, {t: {"campos":CAMPOS_TEMA[t], "basico":PERFIL_IDX[t]["basico"]} for t in listar_temas()})
+            if url.path=="/saude": return self._json(200, {"trabalhadores":trabalhadores, "fila":fila, **estado})
+            if url.path=="/gerar": return self._gerar(dict(urllib.parse.parse_qsl(url.query)))
+            self._json(404, {"erro":f"caminho desconhecido: {url.path}"})
+
+        def do_POST(self):
+            if urllib.parse.urlsplit(self.path).path!="/gerar": return self._json(404, {"erro":"use POST /gerar"})
+            try: tam=int(self.headers.get("Content-Length", 0))
+            except ValueError: self.close_connection=True; return self._json(400, {"erro":"Content-Length inválido"})
+            if tam<0: self.close_connection=True; return self._json(400, {"erro":"Content-Length inválido"})
+            if tam>SERVIR_CORPO_MAX: self.close_connection=True; return self._json(413, {"erro":f"corpo acima de {SERVIR_CORPO_MAX} bytes"})
+            try: dados=json.loads(self.rfile.read(tam) or b"{}")
+            except (json.JSONDecodeError, UnicodeDecodeError) as e: return self._json(400, {"erro":f"JSON inválido: {e}"})
+            if not isinstance(dados, dict): return self._json(400, {"erro":"o corpo deve ser um objeto JSON"})
+            self._gerar(dados)
+
+        def _gerar(self, dados: Dict[str, Any]) -> None:
+            try: job=_pedido_http(dados)
+            except (ValueError, TypeError) as e: return self._json(400, {"erro":str(e)})
+            if not vagas.acquire(blocking=False): return self._json(503, {"erro":"fila cheia"}, Retry_After=1)
+            with trava: estado["andamento"]+=1; estado["pedidos"]+=1; n=estado["pedidos"]
+            t=time.perf_counter(); ext=job.get("formato", "xlsx") if job.get("formato", "xlsx") in _TIPOS_HTTP else "zip"
+            job["saida"]=os.path.join(pasta, f"{n}.xlsx"); arquivo=None
+            try:
+                pool=ex[0]
+                try: r=pool.submit(_servir_job, job).result()
+                except BrokenProcessPool:
+                    with trava:
+                        if ex[0] is pool: ex[0]=_novo_pool(); pool.shutdown(wait=False)  # só a primeira thread a notar recria
+                    relatorio(f"⚠️ processo filho morreu no pedido {n}; pool recriado")
+                    return self._json(500, {"erro":"processo de geração morreu; tente de novo"})
+                if r["erro"]: return self._json(500, {"erro":r["erro"]})
+                arquivo=r["saida"]
+                with open(arquivo, "rb") as f:
+                    tam=os.fstat(f.fileno()).st_size
+                    self.send_response(200); self.send_header("Content-Type", _TIPOS_HTTP[ext]); self.send_header("Content-Length", str(tam))
+                    self.send_header("Content-Disposition", f'attachment; filename="{urllib.parse.quote(job["tema"])}.{ext}"')
+                    self.send_header("X-Segundos", f"{r['segundos']:.3f}"); self.end_headers()
+                    self.request.sendfile(f)
+                relatorio(f"✅ {job['tema']} {job.get('linhas', 1000):,} linhas -> {tam/1e6:.2f} MB em {time.perf_counter()-t:.3f}s")
+            except (BrokenPipeError, ConnectionResetError): pass
+            finally:
+                with trava: estado["andamento"]-=1
+                vagas.release()
+                for caminho in (arquivo, job["saida"]):
+                    if caminho and os.path.exists(caminho): (shutil.rmtree if os.path.isdir(caminho) else os.remove)(caminho)
+
+    httpd=ThreadingHTTPServer((host, porta), _Handler); httpd.daemon_threads=True
+    relatorio(f"Servindo em http://{host}:{httpd.server_address[1]} com {trabalhadores} processo(s) (pronto em {time.perf_counter()-t0:.1f}s); Ctrl+C encerra")
+    def _encerrar(*_): raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, _encerrar)  # kill/systemd encerram como o Ctrl+C
+    try: httpd.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        httpd.server_close(); ex[0].shutdown(cancel_futures=True); shutil.rmtree(pasta, ignore_errors=True)
+
+# ========= tempo de import =========
+ORCAMENTO_IMPORTACAO_MS = 250  # import do módulo num processo novo (sem pandas/Faker)
+
+def medir_importacao(repeticoes: int=5) -> float:
+    """Melhor tempo (ms) de `import Gerador_Planilhas` num interpretador novo."""
+    import subprocess
+    pasta, mod = os.path.split(os.path.abspath(__file__)); mod=os.path.splitext(mod)[0]
+    codigo=f"import sys, time; sys.path.insert(0, {pasta!r}); t=time.perf_counter(); import {mod}; print(time.perf_counter()-t)"
+    return min(1000*float(subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True).stdout) for _ in range(max(1, repeticoes)))
+
+# ========= benchmark =========
+# Cada caso (tema, linhas) roda num processo novo, para o pico de RSS ser só dele. As etapas são
+# medidas em sequência: bundle, spec, pivôs e xlsx (o xlsx inclui de novo os pivôs, como no uso real).
+# Antes delas, "preparo" mede uma vez o que cada processo paga só no primeiro uso (import do pandas e
+# pools do Faker), para o bundle medir só a geração; linhas/s e total_s não contam o preparo.
+BENCH_LINHAS = (1_000, 10_000, 100_000)
+BENCH_SEMENTE = 42
+
+def _etapas_benchmark(tema: str, linhas: int, seed: int, medir) -> None:
+    import tempfile
+    campos=list(PERFIL_IDX[tema]["completo"])
+    bundle=medir("bundle", gerar_bundle, tema, linhas, seed)
+    spec=medir("spec", build_spec_from_bundle, tema, bundle, campos)
+    dfs={sh['name']: sh['tabela'] for sh in spec.get('sheets', [])}
+    medir("pivos", lambda: [_pivo_df(dfs[pv['data_sheet']], pv) for pv in spec.get('pivots', []) if pv['data_sheet'] in dfs])
+    with tempfile.TemporaryDirectory() as pasta:
+        medir("xlsx", gerar_planilha, spec, os.path.join(pasta, "bench.xlsx"))
+
+def _caso_benchmark(tema: str, linhas: int, seed: int, alocacoes: bool=False, repeticoes: int=1) -> Dict[str, Any]:
+    # tracemalloc deixa tudo várias vezes mais lento: as alocações saem de uma segunda passada
+    import tracemalloc
+    etapas: Dict[str, Any]={}
+    def _tempo(nome, fn, *args):
+        t0=time.perf_counter(); out=fn(*args); seg=round(time.perf_counter()-t0, 4)
+        etapas[nome]={"segundos":min(seg, etapas.get(nome, {"segundos":seg})["segundos"])}; return out  # melhor das repetições
+    def _alocado(nome, fn, *args):
+        tracemalloc.start(); out=fn(*args)
+        etapas[nome]["alocado_pico_mb"]=round(tracemalloc.get_traced_memory()[1]/2**20, 2); tracemalloc.stop(); return out
+    _tempo("preparo", lambda: (pd.DataFrame, preparar_pools()))
+    for _ in range(max(1, repeticoes)): _etapas_benchmark(tema, linhas, seed, _tempo)
+    pico=_pico_rss_mb()
+    if alocacoes: _etapas_benchmark(tema, linhas, seed, _alocado)
+    total=sum(e["segundos"] for k, e in etapas.items() if k!="preparo")
+    return {"tema":tema, "linhas":linhas, "etapas":etapas, "total_s":round(total, 4),
+            "linhas_por_s":round(linhas/total, 1) if total else None, "pico_rss_mb":round(pico, 1)}
+
+def executar_benchmark(temas: Optional[List[str]]=None, linhas=BENCH_LINHAS, seed: int=BENCH_SEMENTE, alocacoes: bool=False, repeticoes: int=1,
+                       relatorio=print) -> Dict[str, Any]:
+    import multiprocessing, platform
+    from concurrent.futures import ProcessPoolExecutor
+    importacao=round(medir_importacao(), 1); relatorio(f"import do módulo: {importacao:.0f} ms (orçamento {ORCAMENTO_IMPORTACAO_MS} ms)")
+    casos=[]
+    for tema in temas or listar_temas():
+        for n in linhas:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as ex:
+                c=ex.submit(_caso_benchmark, tema, n, seed, alocacoes, repeticoes).result()
+            casos.append(c)
+            relatorio(f"{tema:<13} {n:>9,} linhas  " + "  ".join(f"{k} {v['segundos']:.3f}s" for k, v in c["etapas"].items())
+                      + f"  | {c['linhas_por_s']:,.0f} linhas/s, pico {c['pico_rss_mb']:.0f} MB")
+    return {"versao":1, "semente":seed, "alocacoes":alocacoes, "repeticoes":repeticoes, "data":datetime.now().isoformat(timespec="seconds"),
+            "ambiente":{"python":platform.python_version(), "numpy":np.__version__, "pandas":pd.__version__, "plataforma":platform.platform()},
+            "importacao_ms":importacao, "casos":casos}
+
+def comparar_benchmark(atual: Dict[str, Any], base: Dict[str, Any], tolerancia: float=0.2, minimo_s: float=0.05) -> List[str]:
+    """Regressões de `atual` contra `base`: etapas mais lentas que (1+tolerancia)x (ignorando tempos
+    abaixo de minimo_s, que são ruído) e pico de RSS acima da mesma margem."""
+    ref={(c["tema"], c["linhas"]): c for c in base.get("casos", [])}; regressoes=[]
+    imp, imp_base = atual.get("importacao_ms"), base.get("importacao_ms")
+    if imp is not None and imp>ORCAMENTO_IMPORTACAO_MS: regressoes.append(f"import: {imp:.0f} ms acima do orçamento de {ORCAMENTO_IMPORTACAO_MS} ms")
+    elif imp is not None and imp_base and imp>imp_base*(1+tolerancia): regressoes.append(f"import: {imp_base:.0f} ms -> {imp:.0f} ms")
+    for c in atual.get("casos", []):
+        b=ref.get((c["tema"], c["linhas"]))
+        if b is None: continue
+        for etapa, e in c["etapas"].items():
+            be=b["etapas"].get(etapa)
+            if be and e["segundos"]>=minimo_s and e["segundos"]>be["segundos"]*(1+tolerancia):
+                regressoes.append(f"{c['tema']} {c['linhas']:,} {etapa}: {be['segundos']:.3f}s -> {e['segundos']:.3f}s (+{e['segundos']/be['segundos']-1:.0%})")
+        if c["pico_rss_mb"]>b["pico_rss_mb"]*(1+tolerancia):
+            regressoes.append(f"{c['tema']} {c['linhas']:,} pico RSS: {b['pico_rss_mb']:.0f} MB -> {c['pico_rss_mb']:.0f} MB")
+    return regressoes
+
+# ========= seleção / CLI =========
+def normaliza_tema(v: str)->str:
+    key=v.strip().lower()
+    if key in ALIASES: return ALIASES[key]
+    for k in _TEMAS.keys():
+        if key==k.lower(): return k
+    raise ValueError(f"Tema inválido: {v}. Opções: {', '.join(listar_temas())}")
+
+def resolve_campos_por_perfil(tema: str, perfil: str, expr: Optional[str]=None)->List[str]:
+    if perfil.lower().startswith("b"): return list(PERFIL_IDX[tema]["basico"])
+    if perfil.lower().startswith("c"): return list(PERFIL_IDX[tema]["completo"])
+    todos=CAMPOS_TEMA[tema]
+    if expr is None:
+        print("\nSelecione campos (números, vírgulas, intervalos com '-').")
+        for i,c in enumerate(todos,1): print(f"  {i}) {c}")
+        expr=input("Ex.: 1-5,8,10 (ENTER=todos): ").strip()
+    idxs=parse_ranges_to_indices(expr, len(todos))
+    if not idxs: idxs=list(range(len(todos)))
+    return [todos[i] for i in idxs]
+
+def modo_interativo():
+    temas=listar_temas(); estilos=list(ESTILOS.keys())
+    tema=temas[prompt_menu("Tema", temas, 0)]
+    linhas=prompt_int("Quantidade de linhas", 1000, 1)
+    estilo=estilos[prompt_menu("Estilo", estilos, 0)]
+    perfil=PERFIS[prompt_menu("Perfil de saída", PERFIS, 0)]
+    campos = resolve_campos_por_perfil(tema, perfil)
+    saida=input("Arquivo de saída (padrão: saida.xlsx): ").strip() or "saida.xlsx"
+    print("\nGerando...")
+    caminho=gerar_excel_tema(tema, linhas, campos, saida, estilo=estilo)
+    print(f"✅ Planilha gerada: {caminho}")
+
+def modo_argparse():
+    import argparse
+    p=argparse.ArgumentParser(description="Gerador XLSX multi-temas (PT-BR), com estilos e campos personalizáveis")
+    p.add_argument("--lote", default=None, help="Manifesto JSON/YAML com vários jobs (tema, linhas, perfil, saida, ...); '-' lê do stdin")
+    p.add_argument("--trabalhadores", type=int, default=1, help="Processos do modo lote e do --servir")
+    p.add_argument("--servir", action="store_true", help="Serve a geração por HTTP (GET/POST /gerar, /temas, /saude) com processos aquecidos")
+    p.add_argument("--host", default="127.0.0.1", help="Endereço do --servir")
+    p.add_argument("--porta", type=int, default=SERVIR_PORTA, help="Porta do --servir")
+    p.add_argument("--fila", type=int, default=SERVIR_FILA, help="Pedidos aguardando além dos em andamento antes de responder 503")
+    p.add_argument("--listar-temas", action="store_true", help="Lista os temas e sai")
+    p.add_argument("--temas", default=None, metavar="TEMAS.json", help="Arquivo JSON/YAML com temas declarativos a registrar")
+    p.add_argument("--tempo-importacao", action="store_true", help=f"Mede o import do módulo; sai com erro acima de {ORCAMENTO_IMPORTACAO_MS} ms")
+    p.add_argument("--benchmark", default=None, metavar="RESULTADO.json", help="Mede os temas por etapa e grava o resultado em JSON")
+    p.add_argument("--benchmark-temas", default=None, help="Temas do benchmark, separados por vírgula (padrão: todos)")
+    p.add_argument("--benchmark-linhas", default=",".join(map(str, BENCH_LINHAS)), help="Quantidades de linhas do benchmark")
+    p.add_argument("--benchmark-alocacoes", action="store_true", help="Mede também o pico de alocações (tracemalloc; deixa tudo mais lento)")
+    p.add_argument("--benchmark-repeticoes", type=int, default=1, help="Repete cada caso e guarda o melhor tempo de cada etapa")
+    p.add_argument("--baseline", default=None, help="JSON de benchmark anterior para comparar; sai com erro se houver regressão")
+    p.add_argument("--tolerancia", type=float, default=0.2, help="Folga relativa antes de acusar regressão (0.2 = 20%%)")
+    p.add_argument("--tema", default="Market")
+    p.add_argument("--linhas", type=int, default=1000)
+    p.add_argument("--saida", default="saida.xlsx")
+    p.add_argument("--perfil", default="basico", choices=["basico","completo","personalizado","básico","completo","personalizado"])
+    p.add_argument("--campos", default=None, help="Para perfil personalizado. Ex.: '1-5,8,10'")
+    p.add_argument("--estilo", default="Azul", choices=list(ESTILOS.keys()))
+    p.add_argument("--nao_interativo", action="store_true")
+    p.add_argument("--seed", type=int, default=None, help="Semente para saída reprodutível")
+    p.add_argument("--data-referencia", default=None, metavar="AAAA-MM-DD", help="'Hoje' das datas geradas (padrão: fixo com --seed, o relógio sem ela)")
+    p.add_argument("--processos", type=int, default=1, help="Processos para gerar os pedaços em paralelo (a saída não depende do número)")
+    p.add_argument("--abas-paralelas", action="store_true", help="Com --processos, escreve também as abas grandes em paralelo (mesmos valores, bytes diferentes)")
+    p.add_argument("--streaming", action="store_true", help="Escreve em fluxo (constant_memory), sem manter o dataset inteiro em memória")
+    p.add_argument("--max-linhas-aba", type=int, default=MAX_LINHAS_ABA, help="Linhas de dados por aba antes de dividir (padrão: limite do Excel)")
+    p.add_argument("--dividir-em", default="abas", choices=["abas","arquivos"], help="Onde colocar as partes de tabelas grandes")
+    p.add_argument("--formato", default="xlsx", choices=FORMATOS, help="xlsx, uma pasta com um arquivo csv/parquet/arrow por aba, ou um banco sqlite com uma tabela por aba")
+    p.add_argument("--pivos-visao", action="store_true", help="Formato sqlite: pivôs como views sobre a tabela da aba, em vez de tabelas calculadas")
+    p.add_argument("--modo-abertura-rapida", action="store_true", help="Zebra por estilo de tabela em vez de formatação condicional")
+    p.add_argument("--alertas-hoje", action="store_true", help="Alertas de validade/vencimento comparam com HOJE() (recalcula ao abrir)")
+    p.add_argument("--metricas", default=None, metavar="ARQUIVO.json", help="Grava tempo, linhas e memória de cada etapa e aba")
+    p.add_argument("--perfilar", default=None, metavar="ARQUIVO.prof", help="Roda com cProfile (.prof = pstats, .txt = relatório)")
+    p.add_argument("--pool-faker", type=int, default=TAM_POOL_FAKER, help="Valores por pool do Faker (nomes, empresas, cidades, CEPs)")
+    p.add_argument("--pools", default=None, help="Arquivo .npz dos pools: carrega se existir, senão gera e salva")
+    p.add_argument("--documentos", default="formatados", choices=["formatados","numeros"], help="CPF/CNPJ/IE com máscara ou só os dígitos")
+    p.add_argument("--estado", default=None, metavar="ESTADO.pkl", help="Modo incremental: sem o arquivo gera a base e o cria; com ele, gera só --linhas novas")
+    p.add_argument("--dias-novos", type=int, default=1, help="Modo incremental: dias que as linhas novas cobrem depois da última data gravada")
+    p.add_argument("--sem-cache", action="store_true", help="Não lê nem grava o cache em disco (só vale com --seed)")
+    p.add_argument("--cache-pasta", default=None, help=f"Pasta do cache (padrão: $GERADOR_CACHE ou {CACHE_PASTA})")
+    p.add_argument("--cache-max-mb", type=float, default=None, help=f"Tamanho máximo do cache antes de descartar os menos usados (padrão: {CACHE_MAX_MB})")
+    p.add_argument("--cache", default=None, choices=["stats","limpar"], help="Mostra as estatísticas do cache ou apaga o cache, e sai")
+    args=p.parse_args()
+    if args.linhas<1: p.error("--linhas deve ser >= 1")
+    if not 1<=args.max_linhas_aba<=MAX_LINHAS_ABA: p.error(f"--max-linhas-aba deve estar entre 1 e {MAX_LINHAS_ABA}")
+
+    if args.temas: carregar_temas(args.temas)
+    if args.listar_temas:
+        print("\n".join(listar_temas())); return
+    if args.tempo_importacao:
+        ms=medir_importacao(); print(f"import: {ms:.0f} ms (orçamento {ORCAMENTO_IMPORTACAO_MS} ms)")
+        if ms>ORCAMENTO_IMPORTACAO_MS: sys.exit(1)
+        return
+    configurar_cache(not args.sem_cache, args.cache_pasta, args.cache_max_mb)
+    if args.cache=="limpar":
+        limpar_cache(); print(f"Cache apagado: {CACHE_PASTA}"); return
+    if args.cache=="stats":
+        st=estatisticas_cache()
+        print(f"Cache: {st['pasta']} ({'ligado' if st['ativo'] else 'desligado'})\n  {st['entradas']} entradas, {st['mb']:.1f} MB de {st['max_mb']:.0f} MB")
+        for tipo, t in sorted(st["tipos"].items()):
+            total=t.get("acertos", 0)+t.get("faltas", 0)
+            print(f"  {tipo:<7} {t['entradas']:>5} entradas {t['mb']:>9.1f} MB  acertos {t.get('acertos', 0)}/{total}" + (f" ({t.get('acertos', 0)/total:.0%})" if total else ""))
+        return
+    configurar_pools(tamanho=args.pool_faker); configurar_documentos(args.documentos=="formatados")
+    if args.pools and os.path.exists(args.pools): carregar_pools(args.pools)
+    elif args.pools and _FAKER_OK: salvar_pools(args.pools)
+    if args.benchmark:
+        temas=[normaliza_tema(t) for t in args.benchmark_temas.split(",")] if args.benchmark_temas else None
+        res=executar_benchmark(temas, [int(x) for x in args.benchmark_linhas.split(",")], args.seed if args.seed is not None else BENCH_SEMENTE,
+                               args.benchmark_alocacoes, args.benchmark_repeticoes)
+        with open(args.benchmark, "w", encoding="utf-8") as f: json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"✅ Benchmark gravado: {args.benchmark}")
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f: regressoes=comparar_benchmark(res, json.load(f), args.tolerancia)
+            for r in regressoes: print(f"⚠️  regressão: {r}")
+            if regressoes: sys.exit(1)
+            print("Sem regressões em relação ao baseline.")
+        return
+    if args.servir:
+        servir(args.host, args.porta, max(1, args.trabalhadores), args.fila); return
+    if args.lote:
+        try: jobs=carregar_manifesto(args.lote)
+        except (ValueError, json.JSONDecodeError) as e: p.error(f"--lote: {e}")
+        resultados=executar_lote(jobs, args.trabalhadores)
+        if any(r["erro"] for r in resultados): sys.exit(1)
+        return
+    tema=normaliza_tema(args.tema)
+    perfil="Básico" if args.perfil.startswith("b") else "Completo" if args.perfil.startswith("c") else "Personalizado"
+    campos = resolve_campos_por_perfil(tema, perfil, expr=args.campos if (args.nao_interativo or perfil=="Personalizado") else None)
+    with coletar_metricas(args.perfilar) if (args.metricas or args.perfilar) else _sem_metricas() as eventos:
+        if args.estado:
+            caminho=gerar_incremental(args.estado, args.saida, args.linhas, None if os.path.exists(args.estado) else tema, campos, args.seed, args.dias_novos,
+                                      args.estilo, args.processos, args.max_linhas_aba, args.dividir_em, args.modo_abertura_rapida, args.alertas_hoje, args.formato,
+                                      args.pivos_visao, args.data_referencia)
+        else: caminho=gerar_excel_tema(tema, args.linhas, campos, args.saida, estilo=args.estilo, seed=args.seed, processos=args.processos, streaming=args.streaming,
+                                       max_linhas_aba=args.max_linhas_aba, dividir_em=args.dividir_em, rapido=args.modo_abertura_rapida, alertas_hoje=args.alertas_hoje,
+                                       formato=args.formato, pivos_visao=args.pivos_visao, abas_paralelas=args.abas_paralelas,
+                                       data_referencia=args.data_referencia)
+    if args.metricas:
+        with open(args.metricas, "w", encoding="utf-8") as f:
+            json.dump({"saida":caminho, "pico_rss_mb":round(_pico_rss_mb(), 1), "eventos":eventos}, f, ensure_ascii=False, indent=2)
+    print(f"✅ Planilha gerada: {caminho}")
+
+if __name__=="__main__":
+    if len(sys.argv)==1: modo_interativo()
+    else: modo_argparse()
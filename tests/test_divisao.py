@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+import Gerador_Planilhas as G
+
+openpyxl=pytest.importorskip("openpyxl")
+
+
+def _linhas_por_aba(caminho):
+    wb=openpyxl.load_workbook(caminho, read_only=True)
+    return {ws.title: ws.max_row-1 for ws in wb.worksheets if ws.title.startswith("Vendas")}  # sem o cabeçalho
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_divide_em_abas(tmp_path, streaming):
+    caminho=G.gerar_excel_tema("Market", 1000, list(G.CAMPOS_TEMA["Market"]), str(tmp_path/"s.xlsx"), seed=2, streaming=streaming,
+                               max_linhas_aba=300, dividir_em="abas", cache=False)
+    assert _linhas_por_aba(caminho)=={"Vendas":300, "Vendas (2)":300, "Vendas (3)":300, "Vendas (4)":100}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_divide_em_arquivos(tmp_path, streaming):
+    G.gerar_excel_tema("Market", 1000, list(G.CAMPOS_TEMA["Market"]), str(tmp_path/"s.xlsx"), seed=2, streaming=streaming,
+                       max_linhas_aba=300, dividir_em="arquivos", cache=False)
+    assert sorted(os.listdir(tmp_path))==["s.xlsx", "s_2.xlsx", "s_3.xlsx", "s_4.xlsx"]
+    assert [_linhas_por_aba(tmp_path/f) for f in sorted(os.listdir(tmp_path))]==[{"Vendas":300}, {"Vendas (2)":300}, {"Vendas (3)":300}, {"Vendas (4)":100}]
+
+
+def test_aba_exata_nao_divide(tmp_path):
+    caminho=G.gerar_excel_tema("Market", 300, list(G.CAMPOS_TEMA["Market"]), str(tmp_path/"s.xlsx"), seed=2, max_linhas_aba=300, cache=False)
+    assert _linhas_por_aba(caminho)=={"Vendas":300}
+
+
+@pytest.mark.parametrize("kw", [{"n_linhas":0}, {"max_linhas_aba":0}, {"max_linhas_aba":G.MAX_LINHAS_ABA+1}, {"dividir_em":"pastas"}])
+def test_parametros_invalidos(tmp_path, kw):
+    args={"n_linhas":10, **kw}
+    with pytest.raises(ValueError):
+        G.gerar_excel_tema("Logística", args.pop("n_linhas"), list(G.CAMPOS_TEMA["Logística"]), str(tmp_path/"s.xlsx"), cache=False, **args)
@@ -0,0 +1,65 @@
+import re
+
+import numpy as np
+import pytest
+
+import Gerador_Planilhas as G
+
+
+def _digitos(doc):
+    return [int(c) for c in re.sub(r"\D", "", doc)]
+
+
+def _dv11(d, pesos):
+    r=sum(x*p for x, p in zip(d, pesos)) % 11
+    return 0 if r<2 else 11-r
+
+
+def cpf_valido(doc):
+    d=_digitos(doc)
+    return len(d)==11 and d[9]==_dv11(d, range(10, 1, -1)) and d[10]==_dv11(d, range(11, 1, -1))
+
+
+def cnpj_valido(doc):
+    d=_digitos(doc)
+    return len(d)==14 and d[12]==_dv11(d, [5,4,3,2,9,8,7,6,5,4,3,2]) and d[13]==_dv11(d, [6,5,4,3,2,9,8,7,6,5,4,3,2])
+
+
+def ie_sp_valida(doc):
+    d=_digitos(doc)
+    return (len(d)==12 and d[8]==sum(x*p for x, p in zip(d, [1,3,4,5,6,7,8,10])) % 11 % 10
+            and d[11]==sum(x*p for x, p in zip(d, [3,2,10,9,8,7,6,5,4,3,2])) % 11 % 10)
+
+
+def ean13_valido(cod):
+    d=_digitos(cod)
+    return len(d)==13 and d[12]==(10-sum(x*(3 if i % 2 else 1) for i, x in enumerate(d[:12])) % 10) % 10
+
+
+@pytest.mark.parametrize("validar, bons, ruins", [
+    (cpf_valido, ["529.982.247-25", "11144477735"], ["529.982.247-26", "11144477734"]),
+    (cnpj_valido, ["11.222.333/0001-81", "11444777000161"], ["11.222.333/0001-82", "11444777000160"]),
+    (ie_sp_valida, ["110.042.490.114"], ["110.042.490.115", "110.042.491.114"]),
+    (ean13_valido, ["4006381333931", "7891000100103"], ["4006381333932", "7891000100104"]),
+])
+def test_validadores_com_numeros_conhecidos(validar, bons, ruins):
+    assert all(map(validar, bons)) and not any(map(validar, ruins))
+
+
+@pytest.mark.parametrize("gerar, validar, mascara", [
+    (G.cpf_vet, cpf_valido, r"\d{3}\.\d{3}\.\d{3}-\d{2}"),
+    (G.cnpj_vet, cnpj_valido, r"\d{2}\.\d{3}\.\d{3}/0001-\d{2}"),
+    (G.ie_vet, ie_sp_valida, r"\d{3}\.\d{3}\.\d{3}\.\d{3}"),
+])
+def test_documentos_gerados_validos(gerar, validar, mascara):
+    rng=np.random.default_rng(1)
+    formatados=gerar(rng, 2000, formatado=True); crus=gerar(rng, 2000, formatado=False)
+    assert all(re.fullmatch(mascara, d) for d in formatados)
+    assert all(d.isdigit() for d in crus)
+    assert all(map(validar, formatados)) and all(map(validar, crus))
+
+
+def test_ean13_gerado_valido():
+    cods=G._ean13_vet(np.random.default_rng(2), 2000)
+    assert all(c.startswith("789") and len(c)==13 for c in cods)
+    assert all(map(ean13_valido, cods))
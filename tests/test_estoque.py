@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import Gerador_Planilhas as G
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    # vários pedaços: posição e saldo diário são reagregados ao juntar
+    return G.gerar_bundle("Estoque", 3000, seed=9, tam_pedaco=700, campos=list(G.CAMPOS_TEMA["Estoque"]))
+
+
+def _texto(df, *colunas):
+    # categóricas do gerador vs. objetos do groupby simples: compara como texto
+    return df.astype({c: str for c in colunas})
+
+
+def _sinal(mov):
+    return np.where(mov["tipo"].astype(str)=="Entrada", 1, -1)*mov["qtd"].astype(int)
+
+
+def _comparar(obtido, esperado):
+    pd.testing.assert_frame_equal(obtido.reset_index(drop=True), esperado.reset_index(drop=True), check_dtype=False, check_categorical=False)
+
+
+def test_posicao_igual_groupby(bundle):
+    mov=_texto(bundle["mov"], "sku","produto","categoria","ean13")
+    esperado=(mov.assign(saldo=_sinal(mov), valor_mov=mov["valor"])
+                 .groupby(["sku","produto","categoria","ean13"], as_index=False)[["saldo","valor_mov"]].sum().round(2))
+    _comparar(_texto(bundle["posicao"], "sku","produto","categoria","ean13"), esperado)
+    _comparar(_texto(G._posicao_estoque(bundle["mov"]), "sku","produto","categoria","ean13"), esperado)
+
+
+def test_saldo_diario_igual_groupby(bundle):
+    mov=_texto(bundle["mov"], "sku","produto","almox")
+    entrada=mov["tipo"].astype(str)=="Entrada"
+    esperado=(mov.assign(entradas=mov["qtd"].astype(int).where(entrada, 0), saidas=mov["qtd"].astype(int).where(~entrada, 0))
+                 .groupby(["sku","produto","almox","data"], as_index=False)[["entradas","saidas"]].sum())
+    esperado["saldo"]=(esperado["entradas"]-esperado["saidas"]).groupby([esperado["sku"], esperado["almox"]]).cumsum()
+    _comparar(_texto(bundle["saldo_diario"], "sku","produto","almox"), esperado)
+    _comparar(_texto(G._saldo_diario(bundle["mov"]), "sku","produto","almox"), esperado)
@@ -0,0 +1,40 @@
+import pytest
+
+import Gerador_Planilhas as G
+
+TEMA="Teste Expressões"
+
+
+def _gerar(**colunas):
+    G.registrar_tema(TEMA, {"tabela":"dados", "colunas":{"a":{"inteiros":(1, 5)}, **colunas}})
+    return G.gerar_bundle(TEMA, 20, seed=1)["dados"]
+
+
+@pytest.mark.parametrize("colunas", [
+    {"_f":"_CONTEXTOS['Market']", "b":"len(_f(10)['produtos'])"},   # registro do módulo via coluna-apelido
+    {"b":"len(_CONTEXTOS['Market'](10)['produtos'])"},
+    {"b":"ESQUEMAS_TEMAS['Market']['contexto'](1)"},
+    {"b":"len(_TEMAS)"},
+    {"b":"_TIPOS_COLUNA['normal']"},
+    {"_f":"normal", "b":"_f(0, 1)"},                               # função do fluxo guardada numa coluna
+    {"_f":"_juros_titulo", "b":"_f(a, a, a)"},
+    {"b":"ctx['_clientes']"},
+    {"b":"limpar_cache()"},
+    {"b":"__import__('os').system('true')"},
+    {"b":"open('/etc/passwd')"},
+    {"b":"().__class__.__bases__[0]"},
+    {"b":"[x for x in a]"},
+    {"b":"_FATOR_PRECO.amostrar(r, n)"},
+    {"b":"(lambda: 1)()"},
+])
+def test_expressao_nao_escapa(colunas):
+    with pytest.raises((ValueError, NameError, KeyError)): _gerar(**colunas)
+
+
+def test_expressoes_permitidas():
+    df=_gerar(b="where(a>2, a*2, 0)", c="round(sorteio(_FATOR_PRECO)*a, 2)", d="_CATEGORIAS_MENU.index('Bebida')+a",
+              e="de_codigos(a-1, _MODAIS.itens[:4])", f="a.astype(float)/2")
+    assert ((df["b"]==0) | (df["b"]==2*df["a"])).all()
+    assert (df["d"]==df["a"]+G._CATEGORIAS_MENU.index("Bebida")).all()
+    assert set(df["e"].astype(str))<=set(G._MODAIS.itens[:4])
+    assert (df["f"]==df["a"]/2).all()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import Gerador_Planilhas as G
+
+
+@pytest.mark.parametrize("espaco", [1, 2, 7, 1000, 12345, 1<<16])
+def test_permutar_ids_e_bijecao(espaco):
+    v=G.permutar_ids(np.arange(espaco), espaco, chave=42)
+    assert v.min()>=0 and v.max()<espaco
+    assert np.array_equal(np.sort(v), np.arange(espaco))
+
+
+def test_ids_unicos_por_pedaco_continuam_a_tabela():
+    inteiro=G.ids_unicos(0, 5000, 10**6, chave=3)
+    pedacos=np.concatenate([G.ids_unicos(i, 1000, 10**6, chave=3) for i in range(0, 5000, 1000)])
+    assert np.array_equal(inteiro, pedacos)
+    assert len(np.unique(inteiro))==len(inteiro)
+    assert not np.array_equal(inteiro, G.ids_unicos(0, 5000, 10**6, chave=4))
+
+
+def test_ids_unicos_recusa_espaco_pequeno():
+    with pytest.raises(ValueError, match="espaço de IDs"): G.ids_unicos(90, 20, 100, chave=1)
+
+
+def _colunas_id(tema):
+    return [c for c, d in G._ESQUEMAS[tema]["colunas"].items() if isinstance(d, dict) and "id" in d and not c.startswith("_")]
+
+
+@pytest.mark.parametrize("tema", [t for t in G.listar_temas() if _colunas_id(t)])
+def test_colunas_de_id_sem_repeticao(tema):
+    tab=G.gerar_bundle(tema, 3000, seed=13, processos=2, tam_pedaco=600, campos=list(G.CAMPOS_TEMA[tema]))[G._ESQUEMAS[tema]["tabela"]]
+    for c in _colunas_id(tema): assert tab[c].is_unique, c
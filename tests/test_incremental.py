@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+import Gerador_Planilhas as G
+
+pytest.importorskip("pyarrow")
+
+
+def _aba_principal(tema):
+    esq=G._ESQUEMAS[tema]
+    return next(a["nome"] for a in esq["abas"] if a["fonte"]==esq["tabela"])
+
+
+def _temas_kpis_da_principal():
+    # KPIs sobre a tabela principal: o esperado sai das linhas gravadas em todas as rodadas
+    return [t for t in G.listar_temas() if G._ESQUEMAS[t]["kpis"] and all(calc[1]==G._ESQUEMAS[t]["tabela"] for _, calc, _ in G._ESQUEMAS[t]["kpis"])]
+
+
+def _rodadas(tmp_path, tema, n=3, linhas=800):
+    estado=str(tmp_path/"estado.pkl"); pastas=[]
+    for r in range(n):
+        pastas.append(G.gerar_incremental(estado, str(tmp_path/f"r{r}.parquet"), linhas, tema=tema, campos=list(G.CAMPOS_TEMA[tema]),
+                                          seed=21, formato="parquet", dias_novos=3))
+    return pastas
+
+
+@pytest.mark.parametrize("tema", _temas_kpis_da_principal())
+def test_kpis_acumulam_todas_as_rodadas(tmp_path, tema):
+    pastas=_rodadas(tmp_path, tema); esq=G._ESQUEMAS[tema]
+    todas=pd.concat([pd.read_parquet(os.path.join(p, f"{_aba_principal(tema)}.parquet")) for p in pastas], ignore_index=True)
+    obtido=pd.read_parquet(os.path.join(pastas[-1], "Dashboard.parquet")).set_index("indicador")["valor"]
+    for rotulo, calc, fmt in esq["kpis"]:
+        esperado=G._kpi_valor(calc, G._kpi_parcial(calc, {esq["tabela"]: todas}), fmt)
+        assert obtido[rotulo]==pytest.approx(esperado, rel=1e-12), rotulo
+
+
+def test_rodadas_continuam_do_dia_seguinte(tmp_path):
+    # Estoque só tem dias úteis: cada rodada começa no dia útil seguinte à última data gravada, sem buraco
+    pastas=_rodadas(tmp_path, "Estoque")
+    datas=[pd.read_parquet(os.path.join(p, "Movimentações.parquet"))["data"].dt.normalize() for p in pastas]
+    for antes, depois in zip(datas, datas[1:]):
+        assert depois.min()==antes.max()+pd.offsets.BDay(1)
+        assert depois.max()<=antes.max()+pd.Timedelta(days=3)
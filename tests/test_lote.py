@@ -0,0 +1,29 @@
+import pytest
+
+import Gerador_Planilhas as G
+
+
+def test_manifesto_formas():
+    job={"tema":"Market", "linhas":10, "saida":"x.xlsx"}
+    assert G._jobs_manifesto(job)==G._jobs_manifesto([job])==[job]
+    assert G._jobs_manifesto({"padrao":{"linhas":5}, "jobs":[{"tema":"agro"}]})==[{"linhas":5, "tema":"Agro", "saida":"Agro_1.xlsx"}]
+    assert G._jobs_manifesto(G._ler_json_ou_linhas('{"tema":"Market"}\n{"tema":"Agro"}\n'))[1]["tema"]=="Agro"
+
+
+@pytest.mark.parametrize("dados", [[], {"jobs":[]}, {"padrao":{"linhas":5}}, "Market"])
+def test_manifesto_sem_jobs(dados):
+    with pytest.raises(ValueError): G._jobs_manifesto(dados)
+
+
+def _colunas_job(tmp_path, **extra):
+    r=G._executar_job({"tema":"Market", "linhas":5, "saida":str(tmp_path/"a.csv"), "formato":"csv", "cache":False, **extra})
+    if r["erro"]: return r["erro"]
+    return list(G.pd.read_csv(tmp_path/"a"/"Vendas.csv").columns)
+
+
+def test_job_com_campos_sem_perfil_e_personalizado(tmp_path):
+    todos=G.CAMPOS_TEMA["Market"]
+    assert _colunas_job(tmp_path, campos="1-3")==todos[:3]
+    assert _colunas_job(tmp_path, campos="2,4", perfil="personalizado")==[todos[1], todos[3]]
+    assert _colunas_job(tmp_path)==G.PERFIL_IDX["Market"]["basico"]
+    assert "personalizado" in _colunas_job(tmp_path, campos="1-3", perfil="basico")
@@ -0,0 +1,27 @@
+import pytest
+
+import Gerador_Planilhas as G
+
+
+@pytest.mark.parametrize("dados", [
+    {"linhas":"10"},
+    {"tema":"Market", "seed":"-1"},
+    {"tema":"Market", "max_linhas_aba":"0"},
+    {"tema":"Market", "max_linhas_aba":G.MAX_LINHAS_ABA+1},
+    {"tema":"Market", "dividir_em":"arquivos"},
+    {"tema":"Market", "processos":2},
+    {"tema":"Market", "campos":"1-3", "perfil":"basico"},
+    {"tema":"Market", "campos":"99"},
+    {"tema":"Market", "campos":"data,inexistente"},
+    {"tema":"Market", "perfil":"outro"},
+    {"tema":"Market", "data_referencia":"ontem"},
+])
+def test_pedido_invalido_e_400(dados):
+    with pytest.raises(ValueError): G._pedido_http(dados)
+
+
+def test_pedido_valido():
+    job=G._pedido_http({"tema":"market", "linhas":"20", "seed":"0", "max_linhas_aba":"5", "campos":"1-3", "streaming":"sim"})
+    assert job=={"tema":"Market", "linhas":20, "seed":0, "max_linhas_aba":5, "campos":"1-3", "streaming":True}
+    assert G._pedido_http({"tema":"Market", "campos":"data, cliente"})["campos"]==["data", "cliente"]
+    assert "seed" not in G._pedido_http({"tema":"Market", "seed":None})
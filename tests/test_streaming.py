@@ -0,0 +1,62 @@
+import filecmp
+import os
+import sqlite3
+
+import pytest
+
+import Gerador_Planilhas as G
+
+TEMAS=G.listar_temas()
+
+
+def _pedacos(tema, campos, tam=250):
+    return G.iter_pedacos(tema, 1000, seed=5, tam_pedaco=tam, campos=campos)
+
+
+def _spec(tema, campos, tam=250):
+    return G.build_spec_from_bundle(tema, G.gerar_bundle(tema, 1000, seed=5, tam_pedaco=tam, campos=campos), campos)
+
+
+@pytest.mark.parametrize("tema", TEMAS)
+def test_tabelas_streaming_igual_em_memoria(tmp_path, tema):
+    campos=list(G.CAMPOS_TEMA[tema])
+    a=G.gerar_tabelas(_spec(tema, campos), str(tmp_path/"mem.csv"), "csv")
+    b=G.gerar_tabelas_streaming(tema, _pedacos(tema, campos), campos, str(tmp_path/"fluxo.csv"), "csv")
+    arquivos=sorted(os.listdir(a))
+    assert arquivos==sorted(os.listdir(b))
+    assert filecmp.cmpfiles(a, b, arquivos, shallow=False)[0]==arquivos
+
+
+@pytest.mark.parametrize("tema", TEMAS)
+def test_banco_streaming_igual_em_memoria(tmp_path, tema):
+    campos=list(G.CAMPOS_TEMA[tema])
+    a=G.gerar_banco(_spec(tema, campos), str(tmp_path/"mem.sqlite"))
+    b=G.gerar_banco_streaming(tema, _pedacos(tema, campos), campos, str(tmp_path/"fluxo.sqlite"))
+    def conteudo(caminho):
+        con=sqlite3.connect(caminho)
+        try:
+            nomes=[n for (n,) in con.execute("select name from sqlite_master where type='table' order by name")]
+            return {n: con.execute(f'select * from "{n}"').fetchall() for n in nomes}
+        finally: con.close()
+    assert conteudo(a)==conteudo(b)
+
+
+@pytest.mark.parametrize("tema", TEMAS)
+def test_xlsx_streaming_igual_em_memoria(tmp_path, tema):
+    openpyxl=pytest.importorskip("openpyxl")
+    campos=list(G.CAMPOS_TEMA[tema])
+    G.gerar_planilha(_spec(tema, campos), str(tmp_path/"mem.xlsx"))
+    G.gerar_planilha_streaming(tema, _pedacos(tema, campos), campos, str(tmp_path/"fluxo.xlsx"))
+    def valores(caminho):
+        wb=openpyxl.load_workbook(caminho, read_only=True)
+        return {ws.title: list(ws.iter_rows(values_only=True)) for ws in wb.worksheets}
+    assert valores(tmp_path/"mem.xlsx")==valores(tmp_path/"fluxo.xlsx")
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_kpi_sem_valor_vira_traco(tmp_path, streaming):
+    # 3 linhas com seed 3: nenhum chamado fechado, médias de zero linhas dão NaN
+    openpyxl=pytest.importorskip("openpyxl")
+    caminho=G.gerar_excel_tema("Informática", 3, list(G.CAMPOS_TEMA["Informática"]), str(tmp_path/"k.xlsx"), seed=3, streaming=streaming, cache=False)
+    valores=dict(r for r in openpyxl.load_workbook(caminho)["Dashboard"].iter_rows(min_row=3, values_only=True))
+    assert "-" in valores.values()